@@ -0,0 +1,102 @@
+"""
+сравнение приближенных соседей (LSH, utils/ann.py) с точным Пирсоном:
+время построения и recall@K для нескольких размеров каталога и числа хеш-таблиц.
+
+запуск из каталога lab_03:
+    python -m benchmarks.ann --items 1000 4000 16000 --tables 8 16 32
+    python -m benchmarks.ann --movielens    # только реальный ML-100k
+"""
+import argparse
+import logging
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from config import CF_K_NEIGHBORS
+from utils import ann, sparse_similarity
+from utils.cf import ItemUserMatrix
+from utils.neighbors import NeighborStore
+
+from .synthetic import generate_ratings, to_item_user
+
+# в среднем оценок на фильм и фильмов на пользователя в синтетическом каталоге (близко к ML-100k)
+_RATINGS_PER_ITEM = 60
+_USERS_PER_ITEM = 0.6
+
+
+def _timed(fn: Callable[[], NeighborStore]) -> Tuple[NeighborStore, float]:
+    """ выполняет fn и возвращает результат и время в секундах """
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_catalog(matrix: ItemUserMatrix, tables: Sequence[int], k: int = CF_K_NEIGHBORS) -> List[Dict[str, float]]:
+    """
+    строит точных и приближенных соседей для одного каталога.
+
+    аргументы:
+        matrix (ItemUserMatrix): матрица "фильм-пользователь".
+        tables (Sequence[int]): значения числа хеш-таблиц LSH.
+        k (int): сколько соседей хранить.
+
+    возвращает:
+        List[Dict[str, float]]: по строке на каждое значение tables.
+    """
+    exact, exact_seconds = _timed(lambda: sparse_similarity.build_neighbor_store(matrix, k=k))
+    rows: List[Dict[str, float]] = []
+    for n_tables in tables:
+        approx, seconds = _timed(lambda: ann.build_neighbor_store(matrix, k=k, tables=n_tables))
+        rows.append({
+            "items": len(matrix),
+            "tables": n_tables,
+            "exact_seconds": exact_seconds,
+            "lsh_seconds": seconds,
+            "recall_at_10": ann.recall_at_k(approx, exact, 10),
+            "recall_at_k": ann.recall_at_k(approx, exact),
+        })
+    return rows
+
+
+def synthetic_catalog(n_items: int, seed: int = 0) -> ItemUserMatrix:
+    """ синтетический каталог из n_items фильмов с плотностью оценок как у ML-100k """
+    ratings = generate_ratings(
+        n_ratings=n_items * _RATINGS_PER_ITEM,
+        n_users=max(int(n_items * _USERS_PER_ITEM), 1),
+        n_items=n_items,
+        seed=seed,
+    )
+    return to_item_user(ratings)
+
+
+def movielens_catalog() -> ItemUserMatrix:
+    """ матрица "фильм-пользователь" реального u.data """
+    from utils.data_loader import load_movielens_ratings
+
+    return to_item_user(load_movielens_ratings())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="*", default=[1000, 4000, 16000], help="размеры синтетических каталогов")
+    parser.add_argument("--tables", type=int, nargs="+", default=[8, 16, 32], help="значения числа хеш-таблиц")
+    parser.add_argument("--movielens", action="store_true", help="замерить и реальный ML-100k")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    catalogs: List[Tuple[str, Callable[[], ItemUserMatrix]]] = []
+    if args.movielens:
+        catalogs.append(("ml-100k", movielens_catalog))
+    for n_items in args.items:
+        catalogs.append((f"synthetic-{n_items}", lambda n=n_items: synthetic_catalog(n)))
+
+    print(f"{'каталог':<16} {'фильмов':>8} {'таблиц':>6} {'точно, с':>9} {'LSH, с':>8} {'R@10':>6} {'R@K':>6}")
+    for name, build in catalogs:
+        for row in bench_catalog(build(), args.tables):
+            print(
+                f"{name:<16} {row['items']:>8} {row['tables']:>6} {row['exact_seconds']:>9.2f} "
+                f"{row['lsh_seconds']:>8.2f} {row['recall_at_10']:>6.3f} {row['recall_at_k']:>6.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
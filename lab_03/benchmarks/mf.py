@@ -0,0 +1,181 @@
+"""
+сравнение модели скрытых факторов (ALS, utils/mf.py) с соседями фильмов (Пирсон) на реальном u.data:
+время обучения, RMSE на отложенной части оценок и время рекомендаций для одного пользователя.
+
+оценки случайно делятся на обучающие и проверочные (по умолчанию 80/20),
+обе модели обучаются только на обучающей части.
+
+запуск из каталога lab_03:
+    python -m benchmarks.mf
+    python -m benchmarks.mf --factors 8 16 32 --iterations 15 --test-share 0.1
+"""
+import argparse
+import logging
+import time
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from config import CF_K_NEIGHBORS
+from utils import cf, mf, sparse_similarity
+from utils.neighbors import NeighborStore
+from utils.schemas import RatingArrays
+
+from .synthetic import to_item_user, to_user_item
+
+# сколько соседей фильма учитывается при предсказании оценки (как k_neighbors в recommend_for_user)
+_PREDICT_NEIGHBORS = 20
+
+
+def holdout_split(ratings: RatingArrays, test_share: float = 0.2, seed: int = 0) -> Tuple[RatingArrays, RatingArrays]:
+    """
+    случайно делит оценки на обучающие и проверочные.
+
+    аргументы:
+        ratings (RatingArrays): все оценки.
+        test_share (float): доля проверочных оценок.
+        seed (int): зерно генератора.
+
+    возвращает:
+        Tuple[RatingArrays, RatingArrays]: (обучающие, проверочные).
+    """
+    order = np.random.default_rng(seed).permutation(len(ratings))
+    cut = int(len(order) * (1.0 - test_share))
+
+    def take(idx: np.ndarray) -> RatingArrays:
+        return RatingArrays(ratings.user_ids[idx], ratings.item_ids[idx], ratings.scores[idx])
+
+    return take(order[:cut]), take(order[cut:])
+
+
+def _rmse(pred: np.ndarray, actual: np.ndarray) -> float:
+    return float(np.sqrt(np.mean((pred - np.asarray(actual, dtype=np.float64)) ** 2)))
+
+
+def predict_item_cf(
+    test: RatingArrays,
+    user_items: cf.UserItemMatrix,
+    neighbors: NeighborStore,
+    fallback: float,
+    k_neighbors: int = _PREDICT_NEIGHBORS,
+) -> np.ndarray:
+    """
+    предсказание оценок соседями фильмов: Σ sim · r / Σ sim по оцененным пользователем соседям
+    с положительным сходством (та же формула, что в cf.recommend_items_for_user).
+    если таких соседей нет — средняя оценка пользователя, а для нового пользователя — fallback.
+
+    аргументы:
+        test (RatingArrays): пары для предсказания.
+        user_items (cf.UserItemMatrix): обучающие оценки пользователей.
+        neighbors (NeighborStore): соседи, посчитанные по обучающим оценкам.
+        fallback (float): средняя оценка обучающей части.
+        k_neighbors (int): сколько соседей фильма учитывать.
+
+    возвращает:
+        np.ndarray: предсказанные оценки.
+    """
+    items = neighbors.items
+    pred = np.empty(len(test), dtype=np.float64)
+    for pos, (user_id, item) in enumerate(zip(test.user_ids.tolist(), test.item_ids.tolist())):
+        rated = user_items.get(user_id, {})
+        num = den = 0.0
+        idx, sims = neighbors.neighbors(item, k_neighbors)
+        for j, sim in zip(idx.tolist(), sims.tolist()):
+            score = rated.get(items[j])
+            if score is not None and sim > 0:
+                num += sim * score
+                den += sim
+        if den > 0:
+            pred[pos] = num / den
+        elif rated:
+            pred[pos] = sum(rated.values()) / len(rated)
+        else:
+            pred[pos] = fallback
+    return pred
+
+
+def _per_user_seconds(users: Sequence[int], recommend) -> float:
+    start = time.perf_counter()
+    for user_id in users:
+        recommend(user_id)
+    return (time.perf_counter() - start) / max(len(users), 1)
+
+
+def compare(
+    ratings: RatingArrays,
+    factors: Sequence[int],
+    iterations: int,
+    regularization: float,
+    test_share: float,
+    seed: int,
+) -> List[Dict[str, object]]:
+    """
+    обучает модели на обучающей части и оценивает их на проверочной.
+
+    аргументы:
+        ratings (RatingArrays): все оценки.
+        factors (Sequence[int]): размерности ALS, которые нужно сравнить.
+        iterations (int): число итераций ALS.
+        regularization (float): регуляризация ALS.
+        test_share (float): доля проверочных оценок.
+        seed (int): зерно разбиения.
+
+    возвращает:
+        List[Dict[str, object]]: по строке на модель: model, train_seconds, rmse, recommend_ms.
+    """
+    train, test = holdout_split(ratings, test_share, seed)
+    mean = float(np.mean(train.scores))
+    user_items = to_user_item(train)
+    users = sorted(user_items)
+    rows: List[Dict[str, object]] = [
+        {"model": "средняя оценка", "train_seconds": 0.0, "rmse": _rmse(np.full(len(test), mean), test.scores),
+         "recommend_ms": float("nan")},
+    ]
+
+    start = time.perf_counter()
+    neighbors = sparse_similarity.build_neighbor_store(to_item_user(train), k=CF_K_NEIGHBORS)
+    seconds = time.perf_counter() - start
+    rows.append({
+        "model": f"соседи фильмов (k={_PREDICT_NEIGHBORS})",
+        "train_seconds": seconds,
+        "rmse": _rmse(predict_item_cf(test, user_items, neighbors, mean), test.scores),
+        "recommend_ms": 1000 * _per_user_seconds(
+            users, lambda u: cf.recommend_items_for_user(u, user_items, neighbors, _PREDICT_NEIGHBORS, 10),
+        ),
+    })
+
+    for n_factors in factors:
+        start = time.perf_counter()
+        model = mf.train_als(train, factors=n_factors, iterations=iterations, regularization=regularization)
+        seconds = time.perf_counter() - start
+        rows.append({
+            "model": f"ALS (factors={n_factors})",
+            "train_seconds": seconds,
+            "rmse": mf.rmse(model, test),
+            "recommend_ms": 1000 * _per_user_seconds(users, lambda u: model.recommend(u, user_items[u], 10)),
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--factors", type=int, nargs="+", default=[8, mf.DEFAULT_FACTORS, 32], help="размерности ALS")
+    parser.add_argument("--iterations", type=int, default=mf.DEFAULT_ITERATIONS, help="число итераций ALS")
+    parser.add_argument("--regularization", type=float, default=mf.DEFAULT_REGULARIZATION, help="регуляризация ALS")
+    parser.add_argument("--test-share", type=float, default=0.2, help="доля проверочных оценок")
+    parser.add_argument("--seed", type=int, default=0, help="зерно разбиения")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    from utils.data_loader import load_movielens_ratings
+
+    rows = compare(
+        load_movielens_ratings(), args.factors, args.iterations, args.regularization, args.test_share, args.seed,
+    )
+    print(f"{'модель':<28} {'обучение, с':>12} {'RMSE':>7} {'рекомендации, мс':>17}")
+    for row in rows:
+        print(f"{row['model']:<28} {row['train_seconds']:>12.2f} {row['rmse']:>7.4f} {row['recommend_ms']:>17.3f}")
+
+
+if __name__ == "__main__":
+    main()
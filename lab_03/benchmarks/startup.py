@@ -0,0 +1,62 @@
+"""
+замер времени загрузки датасета: разбор CSV против бинарного кэша.
+
+запуск из каталога lab_03:
+    python -m benchmarks.startup --repeats 5
+"""
+import argparse
+import logging
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import dataset
+
+
+def _timeit(fn: Callable[[], object], repeats: int) -> List[float]:
+    """ выполняет fn несколько раз и возвращает время каждого прогона в секундах """
+    times: List[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def bench_startup(repeats: int = 5) -> Dict[str, float]:
+    """
+    сравнивает медианное время dataset_preprocessing по CSV и по бинарному кэшу.
+
+    аргументы:
+        repeats (int): число прогонов каждого варианта.
+
+    возвращает:
+        Dict[str, float]: медианы в секундах и ускорение.
+    """
+    # прогрев: кэш создается, если его еще нет
+    dataset.dataset_preprocessing()
+    csv_times = _timeit(lambda: dataset.dataset_preprocessing(use_cache=False), repeats)
+    binary_times = _timeit(lambda: dataset.dataset_preprocessing(), repeats)
+    csv_median = statistics.median(csv_times)
+    binary_median = statistics.median(binary_times)
+    return {
+        "csv_seconds": csv_median,
+        "binary_seconds": binary_median,
+        "speedup": csv_median / binary_median if binary_median else float("inf"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5, help="число прогонов каждого варианта")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    result = bench_startup(args.repeats)
+    print(f"CSV:    {result['csv_seconds'] * 1000:.1f} мс")
+    print(f"binary: {result['binary_seconds'] * 1000:.1f} мс")
+    print(f"ускорение: x{result['speedup']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
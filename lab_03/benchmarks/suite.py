@@ -0,0 +1,405 @@
+"""
+набор бенчмарков горячих путей рекомендательной системы.
+
+оценки генерируются синтетически в форме MovieLens (см. benchmarks/synthetic.py),
+метаданные фильмов для поиска и жанров берутся из реального u.item.
+каждый замер идет в отдельном процессе, поэтому пиковая RSS относится только к нему.
+результат — JSON: время, число операций, операций в секунду и пиковая RSS на каждый замер.
+
+запуск из каталога lab_03:
+    python -m benchmarks.suite --sizes 100k 1m --output bench.json
+    python -m benchmarks.suite --sizes 10m --cases build_similarity load_path
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .synthetic import SIZES, generate_size, to_item_user, to_user_item
+
+# сколько запросов делает каждый замер точечных операций
+DEFAULT_QUERIES = 2000
+
+# результат замера: (число операций, время операций в секундах, время подготовки в секундах)
+CaseResult = Tuple[int, float, float]
+
+
+def _load_arrays(data_dir: Path):
+    """ читает сгенерированные оценки, сохраненные родительским процессом """
+    from utils.schemas import RatingArrays
+
+    return RatingArrays(
+        user_ids=np.load(data_dir / "user_ids.npy"),
+        item_ids=np.load(data_dir / "item_ids.npy"),
+        scores=np.load(data_dir / "scores.npy"),
+    )
+
+
+def _built_storage(data_dir: Path):
+    """ хранилище с загруженными оценками и посчитанными соседями (подготовка для точечных запросов) """
+    from utils.storage import RecommendationStorage
+
+    storage = RecommendationStorage(workers=1, backend="exact")
+    storage.load_bulk(_load_arrays(data_dir))
+    return storage
+
+
+def case_build_similarity(data_dir: Path, queries: int) -> CaseResult:
+    """ полный расчет top-K соседей по уже загруженным матрицам """
+    from utils.storage import RecommendationStorage
+
+    start = time.perf_counter()
+    ratings = _load_arrays(data_dir)
+    storage = RecommendationStorage(workers=1, backend="exact")
+    storage.item_user = to_item_user(ratings)
+    storage.user_item = to_user_item(ratings)
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    storage.recompute_similarity()
+    return 1, time.perf_counter() - start, setup
+
+
+def case_recommend_items_for_user(data_dir: Path, queries: int) -> CaseResult:
+    """ рекомендации для случайных пользователей (utils.cf.recommend_items_for_user) """
+    from utils import cf
+
+    start = time.perf_counter()
+    storage = _built_storage(data_dir)
+    users = np.random.default_rng(0).choice(list(storage.user_item), queries).tolist()
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user_id in users:
+        cf.recommend_items_for_user(user_id, storage.user_item, storage.neighbors, k_neighbors=20, top_n=10)
+    return len(users), time.perf_counter() - start, setup
+
+
+def case_recommend_batch(data_dir: Path, queries: int) -> CaseResult:
+    """ рекомендации для всех пользователей одним пакетом (RecommendationStorage.recommend_batch) """
+    start = time.perf_counter()
+    storage = _built_storage(data_dir)
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = storage.recommend_batch(top_n=10)
+    return len(result), time.perf_counter() - start, setup
+
+
+def case_similar_items(data_dir: Path, queries: int) -> CaseResult:
+    """ похожие фильмы для случайных фильмов (RecommendationStorage.similar_items) """
+    start = time.perf_counter()
+    storage = _built_storage(data_dir)
+    items = np.random.default_rng(0).choice(list(storage.item_user), queries).tolist()
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for item in items:
+        storage.similar_items(item, top_n=10)
+    return len(items), time.perf_counter() - start, setup
+
+
+def case_recommend_user_cf(data_dir: Path, queries: int) -> CaseResult:
+    """ рекомендации User-Based CF для случайных пользователей (UserModel.recommend) """
+    from utils import user_cf
+
+    start = time.perf_counter()
+    ratings = _load_arrays(data_dir)
+    user_item = to_user_item(ratings)
+    model = user_cf.build_user_model(ratings)
+    users = np.random.default_rng(0).choice(list(user_item), queries).tolist()
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user_id in users:
+        model.recommend(user_id, user_item[user_id], k_neighbors=20, top_n=10)
+    return len(users), time.perf_counter() - start, setup
+
+
+def case_recommend_batch_user_cf(data_dir: Path, queries: int) -> CaseResult:
+    """ User-Based CF для всех пользователей блоками (user_cf.recommend_batch) """
+    from utils import user_cf
+
+    start = time.perf_counter()
+    ratings = _load_arrays(data_dir)
+    user_item = to_user_item(ratings)
+    model = user_cf.build_user_model(ratings)
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = user_cf.recommend_batch(model, sorted(user_item), user_item, k_neighbors=20, top_n=10)
+    return len(result), time.perf_counter() - start, setup
+
+
+def case_train_mf(data_dir: Path, queries: int) -> CaseResult:
+    """ обучение модели скрытых факторов ALS (utils.mf.train_als) """
+    from utils import mf
+
+    start = time.perf_counter()
+    ratings = _load_arrays(data_dir)
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mf.train_als(ratings)
+    return 1, time.perf_counter() - start, setup
+
+
+def case_recommend_mf(data_dir: Path, queries: int) -> CaseResult:
+    """ рекомендации моделью скрытых факторов для случайных пользователей (FactorModel.recommend) """
+    from utils import mf
+
+    start = time.perf_counter()
+    ratings = _load_arrays(data_dir)
+    user_item = to_user_item(ratings)
+    model = mf.train_als(ratings)
+    users = np.random.default_rng(0).choice(list(user_item), queries).tolist()
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for user_id in users:
+        model.recommend(user_id, user_item[user_id], top_n=10)
+    return len(users), time.perf_counter() - start, setup
+
+
+def case_find_movie_by_name(data_dir: Path, queries: int) -> CaseResult:
+    """ поиск по названиям реального u.item: точные, префиксные и неточные запросы """
+    from utils import data_loader
+
+    start = time.perf_counter()
+    data_loader.load_dataset()
+    titles = data_loader.get_vocabulary().titles
+    rng = np.random.default_rng(0)
+    picked = [titles[i] for i in rng.choice(len(titles), queries)]
+    # по трети запросов: полное название, первое слово, название с опечаткой (переставлены две буквы)
+    needles = []
+    for i, title in enumerate(picked):
+        if i % 3 == 0 or len(title) < 4:
+            needles.append(title)
+        elif i % 3 == 1:
+            needles.append(title.split()[0])
+        else:
+            needles.append(title[:1] + title[2] + title[1] + title[3:])
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for needle in needles:
+        data_loader.find_movie_by_name(needle)
+    return len(needles), time.perf_counter() - start, setup
+
+
+def case_top_movies_by_genre(data_dir: Path, queries: int) -> CaseResult:
+    """ страницы топа жанров реального u.item """
+    from utils import data_loader
+
+    start = time.perf_counter()
+    data_loader.load_dataset()
+    genres = data_loader.list_genres()
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(queries):
+        data_loader.top_movies_by_genre(genres[i % len(genres)], top_n=10, offset=(i // len(genres)) % 5 * 10)
+    return queries, time.perf_counter() - start, setup
+
+
+def case_format_batch(data_dir: Path, queries: int) -> CaseResult:
+    """ вывод страниц по 5 фильмов реального u.item (utils.pages.format_batch, как в обработчиках бота) """
+    from utils import data_loader
+    from utils.pages import BATCH_SIZE, format_batch
+
+    start = time.perf_counter()
+    data_loader.load_dataset()
+    rng = np.random.default_rng(0)
+    pages = rng.integers(0, len(data_loader.get_vocabulary()), (queries, BATCH_SIZE)).tolist()
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i, page in enumerate(pages):
+        format_batch(page, offset=i % 6 * BATCH_SIZE)
+    return len(pages), time.perf_counter() - start, setup
+
+
+def case_load_path(data_dir: Path, queries: int) -> CaseResult:
+    """
+    полный путь загрузки, как в bot.preload_similarity без снимка:
+    потоковое чтение файла оценок в формате u.data, запись в хранилище и расчет соседей.
+    """
+    from utils import data_loader
+    from utils.storage import RecommendationStorage
+
+    start = time.perf_counter()
+    data_loader.load_dataset()
+    setup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    storage = RecommendationStorage(workers=1, backend="exact")
+    storage.load_chunks(data_loader.stream_movielens_ratings(data_dir / "u.data"))
+    return 1, time.perf_counter() - start, setup
+
+
+CASES: Dict[str, Callable[[Path, int], CaseResult]] = {
+    "build_similarity": case_build_similarity,
+    "recommend_items_for_user": case_recommend_items_for_user,
+    "recommend_batch": case_recommend_batch,
+    "similar_items": case_similar_items,
+    "recommend_user_cf": case_recommend_user_cf,
+    "recommend_batch_user_cf": case_recommend_batch_user_cf,
+    "train_mf": case_train_mf,
+    "recommend_mf": case_recommend_mf,
+    "find_movie_by_name": case_find_movie_by_name,
+    "top_movies_by_genre": case_top_movies_by_genre,
+    "format_batch": case_format_batch,
+    "load_path": case_load_path,
+}
+
+# замеры, не зависящие от размера синтетических оценок (работают с реальным u.item)
+_METADATA_CASES = {"find_movie_by_name", "top_movies_by_genre", "format_batch"}
+
+
+def _peak_rss_mb() -> float:
+    """ пиковая RSS текущего процесса в МБ (ru_maxrss — КБ в Linux, байты в macOS) """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_case(name: str, data_dir: Path, queries: int, results: "multiprocessing.Queue") -> None:
+    """ выполняет один замер в дочернем процессе и кладет результат в очередь """
+    logging.disable(logging.INFO)
+    ops, seconds, setup = CASES[name](data_dir, queries)
+    results.put({
+        "ops": ops,
+        "wall_seconds": seconds,
+        "setup_seconds": setup,
+        "ops_per_sec": ops / seconds if seconds > 0 else float("inf"),
+        "peak_rss_mb": _peak_rss_mb(),
+    })
+
+
+def run_case(name: str, data_dir: Path, queries: int = DEFAULT_QUERIES) -> Dict[str, float]:
+    """
+    запускает замер в отдельном процессе (spawn), чтобы пиковая RSS не смешивалась между замерами.
+
+    аргументы:
+        name (str): имя замера из CASES.
+        data_dir (Path): каталог со сгенерированными оценками.
+        queries (int): число запросов для точечных операций.
+
+    возвращает:
+        Dict[str, float]: ops, wall_seconds, setup_seconds, ops_per_sec, peak_rss_mb.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    process = ctx.Process(target=_run_case, args=(name, data_dir, queries, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"замер {name} завершился с кодом {process.exitcode}")
+    return results.get()
+
+
+def prepare_size(size: str, directory: Path, seed: int = 0) -> Path:
+    """
+    генерирует оценки заданного размера и сохраняет их как .npy и как файл в формате u.data.
+
+    аргументы:
+        size (str): ключ SIZES ("100k", "1m", "10m").
+        directory (Path): каталог для данных.
+        seed (int): зерно генератора.
+
+    возвращает:
+        Path: каталог с данными этого размера.
+    """
+    data_dir = directory / size
+    data_dir.mkdir(parents=True, exist_ok=True)
+    ratings = generate_size(size, seed=seed)
+    np.save(data_dir / "user_ids.npy", ratings.user_ids)
+    np.save(data_dir / "item_ids.npy", ratings.item_ids)
+    np.save(data_dir / "scores.npy", ratings.scores)
+    # movie_id в файле начинаются с 1, как в MovieLens; timestamp не используется
+    table = np.column_stack([
+        ratings.user_ids, ratings.item_ids + 1, ratings.scores.astype(np.int32), np.zeros(len(ratings), dtype=np.int32),
+    ])
+    np.savetxt(data_dir / "u.data", table, fmt="%d", delimiter="\t")
+    return data_dir
+
+
+def _git_revision() -> Optional[str]:
+    """ текущий коммит, чтобы результаты разных запусков можно было сопоставить """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes: List[str], cases: List[str], queries: int = DEFAULT_QUERIES, seed: int = 0) -> Dict[str, object]:
+    """
+    выполняет замеры для всех сочетаний размеров и замеров.
+
+    аргументы:
+        sizes (List[str]): размеры синтетических оценок.
+        cases (List[str]): имена замеров из CASES.
+        queries (int): число запросов для точечных операций.
+        seed (int): зерно генератора.
+
+    возвращает:
+        Dict[str, object]: {"meta": окружение запуска, "results": список замеров}.
+    """
+    results: List[Dict[str, object]] = []
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        for size in sizes:
+            data_dir = prepare_size(size, Path(tmp), seed)
+            for name in cases:
+                # замеры по метаданным не зависят от размера оценок — хватит одного прогона
+                if name in _METADATA_CASES and size != sizes[0]:
+                    continue
+                row: Dict[str, object] = {"case": name, "size": None if name in _METADATA_CASES else size}
+                row.update(run_case(name, data_dir, queries))
+                results.append(row)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "queries": queries,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["100k", "1m"], choices=list(SIZES), help="размеры оценок")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES), help="какие замеры выполнить")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="число запросов точечных операций")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора оценок")
+    parser.add_argument("--output", type=Path, help="файл для JSON (по умолчанию — stdout)")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    report = json.dumps(run_suite(args.sizes, args.cases, args.queries, args.seed), ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(report + "\n", encoding="utf-8")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
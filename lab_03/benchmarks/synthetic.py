@@ -0,0 +1,117 @@
+"""
+синтетические оценки в форме MovieLens для бенчмарков.
+
+популярность фильмов и активность пользователей распределены с тяжелым хвостом,
+оценки 1..5 получаются из скрытых факторов (как в реальных данных, похожие фильмы
+оцениваются похоже), повторные пары (пользователь, фильм) удаляются.
+"""
+from typing import Dict
+
+import numpy as np
+
+from utils.cf import ItemUserMatrix, UserItemMatrix
+from utils.schemas import RatingArrays
+
+# размеры, близкие к ML-100k, ML-1M и ML-10M: (оценок, пользователей, фильмов)
+SIZES: Dict[str, tuple] = {
+    "100k": (100_000, 943, 1_682),
+    "1m": (1_000_000, 6_040, 3_706),
+    "10m": (10_000_000, 69_878, 10_677),
+}
+
+# сколько оценок генерируется за один шаг (ограничивает пиковую память генератора)
+_CHUNK = 1_000_000
+
+
+def generate_ratings(n_ratings: int, n_users: int, n_items: int, rank: int = 8, seed: int = 0) -> RatingArrays:
+    """
+    генерирует синтетические оценки.
+
+    аргументы:
+        n_ratings (int): сколько оценок сгенерировать (после удаления повторов может быть чуть меньше).
+        n_users (int): число пользователей.
+        n_items (int): число фильмов (номера 0..n_items-1).
+        rank (int): размерность скрытых факторов.
+        seed (int): зерно генератора.
+
+    возвращает:
+        RatingArrays: оценки, отсортированные по пользователю и фильму.
+    """
+    rng = np.random.default_rng(seed)
+    # степенной спад популярности, порядок фильмов перемешан
+    item_p = 1.0 / (np.arange(n_items) + 10.0) ** 0.8
+    item_p = rng.permutation(item_p / item_p.sum())
+    user_p = rng.lognormal(0.0, 1.0, n_users)
+    user_p /= user_p.sum()
+    user_f = rng.standard_normal((n_users, rank)).astype(np.float32)
+    item_f = rng.standard_normal((n_items, rank)).astype(np.float32)
+    user_bias = rng.normal(0.0, 0.4, n_users).astype(np.float32)
+    item_bias = rng.normal(0.0, 0.5, n_items).astype(np.float32)
+
+    keys = []
+    for start in range(0, n_ratings, _CHUNK):
+        size = min(_CHUNK, n_ratings - start)
+        users = rng.choice(n_users, size, p=user_p)
+        items = rng.choice(n_items, size, p=item_p)
+        keys.append(users.astype(np.int64) * n_items + items)
+    key = np.concatenate(keys)
+    key.sort()
+    key = key[np.r_[True, key[1:] != key[:-1]]]
+    users = (key // n_items).astype(np.int32)
+    items = (key % n_items).astype(np.int32)
+
+    scores = np.empty(len(key), dtype=np.float32)
+    for start in range(0, len(key), _CHUNK):
+        u = users[start:start + _CHUNK]
+        i = items[start:start + _CHUNK]
+        affinity = np.einsum("ij,ij->i", user_f[u], item_f[i]) / np.sqrt(rank)
+        raw = 3.5 + user_bias[u] + item_bias[i] + affinity + rng.normal(0.0, 0.5, len(u))
+        scores[start:start + _CHUNK] = np.clip(np.rint(raw), 1, 5)
+    return RatingArrays(user_ids=users, item_ids=items, scores=scores)
+
+
+def generate_size(name: str, seed: int = 0) -> RatingArrays:
+    """
+    генерирует оценки одного из стандартных размеров SIZES.
+
+    аргументы:
+        name (str): "100k", "1m" или "10m".
+        seed (int): зерно генератора.
+
+    возвращает:
+        RatingArrays: синтетические оценки.
+    """
+    n_ratings, n_users, n_items = SIZES[name]
+    return generate_ratings(n_ratings, n_users, n_items, seed=seed)
+
+
+def to_item_user(ratings: RatingArrays) -> ItemUserMatrix:
+    """
+    собирает словарную матрицу "фильм-пользователь" из массивов оценок.
+
+    аргументы:
+        ratings (RatingArrays): оценки.
+
+    возвращает:
+        ItemUserMatrix: матрица, где ключ — номер фильма, значение — оценки пользователей.
+    """
+    matrix: ItemUserMatrix = {}
+    for user_id, item_id, score in zip(ratings.user_ids.tolist(), ratings.item_ids.tolist(), ratings.scores.tolist()):
+        matrix.setdefault(item_id, {})[user_id] = score
+    return matrix
+
+
+def to_user_item(ratings: RatingArrays) -> UserItemMatrix:
+    """
+    собирает обратный индекс "пользователь-фильм" из массивов оценок.
+
+    аргументы:
+        ratings (RatingArrays): оценки.
+
+    возвращает:
+        UserItemMatrix: матрица, где ключ — ID пользователя, значение — его оценки фильмов.
+    """
+    matrix: UserItemMatrix = {}
+    for user_id, item_id, score in zip(ratings.user_ids.tolist(), ratings.item_ids.tolist(), ratings.scores.tolist()):
+        matrix.setdefault(user_id, {})[item_id] = score
+    return matrix
@@ -1,14 +1,27 @@
 import logging
+from functools import partial
+from typing import Optional
 
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.bot import DefaultBotProperties
 
-from config import BOT_KEY
+from config import (
+    BOT_KEY,
+    CF_BACKEND,
+    CF_K_NEIGHBORS,
+    CF_LSH_TABLES,
+    EXECUTOR_KIND,
+    RATINGS_CHUNK_SIZE,
+    RATINGS_FILE,
+    SNAPSHOT_DIR,
+)
+from dataset import movies_file_for
 from handlers import get_routers
 from middleware.logging import LoggingMiddleware
-from utils import storage
-from utils.data_loader import load_movielens_ratings
+from utils import executor, snapshot, storage, warmup
+from utils.data_loader import load_dataset, stream_movielens_ratings
+from utils.neighbors import NeighborStore
 
 logger = logging.getLogger("movie_recommender_bot")
 
@@ -21,15 +34,54 @@ def setup_logging() -> None:
     )
 
 
+def similarity_fingerprint() -> str:
+    """ отпечаток файлов и параметров, под которым сохраняется снимок матрицы сходства """
+    return snapshot.dataset_fingerprint(
+        [RATINGS_FILE, movies_file_for(RATINGS_FILE)],
+        {"metric": "pearson", "k": CF_K_NEIGHBORS, "backend": CF_BACKEND, "lsh_tables": CF_LSH_TABLES},
+    )
+
+
+def snapshot_neighbors(fingerprint: str) -> Optional[NeighborStore]:
+    """ соседи из снимка матрицы сходства или None, если прогрев его еще не записал """
+    cached = snapshot.load_snapshot(SNAPSHOT_DIR, fingerprint)
+    return cached.neighbors if cached is not None else None
+
+
+def init_offload_worker(fingerprint: str) -> None:
+    """
+    подготовка процесса пула (EXECUTOR_KIND=process): метаданные фильмов и соседи из снимка.
+    пул создается при первом вызове, а /genre отвечает и во время прогрева — снимка тогда еще нет,
+    поэтому соседи загружаются при первом запросе похожих фильмов после его записи.
+    """
+    load_dataset()
+    storage.set_neighbors_source(partial(snapshot_neighbors, fingerprint))
+    storage.rating_storage.neighbors = snapshot_neighbors(fingerprint)
+    if storage.rating_storage.neighbors is None:
+        logger.info("снимок матрицы сходства %s пока не записан, процесс пула загрузит его позже", fingerprint[:16])
+
+
 def preload_similarity() -> None:
     """
     Предзагрузка рейтингов и построение матрицы сходства.
+    Оценки читаются из RATINGS_FILE частями по RATINGS_CHUNK_SIZE строк.
+    Если на диске есть снимок для тех же файлов и параметров, соседи берутся из него без пересчета.
     """
     logger.info("предзагрузка рейтингов и построение матрицы сходства")
-    base_ratings = load_movielens_ratings()
-    storage.load_base_ratings(base_ratings)
+    # сначала метаданные фильмов: от них зависят /genre и поиск по названию
+    load_dataset()
+    fingerprint = similarity_fingerprint()
+    chunks = stream_movielens_ratings(RATINGS_FILE, RATINGS_CHUNK_SIZE)
+    cached = snapshot.load_snapshot(SNAPSHOT_DIR, fingerprint)
+    if cached is not None:
+        logger.info("матрица сходства загружена из снимка %s", fingerprint[:16])
+        rating_count = storage.load_rating_chunks(chunks, neighbors=cached.neighbors)
+    else:
+        rating_count = storage.load_rating_chunks(chunks)
+        if storage.rating_storage.neighbors is not None:
+            snapshot.save_snapshot(SNAPSHOT_DIR, fingerprint, storage.rating_storage.neighbors)
     item_count = len(storage.rating_storage.item_user)
-    logger.info("подготовлено %d оценок для %d фильмов", len(base_ratings), item_count)
+    logger.info("подготовлено %d оценок для %d фильмов", rating_count, item_count)
 
 
 def create_dispatcher() -> Dispatcher:
@@ -49,7 +101,11 @@ def run_bot() -> None:
         raise RuntimeError("отсутствует BOT_KEY в переменных окружения")
 
     setup_logging()
-    preload_similarity()
+    # матрица сходства строится в фоне: /start, /help и /genre отвечают сразу,
+    # а /recommend до готовности получает сообщение о прогреве
+    warmup.start(preload_similarity)
+    if EXECUTOR_KIND == "process":
+        executor.offloader.set_initializer(init_offload_worker, similarity_fingerprint())
 
     bot = Bot(
         token=BOT_KEY,
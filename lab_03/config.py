@@ -9,12 +9,45 @@ load_dotenv()
 BASE_DIR: Path = Path(__file__).resolve().parent
 DATA_DIR: Path = BASE_DIR / "data"
 STATIC_DIR: Path = BASE_DIR / "static"
+SNAPSHOT_DIR: Path = BASE_DIR / "snapshot"    # снимки матрицы сходства рядом с DATA_DIR
 
 BOT_KEY: str = os.getenv("BOT_KEY", "")
 
 MESSAGES_PATH: Path = STATIC_DIR / "message.json"
 
 CF_K_NEIGHBORS: int = 50
+# число процессов для построения матрицы сходства (1 — считать в текущем процессе)
+CF_WORKERS: int = int(os.getenv("CF_WORKERS", "1"))
+# движок соседей: "exact" — точный Пирсон по всем парам, "lsh" — приближенный поиск кандидатов (utils/ann.py).
+# "lsh" экспериментальный и не для работы бота: recall@K на ML-100k около 0.35 при 16 таблицах и 0.6 при 64,
+# строки с недобором кандидатов короче K (см. python -m benchmarks.ann --movielens)
+CF_BACKEND: str = os.getenv("CF_BACKEND", "exact")
+# число хеш-таблиц LSH: больше — выше полнота и дольше построение
+CF_LSH_TABLES: int = int(os.getenv("CF_LSH_TABLES", "16"))
+# инкрементальный режим хранит статистики всех пар фильмов в плотных массивах (28 байт на пару, O(items²) памяти):
+# при каталоге больше этого числа фильмов он отключается и соседи пересчитываются целиком (5000 фильмов — около 0.7 ГБ)
+CF_INCREMENTAL_MAX_ITEMS: int = int(os.getenv("CF_INCREMENTAL_MAX_ITEMS", "5000"))
+# модель персональных рекомендаций: "item" — соседи фильмов (Пирсон), "user" — похожие пользователи (utils/user_cf.py),
+# "mf" — скрытые факторы (ALS, utils/mf.py)
+CF_MODEL: str = os.getenv("CF_MODEL", "item")
+CF_MF_FACTORS: int = int(os.getenv("CF_MF_FACTORS", "16"))
+CF_MF_ITERATIONS: int = int(os.getenv("CF_MF_ITERATIONS", "10"))
+# кэш персональных рекомендаций: сколько записей хранить и сколько секунд запись живет
+CF_CACHE_SIZE: int = int(os.getenv("CF_CACHE_SIZE", "10000"))
+CF_CACHE_TTL: float = float(os.getenv("CF_CACHE_TTL", "600"))
+# пул для тяжелых вызовов из обработчиков: "thread" или "process" (процессам нужен снимок матрицы сходства)
+EXECUTOR_KIND: str = os.getenv("EXECUTOR_KIND", "thread")
+EXECUTOR_WORKERS: int = int(os.getenv("EXECUTOR_WORKERS", "4"))
+# сколько вызовов может ждать пула; сверх этого сразу отдается запасной ответ
+EXECUTOR_MAX_PENDING: int = int(os.getenv("EXECUTOR_MAX_PENDING", "64"))
+# сколько секунд обработчик ждет результата, прежде чем отдать запасной ответ
+EXECUTOR_TIMEOUT: float = float(os.getenv("EXECUTOR_TIMEOUT", "5"))
+# сколько последних удачных результатов помнить для запасных ответов
+EXECUTOR_RESULT_CACHE: int = int(os.getenv("EXECUTOR_RESULT_CACHE", "1024"))
+# файл оценок для построения схожести (u.data, ratings.dat или ratings.csv) и размер части при его потоковом чтении;
+# фильмы читаются из файла того же варианта рядом с ним (u.item, movies.dat или movies.csv)
+RATINGS_FILE: Path = Path(os.getenv("RATINGS_FILE", str(DATA_DIR / "u.data")))
+RATINGS_CHUNK_SIZE: int = int(os.getenv("RATINGS_CHUNK_SIZE", "1000000"))
 
 def json_loader() -> Dict[str, Any]:
     """Загружает JSON со всеми строковыми сообщениями для бота
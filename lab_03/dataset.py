@@ -1,13 +1,21 @@
 from pathlib import Path
+import json
 import logging
 import re
-from typing import Tuple, List
+from typing import Dict, Iterator, NamedTuple, Tuple, List, Optional
+import numpy as np
 import pandas as pd
+from scipy import sparse
 
 logging.basicConfig(level=logging.INFO)
 DATA_DIR: Path = Path(__file__).parent / "data"
 U_DATA_FILE: Path = DATA_DIR / "u.data"
 U_ITEM_FILE: Path = DATA_DIR / "u.item"
+# колоночный бинарный кэш u.data/u.item (создается при первой загрузке)
+CACHE_DIR: Path = DATA_DIR / "cache"
+CACHE_FORMAT = 1
+# число строк файла оценок, читаемых за один шаг потоковой загрузки
+RATINGS_CHUNK_SIZE = 1_000_000
 
 GENRES: List[str] = [
     "unknown", "Action", "Adventure", "Animation", "Children's", "Comedy", "Crime",
@@ -35,9 +43,9 @@ def normalize_movie(title: str) -> str:
     return s
 
 
-def dataset_preprocessing() -> Tuple[pd.DataFrame, pd.DataFrame]:
+def _read_csv_sources() -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
-    Загружает u.data и u.item и возвращает DataFrame с рейтингами и фильмами.
+    Разбирает исходные текстовые u.data и u.item (медленный путь).
 
     Возвращает:
         Tuple[pd.DataFrame, pd.DataFrame]: (ratings_df, movies_df)
@@ -45,9 +53,21 @@ def dataset_preprocessing() -> Tuple[pd.DataFrame, pd.DataFrame]:
     logging.info("Загрузка оценки пользователей (u.data)")
     ratings_cols: List[str] = ["user_id", "item_id", "rating", "timestamp"]
     ratings: pd.DataFrame = pd.read_csv(U_DATA_FILE, sep="\t", names=ratings_cols, encoding="latin-1")
+    return ratings, _read_u_item(U_ITEM_FILE)
+
+
+def _read_u_item(path: Path) -> pd.DataFrame:
+    """
+    Разбирает u.item (ML-100k): movie_id|title|release_date|video_release_date|imdb_url|19 флагов жанров.
+
+    Аргументы:
+        path (Path): путь к u.item
 
-    logging.info("Загрузка информации о фильмах и жанрах (u.item)")
-    movies_raw: pd.DataFrame = pd.read_csv(U_ITEM_FILE, sep="|", header=None, encoding="latin-1", low_memory=False)
+    Возвращает:
+        pd.DataFrame: фильмы с колонками movie_id, title, ..., GENRES, title_no_year, normalized_title, year
+    """
+    logging.info("Загрузка информации о фильмах и жанрах (%s)", Path(path).name)
+    movies_raw: pd.DataFrame = pd.read_csv(path, sep="|", header=None, encoding="latin-1", low_memory=False)
     expected_cols = 5 + len(GENRES)
     if movies_raw.shape[1] < expected_cols:
         for i in range(movies_raw.shape[1], expected_cols):
@@ -60,37 +80,284 @@ def dataset_preprocessing() -> Tuple[pd.DataFrame, pd.DataFrame]:
     movies["title_no_year"] = movies["title"].astype(str).str.replace(r"\(\d{4}\)", "", regex=True).str.strip()
     movies["normalized_title"] = movies["title_no_year"].apply(normalize_movie)
     movies["year"] = movies["release_date"].astype(str).str.extract(r"(\d{4})", expand=False).fillna("0000")
+    return movies
+
+
+# жанры ML-1M/ML-latest, которые называются иначе, чем в u.item; жанры не из GENRES (например, IMAX) не учитываются
+_GENRE_ALIASES: Dict[str, str] = {"Children": "Children's", "(no genres listed)": "unknown"}
+
+
+def _read_movielens_movies(path: Path) -> pd.DataFrame:
+    """
+    Разбирает movies.dat (ML-1M/10M: MovieID::Title::Genres, latin-1)
+    или movies.csv (ML-20M/25M/latest: movieId,title,genres с заголовком, utf-8)
+    в тот же формат, что и u.item. Жанры перечислены через "|", год берется из названия.
+
+    Аргументы:
+        path (Path): путь к movies.dat или movies.csv
+
+    Возвращает:
+        pd.DataFrame: фильмы в формате _read_u_item (release_date, video_release_date и imdb_url пустые)
+    """
+    logging.info("Загрузка информации о фильмах и жанрах (%s)", Path(path).name)
+    if Path(path).suffix.lower() == ".csv":
+        raw = pd.read_csv(path, encoding="utf-8", dtype={"title": str, "genres": str})
+    else:
+        # "::" не встречается внутри названий, но одиночное ":" встречается — нужен разделитель целиком
+        raw = pd.read_csv(path, sep="::", engine="python", header=None, encoding="latin-1", dtype={1: str, 2: str})
+    raw.columns = ["movie_id", "title", "genres"]
+
+    movies = pd.DataFrame({"movie_id": raw["movie_id"].to_numpy(dtype=np.int64), "title": raw["title"].fillna("")})
+    for col in ("release_date", "video_release_date", "imdb_url"):
+        movies[col] = np.nan
+    genre_lists = raw["genres"].fillna("").str.split("|")
+    for genre in GENRES:
+        aliases = {genre} | {alias for alias, target in _GENRE_ALIASES.items() if target == genre}
+        movies[genre] = genre_lists.map(lambda names: int(any(name in aliases for name in names)))
+
+    movies["title_no_year"] = movies["title"].str.replace(r"\(\d{4}\)", "", regex=True).str.strip()
+    movies["normalized_title"] = movies["title_no_year"].apply(normalize_movie)
+    movies["year"] = movies["title"].str.extract(r"\((\d{4})\)\s*$", expand=False).fillna("0000")
+    return movies
+
+
+def movies_file_for(ratings_path: Path) -> Path:
+    """
+    Файл фильмов того же варианта MovieLens, что и файл оценок (лежит рядом с ним):
+    u.data -> u.item, ratings.dat -> movies.dat, ratings.csv -> movies.csv.
+    В разных вариантах свои movie_id, поэтому фильмы от другого варианта брать нельзя.
+
+    Аргументы:
+        ratings_path (Path): путь к файлу оценок
+
+    Возвращает:
+        Path: путь к файлу фильмов
+    """
+    ratings_path = Path(ratings_path)
+    suffix = ratings_path.suffix.lower()
+    if suffix == ".csv":
+        return ratings_path.with_name("movies.csv")
+    if suffix == ".dat":
+        return ratings_path.with_name("movies.dat")
+    return ratings_path.with_name("u.item")
+
+
+def read_movies(path: Path) -> pd.DataFrame:
+    """
+    Читает файл фильмов любого варианта MovieLens (u.item, movies.dat, movies.csv) в едином формате.
+
+    Аргументы:
+        path (Path): путь к файлу фильмов
+
+    Возвращает:
+        pd.DataFrame: фильмы (см. _read_u_item)
+    """
+    if Path(path).suffix.lower() in (".dat", ".csv"):
+        return _read_movielens_movies(path)
+    return _read_u_item(path)
+
+
+def _ratings_reader_options(path: Path) -> Dict[str, object]:
+    """
+    параметры pd.read_csv для файла оценок MovieLens по его имени.
+
+    u.data — табуляция без заголовка (100k), ratings.dat — "::" без заголовка (1M/10M),
+    ratings.csv — запятая с заголовком userId,movieId,rating,timestamp (20M/25M).
+    разделитель "::" читается как ":" быстрым C-парсером: данные лежат в четных колонках.
+    """
+    name = Path(path).name.lower()
+    if name.endswith(".csv"):
+        return {"sep": ",", "header": 0, "usecols": [0, 1, 2]}
+    if name.endswith(".dat"):
+        return {"sep": ":", "header": None, "usecols": [0, 2, 4]}
+    return {"sep": "\t", "header": None, "usecols": [0, 1, 2]}
+
+
+def iter_rating_chunks(path: Path = U_DATA_FILE, chunk_size: int = RATINGS_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Читает файл оценок MovieLens (u.data, ratings.dat или ratings.csv) частями.
+    В памяти одновременно находится не больше chunk_size строк; timestamp не читается.
+
+    Аргументы:
+        path (Path): путь к файлу оценок
+        chunk_size (int): число строк в одной части
 
+    Возвращает:
+        Iterator[pd.DataFrame]: части с колонками user_id (int32), item_id (int64), rating (float32)
+    """
+    options = _ratings_reader_options(path)
+    reader = pd.read_csv(
+        path,
+        engine="c",
+        encoding="latin-1",
+        chunksize=chunk_size,
+        **options,
+    )
+    with reader:
+        for chunk in reader:
+            chunk.columns = ["user_id", "item_id", "rating"]
+            yield pd.DataFrame({
+                "user_id": chunk["user_id"].to_numpy(dtype=np.int32),
+                "item_id": chunk["item_id"].to_numpy(dtype=np.int64),
+                "rating": chunk["rating"].to_numpy(dtype=np.float32),
+            }, copy=False)
+
+
+# текстовые колонки фильмов; пустые значения в необязательных при загрузке из кэша снова становятся NaN
+_MOVIE_TEXT_COLS: List[str] = [
+    "title", "release_date", "video_release_date", "imdb_url", "title_no_year", "normalized_title", "year",
+]
+_OPTIONAL_TEXT_COLS: List[str] = ["release_date", "video_release_date", "imdb_url"]
+
+
+def _source_manifest() -> Dict[str, object]:
+    """ размеры и время изменения исходных файлов: по ним проверяется актуальность кэша """
+    manifest: Dict[str, object] = {"format": CACHE_FORMAT}
+    for path in (U_DATA_FILE, U_ITEM_FILE):
+        stat = path.stat()
+        manifest[path.name] = [stat.st_size, stat.st_mtime_ns]
+    return manifest
+
+
+def save_binary_cache(ratings: pd.DataFrame, movies: pd.DataFrame, cache_dir: Path = CACHE_DIR) -> None:
+    """
+    Сохраняет рейтинги и фильмы в колоночном бинарном виде (.npy на каждую колонку).
+
+    Рейтинги: int32 user_id/item_id, uint8 rating (float32, если оценки дробные), int64 timestamp.
+    Фильмы: int32 movie_id, uint8-матрица жанров и строковые колонки фиксированной ширины.
+
+    Аргументы:
+        ratings (pd.DataFrame): таблица с рейтингами
+        movies (pd.DataFrame): таблица с фильмами
+        cache_dir (Path): каталог кэша
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    rating = ratings["rating"].to_numpy()
+    is_whole = np.all(np.mod(rating, 1) == 0) and rating.min(initial=0) >= 0 and rating.max(initial=0) <= 255
+    np.save(cache_dir / "ratings_user_id.npy", ratings["user_id"].to_numpy(dtype=np.int32))
+    np.save(cache_dir / "ratings_item_id.npy", ratings["item_id"].to_numpy(dtype=np.int32))
+    np.save(cache_dir / "ratings_rating.npy", rating.astype(np.uint8 if is_whole else np.float32))
+    np.save(cache_dir / "ratings_timestamp.npy", ratings["timestamp"].to_numpy(dtype=np.int64))
+
+    np.save(cache_dir / "movies_movie_id.npy", movies["movie_id"].to_numpy(dtype=np.int32))
+    np.save(cache_dir / "movies_genres.npy", movies[GENRES].fillna(0).to_numpy(dtype=np.uint8))
+    for col in _MOVIE_TEXT_COLS:
+        np.save(cache_dir / f"movies_{col}.npy", movies[col].fillna("").astype(str).to_numpy(dtype=np.str_))
+
+    # манифест пишется последним: кэш без него считается недописанным
+    with open(cache_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(_source_manifest(), f)
+
+
+def load_binary_cache(cache_dir: Path = CACHE_DIR) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Загружает рейтинги и фильмы из бинарного кэша через np.load(mmap_mode="r").
+
+    Аргументы:
+        cache_dir (Path): каталог кэша
+
+    Возвращает:
+        Optional[Tuple[pd.DataFrame, pd.DataFrame]]: (ratings_df, movies_df) или None, если кэш устарел или отсутствует
+    """
+    try:
+        with open(cache_dir / "manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest != json.loads(json.dumps(_source_manifest())):
+            return None
+
+        def load(name: str) -> np.ndarray:
+            return np.load(cache_dir / f"{name}.npy", mmap_mode="r")
+
+        ratings = pd.DataFrame(
+            {col: load(f"ratings_{col}") for col in ["user_id", "item_id", "rating", "timestamp"]},
+            copy=False,
+        )
+        genres = load("movies_genres")
+        movies_cols: Dict[str, object] = {"movie_id": load("movies_movie_id")}
+        for col in _MOVIE_TEXT_COLS:
+            movies_cols[col] = load(f"movies_{col}")
+        for i, genre in enumerate(GENRES):
+            movies_cols[genre] = genres[:, i]
+        # порядок колонок как у _read_csv_sources
+        order = ["movie_id"] + _MOVIE_TEXT_COLS[:4] + GENRES + _MOVIE_TEXT_COLS[4:]
+        movies = pd.DataFrame(movies_cols)[order]
+    except (OSError, ValueError) as exc:
+        logging.info("Бинарный кэш недоступен (%s)", exc)
+        return None
+
+    for col in _OPTIONAL_TEXT_COLS:
+        movies[col] = movies[col].replace("", np.nan)
     return ratings, movies
 
 
-def build_matrix(ratings: pd.DataFrame, movies: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+def dataset_preprocessing(use_cache: bool = True) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
-    строит матрицу item-user (строки = normalized_title, колонки = user_id)
+    Загружает u.data и u.item и возвращает DataFrame с рейтингами и фильмами.
+    При первом вызове текстовые файлы разбираются и сохраняются в бинарный кэш,
+    дальше загрузка сводится к нескольким np.load(mmap_mode="r").
+    Если кэш записать не удалось (например, каталог данных только для чтения),
+    ошибка логируется, а разобранные данные все равно возвращаются.
+
+    Аргументы:
+        use_cache (bool): использовать ли бинарный кэш (False — всегда разбирать CSV)
+
+    Возвращает:
+        Tuple[pd.DataFrame, pd.DataFrame]: (ratings_df, movies_df)
+    """
+    if use_cache:
+        cached = load_binary_cache()
+        if cached is not None:
+            logging.info("Загрузка рейтингов и фильмов из бинарного кэша (%s)", CACHE_DIR)
+            return cached
+
+    ratings, movies = _read_csv_sources()
+    if use_cache:
+        logging.info("Сохранение бинарного кэша (%s)", CACHE_DIR)
+        try:
+            save_binary_cache(ratings, movies)
+        except OSError as exc:
+            # без манифеста недописанный кэш не будет прочитан, при следующем запуске CSV разберутся снова
+            logging.warning("Не удалось сохранить бинарный кэш (%s): %s", CACHE_DIR, exc)
+    return ratings, movies
+
+
+class RatingMatrix(NamedTuple):
+    # разреженная матрица item x user и соответствие ее строк и столбцов фильмам и пользователям
+    matrix: sparse.csr_matrix    # float64, средняя оценка пары (фильм, пользователь), 0 — оценки нет
+    item_names: List[str]        # строка i — normalized_title (по алфавиту)
+    user_ids: np.ndarray         # столбец j — user_id (по возрастанию)
+
+
+def build_matrix(ratings: pd.DataFrame, movies: pd.DataFrame) -> RatingMatrix:
+    """
+    строит разреженную матрицу item-user (строки = normalized_title, колонки = user_id)
+
+    матрица собирается сразу в CSR из целочисленных кодов названий и пользователей, без плотной
+    сводной таблицы. фильмы с одинаковым normalized_title попадают в одну строку, повторные пары
+    (название, пользователь) усредняются, как раньше в pivot_table(aggfunc="mean");
+    оценки фильмов без названия в movies пропускаются.
 
     аргументы:
         ratings (pd.DataFrame): таблица с рейтингами
         movies (pd.DataFrame): таблица с фильмами
 
     возвращает:
-        Tuple[pd.DataFrame, List[str]]: (item_feature_matrix, item_names)
+        RatingMatrix: (matrix, item_names, user_ids)
     """
     logging.info("Построение (item x user) матрицы...")
-    merged: pd.DataFrame = ratings.merge(
-        movies[["movie_id", "normalized_title"]],
-        left_on="item_id",
-        right_on="movie_id",
-        how="left"
-    )
+    titles = ratings["item_id"].map(movies.drop_duplicates("movie_id").set_index("movie_id")["normalized_title"])
+    known = titles.notna().to_numpy()
+    item_codes, item_names = pd.factorize(titles[known], sort=True)
+    user_codes, user_ids = pd.factorize(ratings["user_id"].to_numpy()[known], sort=True)
+    shape = (len(item_names), len(user_ids))
 
-    item_feature_matrix: pd.DataFrame = merged.pivot_table(
-        index="normalized_title",
-        columns="user_id",
-        values="rating",
-        aggfunc="mean",
-        fill_value=0
-    )
+    # суммы и число оценок каждой пары: повторные пары складываются при переходе в CSR
+    values = ratings["rating"].to_numpy(dtype=np.float64)[known]
+    sums = sparse.csr_matrix((values, (item_codes, user_codes)), shape=shape)
+    counts = sparse.csr_matrix((np.ones_like(values), (item_codes, user_codes)), shape=shape)
+    sums.sum_duplicates()
+    counts.sum_duplicates()
+    matrix = sparse.csr_matrix((sums.data / counts.data, sums.indices, sums.indptr), shape=shape)
 
-    item_names: List[str] = item_feature_matrix.index.tolist()
-    logging.info("Построена матрица: %d items x %d users", *item_feature_matrix.shape)
-    return item_feature_matrix, item_names
+    logging.info("Построена матрица: %d items x %d users (%d оценок)", *matrix.shape, matrix.nnz)
+    return RatingMatrix(matrix, list(item_names), np.asarray(user_ids))
@@ -1,4 +1,4 @@
-from typing import Dict, List, Tuple
+from typing import Optional
 
 from aiogram import F, Router, types
 from aiogram.filters import Command
@@ -6,24 +6,35 @@ from aiogram.types import CallbackQuery
 
 from config import MESSAGES
 from keyboards.inline import navigation_keyboard
-from utils import storage
-from utils.data_loader import (
-    find_movie_by_name,
-    format_movie_line,
-    top_movies_by_genre,
-    list_genres,
-    get_movie_info,
-)
+from utils import executor, pages, warmup
+from utils.cursors import CURSOR_PREFIX, KIND_SIMILAR, decode_cursor
+from utils.data_loader import list_genres
 
 recommendations_router = Router()
 
-USER_RECS: Dict[int, List[Tuple[str, float]]] = {}
-USER_PTR: Dict[int, int] = {}
-BATCH_SIZE = 5
 
+def _not_ready_message() -> Optional[str]:
+    """
+    ключ сообщения, если рекомендации пока недоступны: "loading_data" — подготовка еще идет,
+    "error_data_unavailable" — подготовка упала (иначе бот вечно отвечал бы «загружаю»); None — данные готовы.
+    """
+    if warmup.is_ready():
+        return None
+    if warmup.is_failed():
+        return "error_data_unavailable"
+    return "loading_data"
 
-def _format_batch(recs: List[Tuple[str, float]], offset: int = 0) -> List[str]:
-    return [f"{idx + 1 + offset}. {format_movie_line(item, score)}" for idx, (item, score) in enumerate(recs)]
+
+async def _answer_page(message: types.Message, page: pages.Page) -> None:
+    """ отправляет готовую страницу: заголовок и строки фильмов или только сообщение об ошибке """
+    if not page.lines:
+        await message.answer(MESSAGES[page.message])
+        return
+    header = [MESSAGES[page.message]] if page.message else []
+    await message.answer(
+        "\n".join(header + page.lines),
+        reply_markup=navigation_keyboard(page.cursor),
+    )
 
 
 @recommendations_router.message(Command("recommend"))
@@ -36,36 +47,21 @@ async def handle_recommend(message: types.Message) -> None:
         await message.answer(MESSAGES["ask_movie"])
         return
 
-    movie_key = find_movie_by_name(query)
-    if not movie_key:
-        await message.answer(MESSAGES["error_no_movie"])
-        return
-
-    sim_recs = storage.similar_items(movie_key, top_n=30)
-    if not sim_recs:
-        await message.answer(MESSAGES["error_no_recs"])
+    # матрица сходства еще строится в фоне (или построение упало) — не блокируем цикл событий
+    not_ready = _not_ready_message()
+    if not_ready is not None:
+        await message.answer(MESSAGES[not_ready])
         return
 
-    recs: List[Tuple[str, float]] = []
-    for item, _sim in sim_recs:
-        _, _, avg = get_movie_info(item)
-        recs.append((item, avg))
-
-    USER_RECS[message.from_user.id] = recs
-    USER_PTR[message.from_user.id] = 0
-
-    batch = recs[:BATCH_SIZE]
-    pretty = _format_batch(batch, offset=0)
-    await message.answer(
-        MESSAGES["recommendation_result"] + "\n" + "\n".join(pretty),
-        reply_markup=navigation_keyboard(has_more=len(recs) > BATCH_SIZE),
-    )
+    # поиск и соседи считаются в пуле; при перегрузке — запомненный или популярный ответ
+    page = await executor.run(pages.recommend_response, query, fallback=pages.popular_response)
+    await _answer_page(message, page)
 
 
 @recommendations_router.message(Command("genre"))
 @recommendations_router.message(F.text.lower() == "выбрать жанр")
 async def handle_genre(message: types.Message) -> None:
-    """вернуть топ фильмов по жанру, отсортированных по среднему рейтингу."""
+    """вернуть топ фильмов по жанру (или сочетанию жанров и годам), отсортированных по среднему рейтингу."""
     text = (message.text or "").strip()
     parts = text.split(maxsplit=1)
     genre_query = parts[1].strip() if len(parts) > 1 else ""
@@ -73,55 +69,40 @@ async def handle_genre(message: types.Message) -> None:
     available = ", ".join(list_genres())
     if not genre_query:
         await message.answer(
-            MESSAGES["ask_genre"] + f"\nдступные жанры: {available}"
+            MESSAGES["ask_genre"] + f"\nдступные жанры: {available}\n" + MESSAGES["genre_syntax_hint"]
         )
         return
 
-    top_in_genre = top_movies_by_genre(genre_query, top_n=30)
-    if not top_in_genre:
-        await message.answer(MESSAGES["error_no_genre"])
-        return
+    # расширенный синтаксис: "Comedy+Romance 90s", "War|Western 1950-1970"
+    page = await executor.run(pages.genre_response, genre_query, fallback=pages.popular_response)
+    await _answer_page(message, page)
 
-    USER_RECS[message.from_user.id] = top_in_genre
-    USER_PTR[message.from_user.id] = 0
 
-    batch = top_in_genre[:BATCH_SIZE]
-    pretty = _format_batch(batch, offset=0)
-    await message.answer(
-        MESSAGES["genre_result"] + "\n" + "\n".join(pretty),
-        reply_markup=navigation_keyboard(has_more=len(top_in_genre) > BATCH_SIZE),
-    )
+@recommendations_router.callback_query(F.data.startswith(CURSOR_PREFIX))
+async def handle_more(query: CallbackQuery) -> None:
+    """
+    обработка кнопки «еще»: страница пересчитывается по курсору из callback_data,
+    поэтому кнопка работает после перезапуска бота и на любом его процессе.
+    """
+    await query.answer()
+    # соседи нужны только страницам похожих фильмов; жанровые страницы, как и сам /genre, отдаются сразу
+    cursor = decode_cursor(query.data or "")
+    not_ready = _not_ready_message() if cursor is not None and cursor.kind == KIND_SIMILAR else None
+    if not_ready is not None:
+        await query.message.answer(MESSAGES[not_ready])
+        return
+
+    page = await executor.run(pages.cursor_response, query.data or "", fallback=pages.popular_response)
+    await _answer_page(query.message, page)
 
 
 @recommendations_router.callback_query(F.data.in_(["more", "restart"]))
 async def handle_more_restart(query: CallbackQuery) -> None:
-    """обработка кнопок «еще» и «начать заново»."""
+    """обработка кнопки «начать заново» и кнопок «еще» из сообщений, отправленных до перехода на курсоры."""
     await query.answer()
-    user_id = query.from_user.id
-    action = query.data
-
-    if action == "restart":
-        USER_RECS.pop(user_id, None)
-        USER_PTR.pop(user_id, None)
+    if query.data == "restart":
         await query.message.answer(
             MESSAGES["restart_prompt"],
         )
         return
-
-    recs = USER_RECS.get(user_id, [])
-    if not recs:
-        await query.message.answer(MESSAGES["error_no_recs"])
-        return
-
-    start = USER_PTR.get(user_id, 0) + BATCH_SIZE
-    batch = recs[start : start + BATCH_SIZE]
-    if not batch:
-        await query.message.answer(MESSAGES["error_no_recs"])
-        return
-
-    USER_PTR[user_id] = start
-    pretty = _format_batch(batch, offset=start)
-    await query.message.answer(
-        "\n".join(pretty),
-        reply_markup=navigation_keyboard(has_more=len(recs) > start + BATCH_SIZE),
-    )
+    await query.message.answer(MESSAGES["error_no_recs"])
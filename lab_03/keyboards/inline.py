@@ -1,14 +1,19 @@
+from typing import Optional
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from config import MESSAGES
 
 
-def navigation_keyboard(has_more: bool = False) -> InlineKeyboardMarkup:
-    """ навигационная клавиатура с кнопками 'ещё' и 'начать заново' """
+def navigation_keyboard(next_cursor: Optional[str] = None) -> InlineKeyboardMarkup:
+    """
+    навигационная клавиатура с кнопками 'ещё' и 'начать заново'.
+    кнопка 'ещё' появляется, только если есть курсор следующей страницы (см. utils/cursors.py).
+    """
     rows = []
-    if has_more:
+    if next_cursor:
         rows.append(
-            [InlineKeyboardButton(text=MESSAGES["more_button"], callback_data="more")]
+            [InlineKeyboardButton(text=MESSAGES["more_button"], callback_data=next_cursor)]
         )
     rows.append(
         [InlineKeyboardButton(text=MESSAGES["restart_button"], callback_data="restart")]
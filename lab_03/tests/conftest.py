@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+# тесты запускаются из каталога lab_03 (python -m pytest tests) или из корня репозитория:
+# модули проекта импортируются так же, как в bot.py (from config import ..., from utils import ...)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.schemas import Rating, RatingArrays    # noqa: E402 — после настройки sys.path
+
+
+def random_ratings(
+    seed: int = 0,
+    n_items: int = 40,
+    n_users: int = 30,
+    density: float = 0.3,
+    fractional: bool = False,
+) -> RatingArrays:
+    """
+    воспроизводимые случайные оценки для тестов: каждый пользователь оценивает фильм с вероятностью density.
+
+    аргументы:
+        seed (int): зерно генератора.
+        n_items (int): число фильмов (ID с 0).
+        n_users (int): число пользователей (ID с 1).
+        density (float): доля заполненных ячеек матрицы.
+        fractional (bool): дробные оценки из [1, 5] вместо целых 1..5 —
+                           равные сходства и предсказания (и разный порядок при равенстве) почти невозможны.
+
+    возвращает:
+        RatingArrays: оценки, упорядоченные по фильму, затем по пользователю.
+    """
+    rng = np.random.default_rng(seed)
+    items, users = np.nonzero(rng.random((n_items, n_users)) < density)
+    scores = rng.uniform(1.0, 5.0, len(items)) if fractional else rng.integers(1, 6, len(items))
+    return RatingArrays(
+        user_ids=(users + 1).astype(np.int32),
+        item_ids=items.astype(np.int32),
+        scores=scores.astype(np.float32),
+    )
+
+
+def rating_list(ratings: RatingArrays) -> List[Rating]:
+    """ те же оценки объектами Rating (загрузка по одной, через словари) """
+    return [
+        Rating(user_id=user, item_id=item, score=score)
+        for user, item, score in zip(ratings.user_ids.tolist(), ratings.item_ids.tolist(), ratings.scores.tolist())
+    ]
+
+
+def item_user_dict(ratings: RatingArrays) -> Dict[int, Dict[int, float]]:
+    """ матрица "фильм-пользователь" словарями; при повторе пары остается последняя оценка """
+    matrix: Dict[int, Dict[int, float]] = {}
+    for rating in rating_list(ratings):
+        matrix.setdefault(rating.item_id, {})[rating.user_id] = rating.score
+    return matrix
+
+
+def user_item_dict(ratings: RatingArrays) -> Dict[int, Dict[int, float]]:
+    """ обратный индекс "пользователь-фильм" словарями; при повторе пары остается последняя оценка """
+    matrix: Dict[int, Dict[int, float]] = {}
+    for rating in rating_list(ratings):
+        matrix.setdefault(rating.user_id, {})[rating.item_id] = rating.score
+    return matrix
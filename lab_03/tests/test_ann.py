@@ -0,0 +1,47 @@
+import numpy as np
+
+from conftest import item_user_dict, random_ratings
+from utils import ann, batch, cf, sparse_similarity
+from utils.neighbors import EMPTY, NeighborStore
+
+
+def _matrix(seed: int = 0):
+    return item_user_dict(random_ratings(seed, n_items=60, n_users=40, density=0.15))
+
+
+def test_short_rows_are_not_padded_with_unrelated_items():
+    matrix = _matrix()
+    # мало таблиц и маленькие корзины: у многих фильмов кандидатов меньше K
+    store = ann.build_neighbor_store(matrix, k=30, tables=1, bucket_size=4)
+    exact = sparse_similarity.build_similarity_matrix(matrix)
+    assert (store.indices == EMPTY).any()
+    for row, item in enumerate(store.items):
+        idx, sims = store.neighbors(item)
+        assert EMPTY not in idx.tolist()
+        assert len(set(idx.tolist())) == len(idx)
+        assert row not in idx.tolist()
+        for j, sim in zip(idx.tolist(), sims.tolist()):
+            assert sim == np.float32(exact[item].get(store.items[j], 0.0))
+        # пустые ячейки только в хвосте строки
+        filled = store.indices[row] != EMPTY
+        assert filled.tolist() == sorted(filled.tolist(), reverse=True)
+        assert len(store.top(item, top_n=30)) == int(filled.sum())
+
+
+def test_empty_slots_are_skipped_by_consumers():
+    items = [10, 20, 30]
+    indices = np.array([[1, EMPTY], [EMPTY, EMPTY], [0, 1]], dtype=np.int32)
+    scores = np.array([[0.5, 0.0], [0.0, 0.0], [0.9, 0.2]], dtype=np.float32)
+    store = NeighborStore(items, indices, scores)
+    assert store.top(10) == [(20, 0.5)]
+    assert store.top(20) == []
+    assert store.top(30, top_n=1, offset=1) == [(20, np.float32(0.2))]
+    assert store.neighbors(10, 1)[0].tolist() == [1]
+
+    sims = batch.neighbor_matrix(store)
+    assert sims.nnz == 3
+    assert sims[0, 1] == 0.5 and sims[2, 0] == np.float32(0.9)
+
+    user_items = {1: {10: 4.0}, 2: {20: 5.0}}
+    assert [r.item_id for r in cf.recommend_items_for_user(1, user_items, store)] == [20]
+    assert cf.recommend_items_for_user(2, user_items, store) == []
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from conftest import random_ratings
+from utils import storage as storage_module
+from utils.neighbors import top_columns
+from utils.storage import RecommendationStorage
+
+
+def _storage(model: str) -> RecommendationStorage:
+    storage = RecommendationStorage(workers=1, backend="exact", model=model, mf_factors=4, mf_iterations=5)
+    storage.load_bulk(random_ratings(fractional=True))
+    return storage
+
+
+def _assert_batch_matches_single(storage: RecommendationStorage, k_neighbors: int, top_n: int) -> None:
+    users = sorted(storage.user_item) + [999]    # 999 — пользователь без оценок
+    result = storage.recommend_batch(users, top_n=top_n, k_neighbors=k_neighbors)
+    assert result.user_ids.tolist() == users
+    for row, user in enumerate(users):
+        single = storage.recommend_for_user(user, k_neighbors=k_neighbors, top_n=top_n)
+        found = result.items[row] >= 0
+        assert result.items[row][found].tolist() == [r.item_id for r in single]
+        np.testing.assert_allclose(result.scores[row][found], [r.score for r in single], rtol=1e-5)
+        assert np.isnan(result.scores[row][~found]).all()
+
+
+@pytest.mark.parametrize("model", ["item", "user", "mf"])
+@pytest.mark.parametrize("k_neighbors", [3, 20])
+def test_batch_equals_per_user(model, k_neighbors):
+    _assert_batch_matches_single(_storage(model), k_neighbors=k_neighbors, top_n=7)
+
+
+def test_module_wrapper_passes_k_neighbors(monkeypatch):
+    storage = _storage("item")
+    monkeypatch.setattr(storage_module, "rating_storage", storage)
+    narrow = storage_module.recommend_batch(top_n=5, k_neighbors=2)
+    wide = storage_module.recommend_batch(top_n=5, k_neighbors=50)
+    for row, user in enumerate(narrow.user_ids.tolist()):
+        expected = storage.recommend_for_user(user, k_neighbors=2, top_n=5)
+        assert narrow.items[row][narrow.items[row] >= 0].tolist() == [r.item_id for r in expected]
+    assert not np.array_equal(narrow.items, wide.items)
+
+
+@pytest.mark.parametrize("k", [1, 5, 17])
+def test_top_columns_breaks_ties_at_cutoff_by_column(k):
+    # много равных значений: argpartition сам по себе выбрал бы из равных на границе произвольные
+    values = np.random.default_rng(k).integers(0, 3, (50, 40)).astype(np.float64)
+    values[::7, 5:] = -np.inf
+    cols, scores = top_columns(values, k)
+    expected = np.argsort(-values, axis=1, kind="stable")[:, :k]
+    np.testing.assert_array_equal(cols, expected)
+    np.testing.assert_array_equal(scores, np.take_along_axis(values, expected, axis=1))
@@ -0,0 +1,144 @@
+import pytest
+
+from conftest import random_ratings
+from utils import cf
+from utils.cache import RecommendationCache
+from utils.schemas import Rating, Recommendation
+from utils.storage import RecommendationStorage
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _recs(*items: int):
+    return [Recommendation(item_id=item, score=float(item)) for item in items]
+
+
+def test_entry_expires_after_ttl():
+    clock = FakeClock()
+    cache = RecommendationCache(max_entries=10, ttl=60, clock=clock)
+    cache.put((1, 20, 10), _recs(5))
+    clock.now = 60
+    assert cache.get((1, 20, 10)) == _recs(5)
+    clock.now = 60.5
+    assert cache.get((1, 20, 10)) is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_zero_ttl_never_expires():
+    clock = FakeClock()
+    cache = RecommendationCache(max_entries=10, ttl=0, clock=clock)
+    cache.put((1, 20, 10), _recs(5))
+    clock.now = 1e9
+    assert cache.get((1, 20, 10)) == _recs(5)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RecommendationCache(max_entries=2, ttl=0)
+    cache.put((1, 20, 10), _recs(1))
+    cache.put((2, 20, 10), _recs(2))
+    assert cache.get((1, 20, 10)) == _recs(1)    # пользователь 1 теперь использован последним
+    cache.put((3, 20, 10), _recs(3))
+    assert cache.get((2, 20, 10)) is None
+    assert cache.get((1, 20, 10)) == _recs(1)
+    assert cache.get((3, 20, 10)) == _recs(3)
+    assert cache.stats()["evictions"] == 1
+    # сброс по пользователю не находит вытесненную запись
+    assert cache.invalidate_users([2]) == 0
+
+
+def test_invalidate_users_drops_all_keys_of_user():
+    cache = RecommendationCache(max_entries=10, ttl=0)
+    cache.put((1, 20, 10), _recs(1))
+    cache.put((1, 5, 3), _recs(1))
+    cache.put((2, 20, 10), _recs(2))
+    assert cache.invalidate_users([1]) == 2
+    assert cache.get((1, 5, 3)) is None
+    assert cache.get((2, 20, 10)) == _recs(2)
+
+
+def test_cached_value_is_a_copy():
+    cache = RecommendationCache(max_entries=10, ttl=0)
+    value = _recs(1, 2)
+    cache.put((1, 20, 10), value)
+    value.append(Recommendation(item_id=3, score=3.0))
+    cache.get((1, 20, 10)).clear()
+    assert cache.get((1, 20, 10)) == _recs(1, 2)
+
+
+def test_disabled_cache_stores_nothing():
+    cache = RecommendationCache(max_entries=0, ttl=0)
+    cache.put((1, 20, 10), _recs(1))
+    assert len(cache) == 0 and cache.get((1, 20, 10)) is None
+
+
+def _ratings(seed: int = 0):
+    return random_ratings(seed, n_items=25)
+
+
+def _fresh(storage: RecommendationStorage, user_id: int):
+    """ рекомендации мимо кэша по текущим соседям и оценкам """
+    return cf.recommend_items_for_user(user_id, storage.user_item, storage.neighbors, 20, 10)
+
+
+def _warm(storage: RecommendationStorage):
+    users = sorted(storage.user_item)
+    for user in users:
+        storage.recommend_for_user(user)
+    assert len(storage.cache) == len(users)
+    return users
+
+
+def _assert_not_stale(storage: RecommendationStorage, users) -> None:
+    for user in users:
+        assert storage.recommend_for_user(user) == _fresh(storage, user)
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_add_ratings_does_not_serve_stale_recommendations(incremental):
+    storage = RecommendationStorage(incremental=incremental, workers=1, backend="exact", model="item")
+    storage.load_bulk(_ratings())
+    users = _warm(storage)
+    hits = storage.cache_stats()["hits"]
+
+    changed = users[0]
+    storage.add_ratings([Rating(changed, 0, 1.0), Rating(changed, 24, 5.0), Rating(users[1], 3, 2.0)])
+    # записи измененных пользователей уже сброшены
+    assert storage.cache.invalidate_users([changed, users[1]]) == 0
+    _assert_not_stale(storage, users)
+    # записи остальных пользователей, чьи соседи не изменились, продолжают обслуживаться из кэша
+    assert storage.cache_stats()["hits"] > hits
+
+
+def test_recompute_similarity_does_not_serve_stale_recommendations():
+    storage = RecommendationStorage(workers=1, backend="exact", model="item")
+    storage.load_bulk(_ratings())
+    users = _warm(storage)
+    # без инкрементального режима соседи меняются только при полном пересчете
+    storage.add_ratings([Rating(users[2], item, 5.0 if item % 2 else 1.0) for item in range(25)])
+    storage.recompute_similarity()
+    _assert_not_stale(storage, users)
+
+
+def test_load_clears_cache():
+    storage = RecommendationStorage(workers=1, backend="exact", model="item")
+    storage.load_bulk(_ratings(0))
+    users = _warm(storage)
+    storage.load_bulk(_ratings(1))
+    assert len(storage.cache) == 0
+    _assert_not_stale(storage, users)
+
+
+@pytest.mark.parametrize("model", ["user", "mf"])
+def test_model_refit_clears_cache(model):
+    storage = RecommendationStorage(workers=1, backend="exact", model=model, mf_factors=4, mf_iterations=3)
+    storage.load_bulk(_ratings())
+    _warm(storage)
+    storage.recompute_similarity()
+    assert len(storage.cache) == 0
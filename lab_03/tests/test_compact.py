@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+
+from conftest import random_ratings
+from dataset import movies_file_for, read_movies
+from utils import sparse_similarity
+from utils.compact import CompactMatrix, build_rating_matrices, ratings_from_matrix
+from utils.schemas import Rating, RatingArrays
+from utils.storage import RecommendationStorage
+
+
+def _arrays(seed: int) -> RatingArrays:
+    """ два набора случайных оценок вперемешку: часть пар оценена дважды """
+    first = random_ratings(seed, n_items=25, n_users=40, density=0.2)
+    second = random_ratings(seed + 100, n_items=25, n_users=40, density=0.2)
+    order = np.random.default_rng(seed).permutation(len(first) + len(second))
+    return RatingArrays(
+        user_ids=np.concatenate([first.user_ids, second.user_ids])[order],
+        item_ids=np.concatenate([first.item_ids, second.item_ids])[order],
+        scores=np.concatenate([first.scores, second.scores])[order],
+    )
+
+
+def _dicts(ratings: RatingArrays):
+    item_user, user_item = {}, {}
+    for user, item, score in zip(ratings.user_ids.tolist(), ratings.item_ids.tolist(), ratings.scores.tolist()):
+        item_user.setdefault(item, {})[user] = score
+        user_item.setdefault(user, {})[item] = score
+    return item_user, user_item
+
+
+def _as_dict(matrix) -> dict:
+    return {key: dict(matrix[key]) for key in matrix}
+
+
+def test_matrices_match_dicts_with_last_rating_winning():
+    ratings = _arrays(0)
+    item_user, user_item = build_rating_matrices(ratings)
+    expected_items, expected_users = _dicts(ratings)
+    assert _as_dict(item_user) == expected_items
+    assert _as_dict(user_item) == expected_users
+    assert len(item_user) == len(expected_items)
+    assert 0 in item_user and -1 not in item_user
+    assert item_user.get(-1) is None
+
+
+def test_base_rows_are_read_only_and_setdefault_makes_them_writable():
+    item_user, _ = build_rating_matrices(_arrays(1))
+    item = next(iter(item_user))
+    with pytest.raises(TypeError):
+        item_user[item][999] = 5.0
+    item_user.setdefault(item, {})[999] = 5.0
+    assert item_user[item][999] == 5.0
+    assert not item_user.pristine
+
+
+def test_mutations_reach_triples_and_csr():
+    ratings = _arrays(2)
+    item_user, _ = build_rating_matrices(ratings)
+    expected, _ = _dicts(ratings)
+    for matrix in (item_user, expected):
+        matrix.setdefault(3, {})[7] = 1.0
+        matrix.setdefault(100, {})[1] = 4.0
+        matrix[5] = {2: 2.0}
+        del matrix[6]
+    assert list(item_user) == [key for key in sorted(expected) if key != 100] + [100]
+    assert _as_dict(item_user) == expected
+    assert len(item_user) == len(expected)
+    with pytest.raises(KeyError):
+        del item_user[6]
+
+    arrays = ratings_from_matrix(item_user)
+    got = {(u, i, s) for u, i, s in zip(arrays.user_ids.tolist(), arrays.item_ids.tolist(), arrays.scores.tolist())}
+    assert got == {(u, i, s) for i, users in expected.items() for u, s in users.items()}
+
+    csr, items = sparse_similarity.build_item_user_csr(item_user)
+    ref, ref_items = sparse_similarity.build_item_user_csr({item: expected[item] for item in items})
+    assert items == ref_items
+    assert sorted(csr.sum(axis=1).A1.tolist()) == sorted(ref.sum(axis=1).A1.tolist())
+    sims = sparse_similarity.build_similarity_matrix(item_user)
+    ref_sims = sparse_similarity.build_similarity_matrix({item: expected[item] for item in items})
+    assert sims.keys() == ref_sims.keys()
+    for item, row in ref_sims.items():
+        assert sims[item] == pytest.approx(row, abs=1e-9)
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_storage_loaded_from_arrays_matches_dict_storage(incremental):
+    ratings = _arrays(3)
+    # тот же порядок фильмов, что у CSR: при равных сходствах соседи выбираются по порядку строк
+    order = np.lexsort((ratings.user_ids, ratings.item_ids))
+    compact = RecommendationStorage(incremental=incremental, workers=1, backend="exact", model="item")
+    compact.load_chunks([RatingArrays(ratings.user_ids[:150], ratings.item_ids[:150], ratings.scores[:150]),
+                         RatingArrays(ratings.user_ids[150:], ratings.item_ids[150:], ratings.scores[150:])])
+    plain = RecommendationStorage(incremental=incremental, workers=1, backend="exact", model="item")
+    _, expected = _dicts(ratings)
+    plain.load_bulk(
+        Rating(user, item, expected[user][item])
+        for user, item in dict.fromkeys(zip(ratings.user_ids[order].tolist(), ratings.item_ids[order].tolist()))
+    )
+    assert isinstance(compact.item_user, CompactMatrix)
+
+    updates = [Rating(1, 3, 5.0), Rating(1, 30, 4.0), Rating(500, 0, 2.0)]
+    for storage in (compact, plain):
+        storage.add_ratings(updates)
+    for storage in (compact, plain):
+        storage.recompute_similarity()
+    assert compact.neighbors.items == plain.neighbors.items
+    np.testing.assert_array_equal(compact.neighbors.indices, plain.neighbors.indices)
+    np.testing.assert_allclose(compact.neighbors.scores, plain.neighbors.scores, atol=1e-6)
+    for user in sorted(plain.user_item):
+        assert compact.recommend_for_user(user) == plain.recommend_for_user(user)
+
+
+def test_movies_file_follows_ratings_file(tmp_path):
+    assert movies_file_for(tmp_path / "u.data") == tmp_path / "u.item"
+    assert movies_file_for(tmp_path / "ratings.dat") == tmp_path / "movies.dat"
+    assert movies_file_for(tmp_path / "ratings.csv") == tmp_path / "movies.csv"
+
+
+def test_read_movies_dat_and_csv(tmp_path):
+    dat = tmp_path / "movies.dat"
+    dat.write_text(
+        "1::Toy Story (1995)::Animation|Children's|Comedy\n"
+        "3000::Star Wars: Episode IV - A New Hope (1977)::Action|Sci-Fi\n",
+        encoding="latin-1",
+    )
+    csv = tmp_path / "movies.csv"
+    csv.write_text(
+        "movieId,title,genres\n"
+        "1,Toy Story (1995),Adventure|Animation|Children|Comedy|Fantasy|IMAX\n"
+        '193609,"Andrew Dice Clay: Dice Rules (1991)",(no genres listed)\n',
+        encoding="utf-8",
+    )
+    movies = read_movies(dat)
+    assert movies["movie_id"].tolist() == [1, 3000]
+    assert movies["title"].tolist()[1] == "Star Wars: Episode IV - A New Hope (1977)"
+    assert movies["year"].tolist() == ["1995", "1977"]
+    assert movies["normalized_title"].tolist()[0] == "toy story"
+    assert movies.loc[0, ["Animation", "Children's", "Comedy", "Action"]].tolist() == [1, 1, 1, 0]
+
+    movies = read_movies(csv)
+    assert movies["movie_id"].tolist() == [1, 193609]
+    assert movies.loc[0, ["Adventure", "Children's", "Fantasy", "unknown"]].tolist() == [1, 1, 1, 0]
+    assert movies.loc[1, "unknown"] == 1
+    assert movies["year"].tolist() == ["1995", "1991"]
@@ -0,0 +1,13 @@
+import dataset
+
+
+def test_parsed_data_is_returned_when_cache_cannot_be_written(monkeypatch, caplog):
+    def read_only(*args, **kwargs):
+        raise PermissionError("read-only file system")
+
+    monkeypatch.setattr(dataset, "load_binary_cache", lambda *args, **kwargs: None)
+    monkeypatch.setattr(dataset, "save_binary_cache", read_only)
+    ratings, movies = dataset.dataset_preprocessing()
+    assert len(ratings) == 100_000
+    assert len(movies) == 1682
+    assert "Не удалось сохранить бинарный кэш" in caplog.text
@@ -0,0 +1,21 @@
+import pytest
+
+from utils.genre_index import GenreQuery, parse_genre_query
+
+
+@pytest.mark.parametrize("text", ["Comedy+Romance 90s", "Comedy Romance 90s", "comedy + romance 90-е", "Comedy +Romance 1990-1999"])
+def test_plus_and_space_separate_genres_for_all_match(text):
+    query = parse_genre_query(text)
+    assert [g.lower() for g in query.genres] == ["comedy", "romance"]
+    assert query.match_all
+    assert (query.year_from, query.year_to) == (1990, 1999)
+
+
+@pytest.mark.parametrize("text", ["War|Western", "War | Western", "War |Western"])
+def test_pipe_switches_to_any_match(text):
+    assert parse_genre_query(text) == GenreQuery(["War", "Western"], False, None, None)
+
+
+def test_single_genre_and_years_only():
+    assert parse_genre_query("Sci-Fi") == GenreQuery(["Sci-Fi"], True, None, None)
+    assert parse_genre_query("1995") == GenreQuery([], True, 1995, 1995)
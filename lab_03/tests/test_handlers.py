@@ -0,0 +1,61 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from config import MESSAGES
+from handlers import recommendations
+from utils.cursors import KIND_GENRE, KIND_SIMILAR, encode_cursor
+from utils.pages import Page
+
+
+class FakeMessage:
+    def __init__(self) -> None:
+        self.sent = []
+
+    async def answer(self, text: str, **kwargs) -> None:
+        self.sent.append(text)
+
+
+def _click(data: str) -> FakeMessage:
+    message = FakeMessage()
+
+    async def answer() -> None:
+        pass
+
+    asyncio.run(recommendations.handle_more(SimpleNamespace(data=data, message=message, answer=answer)))
+    return message
+
+
+@pytest.fixture
+def warming_up(monkeypatch):
+    """ подготовка данных еще идет; пул отвечает готовой страницей и запоминает запросы """
+    calls = []
+
+    async def run(fn, *args, fallback=None):
+        calls.append(args)
+        return Page("", ["1. Toy Story (1995) — 4.00"])
+
+    monkeypatch.setattr(recommendations.warmup, "is_ready", lambda: False)
+    monkeypatch.setattr(recommendations.warmup, "is_failed", lambda: False)
+    monkeypatch.setattr(recommendations.executor, "run", run)
+    return calls
+
+
+def test_genre_cursor_is_served_during_warmup(warming_up):
+    data = encode_cursor(KIND_GENRE, "1&-", 10)
+    message = _click(data)
+    assert warming_up == [(data,)]
+    assert message.sent == ["1. Toy Story (1995) — 4.00"]
+
+
+def test_similar_cursor_waits_for_warmup(warming_up):
+    message = _click(encode_cursor(KIND_SIMILAR, "42", 10))
+    assert warming_up == []
+    assert message.sent == [MESSAGES["loading_data"]]
+
+
+def test_similar_cursor_reports_failed_warmup(warming_up, monkeypatch):
+    monkeypatch.setattr(recommendations.warmup, "is_failed", lambda: True)
+    message = _click(encode_cursor(KIND_SIMILAR, "42", 10))
+    assert message.sent == [MESSAGES["error_data_unavailable"]]
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from conftest import random_ratings, rating_list
+from utils import incremental
+from utils.schemas import Rating
+from utils.storage import RecommendationStorage
+
+
+def _ratings(seed: int):
+    # по одной оценке: инкрементальный пересчет проверяется на словарном хранилище
+    return rating_list(random_ratings(seed, n_items=30, n_users=50))
+
+
+def _storage(seed: int = 0) -> RecommendationStorage:
+    storage = RecommendationStorage(incremental=True, workers=1, backend="exact", model="item")
+    storage.load_bulk(_ratings(seed))
+    return storage
+
+
+def _state(storage: RecommendationStorage):
+    users = sorted(storage.user_item)
+    recs = {user: [(r.item_id, r.score) for r in storage.recommend_for_user(user)] for user in users}
+    neighbors = storage.neighbors
+    return list(neighbors.items), neighbors.indices.copy(), neighbors.scores.copy(), recs
+
+
+def _assert_matches_rebuild(storage: RecommendationStorage) -> None:
+    """ состояние после инкрементальных обновлений совпадает с полным пересчетом тех же оценок """
+    items, indices, scores, recs = _state(storage)
+    storage.recompute_similarity()
+    full_items, full_indices, full_scores, full_recs = _state(storage)
+    assert items == full_items
+    np.testing.assert_allclose(scores, full_scores, atol=1e-6)
+    np.testing.assert_array_equal(indices, full_indices)
+    assert recs.keys() == full_recs.keys()
+    for user, expected in full_recs.items():
+        assert [item for item, _ in recs[user]] == [item for item, _ in expected], user
+        np.testing.assert_allclose([s for _, s in recs[user]], [s for _, s in expected], atol=1e-6)
+
+
+def test_single_rating():
+    storage = _storage()
+    storage.recommend_for_user(0)    # заполняет кэш: он тоже должен сброситься
+    storage.add_rating(Rating(user_id=0, item_id=3, score=5.0))
+    _assert_matches_rebuild(storage)
+
+
+def test_batched_ratings():
+    storage = _storage(1)
+    rng = np.random.default_rng(10)
+    batch = [
+        Rating(user_id=int(rng.integers(0, 50)), item_id=int(rng.integers(0, 30)), score=float(rng.integers(1, 6)))
+        for _ in range(40)
+    ]
+    storage.add_ratings(batch)
+    _assert_matches_rebuild(storage)
+
+
+def test_changed_rating():
+    storage = _storage(2)
+    user_id, ratings = next(iter(storage.user_item.items()))
+    item_id, old = next(iter(ratings.items()))
+    storage.add_rating(Rating(user_id=user_id, item_id=item_id, score=1.0 if old > 3 else 5.0))
+    # повторное изменение той же клетки в одной пачке
+    storage.add_ratings([Rating(user_id, item_id, 2.0), Rating(user_id, item_id, 4.0)])
+    _assert_matches_rebuild(storage)
+
+
+def test_new_item():
+    storage = _storage(3)
+    storage.add_ratings([Rating(user_id=user, item_id=100, score=float(1 + user % 5)) for user in range(0, 50, 3)])
+    assert 100 in storage.neighbors
+    _assert_matches_rebuild(storage)
+
+
+def test_new_user():
+    storage = _storage(4)
+    storage.add_ratings([Rating(user_id=999, item_id=item, score=float(1 + item % 5)) for item in range(0, 30, 2)])
+    assert storage.recommend_for_user(999)
+    _assert_matches_rebuild(storage)
+
+
+def test_catalog_limit_disables_incremental_mode():
+    storage = RecommendationStorage(incremental=True, workers=1, backend="exact", model="item", incremental_max_items=10)
+    storage.load_bulk(_ratings(5))
+    assert storage.stats is None
+    assert storage.neighbors is not None and len(storage.neighbors) == 30
+
+    storage = RecommendationStorage(incremental=True, workers=1, backend="exact", model="item", incremental_max_items=30)
+    storage.load_bulk(_ratings(5))
+    assert storage.stats is not None
+    # новый фильм выводит каталог за предел: статистики освобождаются, оценка все равно записана
+    storage.add_rating(Rating(user_id=0, item_id=100, score=4.0))
+    assert storage.stats is None
+    assert storage.user_item[0][100] == 4.0
+
+
+def test_pair_statistics_refuse_large_catalog():
+    with pytest.raises(ValueError):
+        incremental.check_catalog_size(11, 10)
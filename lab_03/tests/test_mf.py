@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from conftest import random_ratings
+from utils import mf
+from utils.schemas import Rating, RatingArrays
+from utils.storage import RecommendationStorage
+
+
+def _low_rank(seed: int = 0, n_users: int = 80, n_items: int = 50, rank: int = 3, density: float = 0.4):
+    """ оценки 3 + U·Vᵀ + шум на тех же ячейках, что у conftest.random_ratings """
+    cells = random_ratings(seed, n_items=n_items, n_users=n_users, density=density)
+    rng = np.random.default_rng(seed)
+    full = 3.0 + rng.normal(0, 0.6, (n_users, rank)) @ rng.normal(0, 0.6, (n_items, rank)).T
+    full += rng.normal(0, 0.1, full.shape)
+    scores = full[cells.user_ids - 1, cells.item_ids]
+    return RatingArrays(cells.user_ids, cells.item_ids, np.clip(scores, 1.0, 5.0).astype(np.float32))
+
+
+def _user_ratings(ratings: RatingArrays, user_id: int):
+    own = ratings.user_ids == user_id
+    return dict(zip(ratings.item_ids[own].tolist(), ratings.scores[own].tolist()))
+
+
+def test_rmse_decreases_over_iterations():
+    ratings = _low_rank()
+    errors = [
+        mf.rmse(mf.train_als(ratings, factors=3, iterations=n, regularization=0.05), ratings)
+        for n in (1, 2, 3, 5, 10)
+    ]
+    assert all(later <= earlier + 1e-6 for earlier, later in zip(errors, errors[1:]))
+    assert errors[-1] < 0.5 * errors[0]
+    # шум в данных — 0.1, модель подходит к нему
+    assert errors[-1] < 0.2
+
+
+def test_training_is_deterministic():
+    ratings = _low_rank()
+    first = mf.train_als(ratings, factors=3, iterations=3, seed=1)
+    second = mf.train_als(ratings, factors=3, iterations=3, seed=1)
+    np.testing.assert_array_equal(first.user_factors, second.user_factors)
+    np.testing.assert_array_equal(first.item_factors, second.item_factors)
+
+
+def test_held_out_rmse_beats_global_mean():
+    ratings = _low_rank(density=0.5)
+    order = np.random.default_rng(1).permutation(len(ratings))
+    cut = int(0.8 * len(order))
+    train = RatingArrays(*(array[order[:cut]] for array in (ratings.user_ids, ratings.item_ids, ratings.scores)))
+    test = RatingArrays(*(array[order[cut:]] for array in (ratings.user_ids, ratings.item_ids, ratings.scores)))
+    model = mf.train_als(train, factors=3, iterations=10, regularization=0.05)
+    baseline = float(np.sqrt(np.mean((test.scores - train.scores.mean()) ** 2)))
+    assert mf.rmse(model, test) < 0.6 * baseline
+
+
+def test_fold_in_reproduces_trained_user():
+    ratings = _low_rank()
+    model = mf.train_als(ratings, factors=3, iterations=20, regularization=0.05)
+    row = model.user_index[1]
+    factors, bias = model.user_factors[row].copy(), float(model.user_bias[row])
+
+    model.fold_in(1, _user_ratings(ratings, 1))
+    np.testing.assert_allclose(model.user_factors[row], factors, atol=1e-2)
+    assert model.user_bias[row] == pytest.approx(bias, abs=1e-2)
+
+    # новый пользователь с теми же оценками получает тот же вектор
+    model.fold_in(1000, _user_ratings(ratings, 1))
+    new_row = model.user_index[1000]
+    np.testing.assert_allclose(model.user_factors[new_row], model.user_factors[row], atol=1e-6)
+    assert model.recommend(1000, _user_ratings(ratings, 1), 5) == model.recommend(1, _user_ratings(ratings, 1), 5)
+
+
+def test_storage_folds_in_new_user_without_refit():
+    ratings = _low_rank()
+    storage = RecommendationStorage(workers=1, backend="exact", model="mf", mf_factors=3, mf_iterations=10)
+    storage.load_bulk(ratings)
+    factors = storage.factors
+    assert storage.recommend_for_user(1000) == []
+
+    storage.add_ratings(Rating(1000, item, score) for item, score in _user_ratings(ratings, 1).items())
+    assert storage.factors is factors
+    rated = set(_user_ratings(ratings, 1))
+    recs = storage.recommend_for_user(1000, top_n=5)
+    assert [r.item_id for r in recs] == [r.item_id for r in storage.recommend_for_user(1, top_n=5)]
+    assert not rated & {r.item_id for r in recs}
@@ -0,0 +1,27 @@
+import numpy as np
+
+import bot
+from utils import snapshot, storage
+from utils.neighbors import EMPTY, NeighborStore
+from utils.storage import RecommendationStorage
+
+
+def test_worker_started_before_snapshot_loads_it_on_first_use(tmp_path, monkeypatch):
+    # процесс пула, созданный во время прогрева (например, запросом /genre), снимка еще не видит
+    monkeypatch.setattr(bot, "SNAPSHOT_DIR", tmp_path)
+    monkeypatch.setattr(bot, "load_dataset", lambda: None)
+    monkeypatch.setattr(storage, "rating_storage", RecommendationStorage())
+    monkeypatch.setattr(storage, "_neighbors_source", None)
+    bot.init_offload_worker("fp")
+    assert storage.rating_storage.neighbors is None
+    assert storage.similar_items(10) == []
+
+    # прогрев записал снимок: следующий запрос похожих фильмов подхватывает его без перезапуска пула
+    store = NeighborStore(
+        [10, 20, 30],
+        np.array([[1, 2], [0, EMPTY], [0, 1]], dtype=np.int32),
+        np.array([[0.9, 0.5], [0.9, 0.0], [0.5, 0.3]], dtype=np.float32),
+    )
+    snapshot.save_snapshot(tmp_path, "fp", store)
+    assert storage.similar_items(10) == [(20, np.float32(0.9)), (30, np.float32(0.5))]
+    assert storage.rating_storage.neighbors is not None
@@ -0,0 +1,48 @@
+from utils.search_index import TIER_EXACT, TIER_PREFIX, TIER_SUBSTRING, TIER_TOKEN, TitleSearchIndex
+
+TITLES = [
+    "army of darkness",      # 0
+    "star wars",             # 1
+    "godfather, the",        # 2
+    "return of the jedi",    # 3
+    "starship troopers",     # 4
+    "wars of the roses",     # 5
+    "star wars",             # 6 — другой фильм с тем же названием
+]
+POPULARITY = [10, 500, 400, 300, 50, 5, 1]
+
+
+def _index() -> TitleSearchIndex:
+    return TitleSearchIndex(TITLES, POPULARITY)
+
+
+def test_every_substring_match_is_a_candidate():
+    index = _index()
+    for needle in ["ar", "a", "the", "rs", "f d", "wars", "oo"]:
+        expected = {i for i, title in enumerate(TITLES) if needle in title}
+        found = {i for i, _ in index.search(needle, limit=len(TITLES))}
+        assert expected <= found, needle
+
+
+def test_short_infix_query_finds_title_through_substring_tier():
+    # "ar" внутри "star wars": триграммы с отступами почти не совпадают, находит уровень подстроки
+    results = dict(_index().search("ar", limit=len(TITLES)))
+    assert TIER_SUBSTRING <= results[1] < TIER_TOKEN
+    assert results[0] >= TIER_PREFIX
+
+
+def test_tiers_rank_exact_prefix_token_substring_then_fuzzy():
+    index = _index()
+    assert index.search("star wars", limit=2) == [(1, TIER_EXACT + 1.0), (6, TIER_EXACT + 1.0)]
+    # внутри уровня префикса ближе по триграммам, при равенстве — популярнее
+    top = [i for i, _ in index.search("star", limit=3)]
+    assert top == [1, 6, 4]
+    token = dict(index.search("wars star", limit=len(TITLES)))
+    assert TIER_TOKEN <= token[1] < TIER_PREFIX
+    # опечатка находится только по триграммам
+    assert index.search("godfathr", limit=1)[0][0] == 2
+
+
+def test_no_match_returns_empty():
+    assert _index().search("zzzz") == []
+    assert _index().search("") == []
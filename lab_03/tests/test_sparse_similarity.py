@@ -0,0 +1,71 @@
+import pytest
+
+from conftest import item_user_dict, random_ratings
+from utils import cf, sparse_similarity
+from utils.cf import ItemUserMatrix
+
+
+def _random_matrix(seed: int) -> ItemUserMatrix:
+    """ случайная матрица "фильм-пользователь" с целыми оценками 1..5 """
+    return item_user_dict(random_ratings(seed, n_items=40, n_users=60, density=0.2))
+
+
+def _assert_same(matrix: ItemUserMatrix) -> None:
+    expected = cf.build_similarity_matrix(matrix)
+    actual = sparse_similarity.build_similarity_matrix(matrix)
+    assert actual.keys() == expected.keys()
+    for item, row in expected.items():
+        assert actual[item].keys() == row.keys()
+        for other, sim in row.items():
+            assert actual[item][other] == pytest.approx(sim, abs=1e-9), (item, other)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_matches_dict_pearson_on_random_data(seed):
+    _assert_same(_random_matrix(seed))
+
+
+def test_fewer_than_two_common_users():
+    matrix = {
+        0: {1: 5.0, 2: 3.0},
+        1: {2: 4.0, 3: 1.0},    # с фильмом 0 общий только пользователь 2
+        2: {4: 2.0, 5: 5.0},    # общих пользователей нет
+    }
+    _assert_same(matrix)
+    sims = sparse_similarity.build_similarity_matrix(matrix)
+    assert sims[0][1] == 0.0
+    assert sims[0][2] == 0.0
+
+
+def test_zero_variance_items():
+    matrix = {
+        0: {1: 4.0, 2: 4.0, 3: 4.0},    # все оценки одинаковые
+        1: {1: 1.0, 2: 3.0, 3: 5.0},
+        2: {1: 2.0, 2: 2.0, 3: 5.0},
+    }
+    _assert_same(matrix)
+    sims = sparse_similarity.build_similarity_matrix(matrix)
+    assert sims[0][1] == 0.0
+    assert sims[1][0] == 0.0
+
+
+def test_explicit_zero_ratings():
+    # нулевая оценка — это оценка: пользователь входит в число общих, а не выпадает из разреженной матрицы
+    matrix = {
+        0: {1: 0.0, 2: 3.0, 3: 5.0},
+        1: {1: 0.0, 2: 4.0, 3: 4.0},
+        2: {1: 5.0, 2: 0.0},
+        3: {1: 2.0, 2: 0.0, 3: 0.0},
+    }
+    _assert_same(matrix)
+    ratings, _items = sparse_similarity.build_item_user_csr(matrix)
+    assert ratings.nnz == sum(len(users) for users in matrix.values())
+
+
+def test_random_data_with_zeros_and_constant_rows():
+    matrix = _random_matrix(3)
+    matrix[0] = {user: 3.0 for user in matrix[0]}
+    for users in list(matrix.values())[1:10]:
+        for user in list(users)[:2]:
+            users[user] = 0.0
+    _assert_same(matrix)
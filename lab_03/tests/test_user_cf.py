@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from conftest import random_ratings, user_item_dict
+from utils import user_cf
+
+
+def _ratings(seed: int = 0, n_users: int = 12, n_items: int = 9):
+    return random_ratings(seed, n_items=n_items, n_users=n_users, density=0.5, fractional=True)
+
+
+def _naive_predictions(user_items, user_id: int, ratings, items, k: int):
+    """ прямой расчет по определению: центрированный косинус по всем фильмам, top-K соседей, взвешенное среднее """
+    def centered(values):
+        mean = sum(values.values()) / len(values) if values else 0.0
+        return mean, {item: score - mean for item, score in values.items()}
+
+    mean_u = sum(ratings.values()) / len(ratings)    # средняя — по всем оценкам, включая фильмы вне модели
+    own = {item: score - mean_u for item, score in ratings.items() if item in items}
+    norm_u = np.sqrt(sum(value * value for value in own.values()))
+
+    sims = []
+    for other, other_ratings in user_items.items():
+        if other == user_id:
+            continue
+        _, theirs = centered(other_ratings)
+        norm_v = np.sqrt(sum(value * value for value in theirs.values()))
+        dot = sum(value * theirs.get(item, 0.0) for item, value in own.items())
+        sim = dot / (norm_u * norm_v) if norm_u > 0 and norm_v > 0 else 0.0
+        sims.append((sim, other))
+    sims.sort(reverse=True)
+    neighbors = [(sim, other) for sim, other in sims[:k] if sim > 0]
+
+    predicted = {}
+    for item in items:
+        if item in ratings:
+            continue
+        num = den = 0.0
+        for sim, other in neighbors:
+            other_ratings = user_items[other]
+            if item in other_ratings:
+                other_mean = sum(other_ratings.values()) / len(other_ratings)
+                num += sim * (other_ratings[item] - other_mean)
+                den += sim
+        if den > 0:
+            predicted[item] = mean_u + num / den
+    return predicted
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("k", [1, 3, 20])
+def test_predictions_match_naive_loop(seed, k):
+    ratings = _ratings(seed)
+    user_items = user_item_dict(ratings)
+    model = user_cf.build_user_model(ratings)
+    items = model.item_ids.tolist()
+    # 100 — новый пользователь, которого нет в модели; фильм 50 модели неизвестен
+    queries = dict(user_items)
+    queries[100] = {items[0]: 5.0, items[1]: 1.5, items[2]: 3.0, 50: 4.0}
+    users = sorted(queries)
+
+    predicted = user_cf.predict_block(model, users, queries, k_neighbors=k)
+    for row, user in enumerate(users):
+        expected = _naive_predictions(user_items, user, queries[user], items, k)
+        got = {item: value for item, value in zip(items, predicted[row].tolist()) if np.isfinite(value)}
+        assert got.keys() == expected.keys()
+        for item, value in expected.items():
+            assert got[item] == pytest.approx(value, abs=1e-5)
+
+
+def test_recommend_matches_naive_ranking():
+    ratings = _ratings(3, n_users=15, n_items=12)
+    user_items = user_item_dict(ratings)
+    model = user_cf.build_user_model(ratings)
+    for user, ratings in user_items.items():
+        expected = _naive_predictions(user_items, user, ratings, model.item_ids.tolist(), 5)
+        ranking = sorted(expected.items(), key=lambda pair: (-pair[1], pair[0]))[:4]
+        recs = model.recommend(user, ratings, k_neighbors=5, top_n=4)
+        assert [r.item_id for r in recs] == [item for item, _ in ranking]
+        assert [r.score for r in recs] == pytest.approx([min(max(s, 1.0), 5.0) for _, s in ranking], abs=1e-5)
+
+        batch = user_cf.recommend_batch(model, [user], user_items, k_neighbors=5, top_n=4)
+        found = batch.items[0] >= 0
+        assert batch.items[0][found].tolist() == [r.item_id for r in recs]
@@ -0,0 +1,304 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import svds
+
+from .cf import ItemUserMatrix
+from .neighbors import EMPTY, NeighborStore
+from .sparse_similarity import build_item_user_csr, pearson_from_stats
+
+# число хеш-таблиц LSH: главный регулятор полноты (больше таблиц — больше кандидатов и выше recall)
+DEFAULT_TABLES = 16
+# средний размер корзины, под который подбирается число бит сигнатуры
+DEFAULT_BUCKET_SIZE = 32
+# размерность вложений фильмов, по которым строятся сигнатуры
+DEFAULT_RANK = 16
+# сколько фильмов за раз разворачивается в плотную таблицу при точном пересчете кандидатов
+DEFAULT_BLOCK_SIZE = 64
+# сколько оценок кандидатов разворачивается за один проход (ограничивает пиковую память)
+DEFAULT_MAX_ENTRIES = 4_000_000
+
+
+def centered_item_vectors(ratings: sparse.csr_matrix) -> sparse.csr_matrix:
+    """
+    центрирует оценки каждого фильма по его среднему и нормирует строки на единичную длину.
+    косинус таких векторов близок к коэффициенту Пирсона и подходит для LSH по случайным гиперплоскостям.
+
+    аргументы:
+        ratings (sparse.csr_matrix): матрица items x users с оценками.
+
+    возвращает:
+        sparse.csr_matrix: нормированные центрированные векторы фильмов (float32).
+    """
+    counts = np.diff(ratings.indptr)
+    means = np.divide(np.asarray(ratings.sum(axis=1)).ravel(), counts,
+                      out=np.zeros(ratings.shape[0]), where=counts > 0)
+    centered = ratings.data - np.repeat(means, counts)
+    squares = sparse.csr_matrix((centered * centered, ratings.indices, ratings.indptr), shape=ratings.shape)
+    norms = np.sqrt(np.asarray(squares.sum(axis=1)).ravel())
+    scale = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    data = centered * np.repeat(scale, counts)
+    return sparse.csr_matrix((data.astype(np.float32), ratings.indices, ratings.indptr), shape=ratings.shape)
+
+
+def item_embeddings(vectors: sparse.csr_matrix, rank: int = DEFAULT_RANK) -> np.ndarray:
+    """
+    сжимает центрированные векторы фильмов усеченным SVD до rank измерений и нормирует строки.
+
+    разреженные векторы почти ортогональны друг другу (общих пользователей мало),
+    и случайные гиперплоскости на них не отличают похожие фильмы от случайных;
+    в плотном пространстве главных компонент косинусы похожих фильмов заметно больше.
+
+    аргументы:
+        vectors (sparse.csr_matrix): нормированные центрированные векторы фильмов.
+        rank (int): размерность вложения.
+
+    возвращает:
+        np.ndarray: вложения фильмов items x rank (float32), строки единичной длины.
+    """
+    rank = min(rank, min(vectors.shape) - 1)
+    if rank < 1:
+        return np.ones((vectors.shape[0], 1), dtype=np.float32)
+    left, values, _ = svds(vectors.astype(np.float64), k=rank, random_state=0)
+    embeddings = left * values
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0).astype(np.float32)
+
+
+def _split_buckets(codes: np.ndarray, limit: int) -> np.ndarray:
+    """
+    делит слишком большие корзины на части не больше limit фильмов:
+    иначе плотный кластер фильмов дает квадратичное по размеру корзины число пар.
+
+    аргументы:
+        codes (np.ndarray): отсортированные сигнатуры.
+        limit (int): наибольший размер корзины.
+
+    возвращает:
+        np.ndarray: номера корзин (неубывающие) для каждой позиции.
+    """
+    positions = np.arange(len(codes))
+    starts = np.r_[True, codes[1:] != codes[:-1]]
+    within = positions - np.maximum.accumulate(np.where(starts, positions, 0))
+    return np.cumsum(within % max(limit, 1) == 0)
+
+
+def _bucket_pairs(codes: np.ndarray, order: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    все упорядоченные пары разных фильмов из одной корзины.
+
+    аргументы:
+        codes (np.ndarray): номера корзин фильмов в порядке order.
+        order (np.ndarray): номера фильмов, отсортированные по сигнатуре.
+
+    возвращает:
+        Tuple[np.ndarray, np.ndarray]: (номера фильмов, номера кандидатов).
+    """
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    sizes = np.diff(np.r_[starts, len(codes)])
+    # для каждой позиции — начало и размер ее корзины
+    pos_start = np.repeat(starts, sizes)
+    pos_size = np.repeat(sizes, sizes)
+    rows = np.repeat(np.arange(len(codes)), pos_size)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(pos_size) - pos_size, pos_size)
+    cols = pos_start[rows] + offsets
+    keep = rows != cols
+    return order[rows[keep]], order[cols[keep]]
+
+
+def lsh_candidates(
+    vectors: np.ndarray,
+    tables: int = DEFAULT_TABLES,
+    bucket_size: int = DEFAULT_BUCKET_SIZE,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    находит пары фильмов-кандидатов через LSH по случайным гиперплоскостям (косинусное сходство).
+
+    в каждой таблице сигнатура фильма — знаки проекций на bits случайных векторов,
+    bits подбирается так, чтобы в корзине в среднем было около bucket_size фильмов.
+    кандидаты фильма — фильмы, совпавшие с ним по сигнатуре хотя бы в одной таблице,
+    поэтому число пар растет как items * tables * bucket_size, а не items².
+
+    аргументы:
+        vectors (np.ndarray): вложения фильмов (см. item_embeddings).
+        tables (int): число хеш-таблиц (регулятор полноты).
+        bucket_size (int): желаемый средний размер корзины.
+        seed (int): зерно генератора случайных гиперплоскостей.
+
+    возвращает:
+        Tuple[np.ndarray, np.ndarray]: уникальные пары (фильм, кандидат), отсортированные по фильму.
+    """
+    n_items, dim = vectors.shape
+    if n_items < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    bits = int(np.clip(np.ceil(np.log2(max(n_items / max(bucket_size, 1), 1.0))), 1, 62))
+    weights = np.left_shift(np.int64(1), np.arange(bits, dtype=np.int64))
+    rng = np.random.default_rng(seed)
+
+    keys = []
+    for _ in range(tables):
+        planes = rng.standard_normal((dim, bits)).astype(np.float32)
+        codes = ((vectors @ planes) > 0).astype(np.int64) @ weights
+        # случайный порядок внутри корзины не дает фильмам с меньшими номерами всегда стоять первыми
+        order = np.lexsort((rng.permutation(n_items), codes))
+        rows, cols = _bucket_pairs(_split_buckets(codes[order], 2 * bucket_size), order)
+        keys.append(rows.astype(np.int64) * n_items + cols)
+    # сортировка с отбором соседних различий заметно быстрее np.unique на десятках миллионов ключей
+    keys = np.concatenate(keys)
+    keys.sort()
+    unique = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    return unique // n_items, unique % n_items
+
+
+def _expand_rows(ratings: sparse.csr_matrix, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    разворачивает строки CSR-матрицы в плоские массивы без копирования самой матрицы.
+
+    возвращает:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (номер строки в rows, пользователь, оценка) для каждого элемента.
+    """
+    starts = ratings.indptr[rows]
+    lengths = ratings.indptr[rows + 1] - starts
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    positions = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(int(lengths.sum()))
+    return owner, ratings.indices[positions], ratings.data[positions]
+
+
+def candidate_pearson(
+    ratings: sparse.csr_matrix,
+    rows: np.ndarray,
+    cols: np.ndarray,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+) -> np.ndarray:
+    """
+    точный коэффициент Пирсона по общим пользователям только для заданных пар фильмов.
+
+    оценки блока первых фильмов разворачиваются в плотную таблицу block_size x users,
+    оценки вторых фильмов пар — в плоский список; общие пользователи находятся
+    одним обращением к таблице, суммы по парам — через np.bincount.
+
+    аргументы:
+        ratings (sparse.csr_matrix): матрица items x users с оценками.
+        rows (np.ndarray): первые фильмы пар (по неубыванию).
+        cols (np.ndarray): вторые фильмы пар.
+        block_size (int): сколько первых фильмов разворачивать в плотную таблицу.
+        max_entries (int): сколько оценок вторых фильмов разворачивать за раз (ограничивает память).
+
+    возвращает:
+        np.ndarray: сходства пар (как в sparse_similarity.pearson_from_stats).
+    """
+    sims = np.zeros(len(rows), dtype=np.float64)
+    lengths = np.diff(ratings.indptr)
+    bounds = np.searchsorted(rows, np.arange(0, ratings.shape[0] + block_size, block_size))
+    for block, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+        if lo == hi:
+            continue
+        first = block * block_size
+        dense_block = ratings[first:first + block_size]
+        values = dense_block.toarray()
+        # присутствие оценки берется из структуры матрицы: явный ноль тоже считается оценкой
+        present = sparse.csr_matrix(
+            (np.ones(dense_block.nnz, dtype=bool), dense_block.indices, dense_block.indptr),
+            shape=dense_block.shape,
+        ).toarray()
+
+        # пары блока режутся так, чтобы развернутых оценок было не больше max_entries
+        entries = np.cumsum(lengths[cols[lo:hi]])
+        cuts = np.searchsorted(entries, np.arange(max_entries, int(entries[-1]) + max_entries, max_entries), side="right")
+        for start, stop in zip(np.r_[0, cuts[:-1]] + lo, cuts + lo):
+            if start == stop:
+                continue
+            owner, users, score_b = _expand_rows(ratings, cols[start:stop])
+            local = rows[start:stop][owner] - first
+            common = present[local, users]
+            owner, score_a, score_b = owner[common], values[local[common], users[common]], score_b[common]
+            size = stop - start
+            sims[start:stop] = pearson_from_stats(
+                np.bincount(owner, minlength=size).astype(np.float64),
+                np.bincount(owner, score_a, minlength=size),
+                np.bincount(owner, score_b, minlength=size),
+                np.bincount(owner, score_a * score_a, minlength=size),
+                np.bincount(owner, score_b * score_b, minlength=size),
+                np.bincount(owner, score_a * score_b, minlength=size),
+            )
+    return sims
+
+
+def build_neighbor_store(
+    matrix: ItemUserMatrix,
+    k: int,
+    tables: int = DEFAULT_TABLES,
+    bucket_size: int = DEFAULT_BUCKET_SIZE,
+    rank: int = DEFAULT_RANK,
+    seed: int = 0,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> NeighborStore:
+    """
+    приближенная замена sparse_similarity.build_neighbor_store для больших каталогов.
+
+    кандидаты ищутся через LSH по вложениям центрированных векторов фильмов (lsh_candidates),
+    затем для каждой пары кандидатов считается точный Пирсон и остаются top-K.
+    если кандидатов меньше K, хвост строки остается пустым (neighbors.EMPTY):
+    фильмы, которых LSH не нашел, не выдаются за соседей.
+
+    аргументы:
+        matrix (ItemUserMatrix): матрица "фильм-пользователь".
+        k (int): сколько соседей хранить для каждого фильма.
+        tables (int): число хеш-таблиц (регулятор полноты).
+        bucket_size (int): желаемый средний размер корзины.
+        rank (int): размерность вложений фильмов.
+        seed (int): зерно генератора случайных гиперплоскостей.
+        block_size (int): сколько фильмов за раз пересчитывать точным Пирсоном.
+
+    возвращает:
+        NeighborStore: приближенные соседи каждого фильма по убыванию сходства.
+    """
+    ratings, items = build_item_user_csr(matrix)
+    n_items = len(items)
+    k = max(0, min(k, n_items - 1))
+    indices = np.full((n_items, k), EMPTY, dtype=np.int32)
+    scores = np.zeros((n_items, k), dtype=np.float32)
+    if k == 0:
+        return NeighborStore(items, indices, scores)
+
+    embeddings = item_embeddings(centered_item_vectors(ratings), rank)
+    rows, cols = lsh_candidates(embeddings, tables, bucket_size, seed)
+    sims = candidate_pearson(ratings, rows, cols, block_size)
+
+    # порядок внутри строки: по убыванию сходства, при равенстве — меньший номер выше
+    order = np.lexsort((cols, -sims, rows))
+    rows, cols, sims = rows[order], cols[order], sims[order]
+    row_start = np.searchsorted(rows, rows, side="left")
+    position = np.arange(len(rows)) - row_start
+    keep = position < k
+    indices[rows[keep], position[keep]] = cols[keep]
+    scores[rows[keep], position[keep]] = sims[keep]
+    return NeighborStore(items, indices, scores)
+
+
+def recall_at_k(approx: NeighborStore, exact: NeighborStore, k: Optional[int] = None) -> float:
+    """
+    доля точных top-K соседей (с положительным сходством), найденных приближенным поиском.
+
+    аргументы:
+        approx (NeighborStore): приближенные соседи.
+        exact (NeighborStore): соседи точного расчета по тем же фильмам.
+        k (Optional[int]): сколько соседей сравнивать, None — все хранимые.
+
+    возвращает:
+        float: средний recall@K по фильмам, у которых есть положительные точные соседи.
+    """
+    found = 0
+    total = 0
+    for item in exact.items:
+        exact_idx, exact_sims = exact.neighbors(item, k)
+        truth = {exact.items[j] for j in exact_idx[exact_sims > 0].tolist()}
+        if not truth:
+            continue
+        approx_idx, _ = approx.neighbors(item, k)
+        found += len(truth & {approx.items[j] for j in approx_idx.tolist()})
+        total += len(truth)
+    return found / total if total else 1.0
@@ -0,0 +1,143 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from .cf import UserItemMatrix
+from .neighbors import EMPTY, NeighborStore, top_columns
+
+# сколько пользователей обрабатывается за один проход (ограничивает плотный блок users x items)
+DEFAULT_USER_BLOCK = 512
+
+
+@dataclass(frozen=True)
+class BatchRecommendations:
+    # рекомендации для многих пользователей в виде плотных массивов:
+    # строка i — пользователь user_ids[i]; пустые места заполнены item = -1 и score = nan
+    user_ids: np.ndarray    # int32, users
+    items: np.ndarray       # int32, users x top_n, номера фильмов (ItemVocabulary)
+    scores: np.ndarray      # float32, users x top_n, по убыванию
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def save(self, path: Path) -> None:
+        """ записывает рекомендации в несжатый .npz (три массива) """
+        np.savez(Path(path), user_ids=self.user_ids, items=self.items, scores=self.scores)
+
+    @classmethod
+    def load(cls, path: Path) -> "BatchRecommendations":
+        """ читает рекомендации, записанные save """
+        with np.load(Path(path)) as data:
+            return cls(data["user_ids"], data["items"], data["scores"])
+
+
+def neighbor_matrix(neighbors: NeighborStore, k_neighbors: Optional[int] = None) -> sparse.csr_matrix:
+    """
+    переводит хранилище соседей в разреженную матрицу сходства items x items.
+
+    в строке i лежат первые k_neighbors соседей фильма i, только с положительным сходством
+    (как в cf.recommend_items_for_user); пустые ячейки (neighbors.EMPTY) пропускаются.
+
+    аргументы:
+        neighbors (NeighborStore): top-K соседей каждого фильма.
+        k_neighbors (Optional[int]): сколько соседей брать, None — все хранимые.
+
+    возвращает:
+        sparse.csr_matrix: матрица сходства (float64).
+    """
+    indices = np.asarray(neighbors.indices[:, :k_neighbors])
+    scores = np.asarray(neighbors.scores[:, :k_neighbors], dtype=np.float64)
+    rows = np.repeat(np.arange(len(neighbors)), indices.shape[1])
+    positive = (scores.ravel() > 0) & (indices.ravel() != EMPTY)
+    n = len(neighbors)
+    return sparse.csr_matrix(
+        (scores.ravel()[positive], (rows[positive], indices.ravel()[positive])),
+        shape=(n, n),
+    )
+
+
+def user_rating_matrix(user_items: UserItemMatrix, user_ids: Sequence[int], neighbors: NeighborStore) -> sparse.csr_matrix:
+    """
+    собирает матрицу оценок users x items в нумерации строк хранилища соседей.
+    фильмы, которых нет в хранилище соседей, пропускаются: для них нет соседей.
+
+    аргументы:
+        user_items (UserItemMatrix): обратный индекс "пользователь-фильм".
+        user_ids (Sequence[int]): пользователи в порядке строк.
+        neighbors (NeighborStore): хранилище соседей (задает нумерацию столбцов).
+
+    возвращает:
+        sparse.csr_matrix: оценки пользователей (float64).
+    """
+    index = neighbors.index
+    indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+    cols = []
+    vals = []
+    for row, user_id in enumerate(user_ids):
+        ratings = user_items.get(user_id, {})
+        known = [(index[item], score) for item, score in ratings.items() if item in index]
+        cols.extend(c for c, _ in known)
+        vals.extend(s for _, s in known)
+        indptr[row + 1] = indptr[row] + len(known)
+    return sparse.csr_matrix(
+        (np.asarray(vals, dtype=np.float64), np.asarray(cols, dtype=np.int64), indptr),
+        shape=(len(user_ids), len(neighbors)),
+    )
+
+
+def recommend_batch(
+    user_ids: Sequence[int],
+    user_items: UserItemMatrix,
+    neighbors: NeighborStore,
+    k_neighbors: int = 20,
+    top_n: int = 10,
+    block_size: int = DEFAULT_USER_BLOCK,
+) -> BatchRecommendations:
+    """
+    рекомендации для многих пользователей сразу, с той же формулой, что и cf.recommend_items_for_user:
+    оценка фильма j = Σ sim(i, j) · r_i / Σ sim(i, j) по оцененным фильмам i, у которых j среди соседей.
+
+    числитель и знаменатель для блока пользователей — два произведения разреженных матриц
+    (оценки x сходство и индикатор оценок x сходство); уже оцененные фильмы маскируются,
+    top-N выбирается через argpartition (neighbors.top_columns).
+
+    аргументы:
+        user_ids (Sequence[int]): пользователи.
+        user_items (UserItemMatrix): обратный индекс "пользователь-фильм".
+        neighbors (NeighborStore): top-K соседей каждого фильма.
+        k_neighbors (int): сколько соседей каждого фильма учитывать.
+        top_n (int): сколько фильмов рекомендовать каждому пользователю.
+        block_size (int): сколько пользователей обрабатывать за раз.
+
+    возвращает:
+        BatchRecommendations: рекомендации по убыванию оценки.
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int32)
+    n_items = len(neighbors)
+    top_n = max(0, min(top_n, n_items))
+    items_out = np.full((len(user_ids), top_n), -1, dtype=np.int32)
+    scores_out = np.full((len(user_ids), top_n), np.nan, dtype=np.float32)
+    if top_n == 0 or len(user_ids) == 0:
+        return BatchRecommendations(user_ids, items_out, scores_out)
+
+    similarity = neighbor_matrix(neighbors, k_neighbors)
+    item_ids = np.asarray(neighbors.items, dtype=np.int32)
+    for start in range(0, len(user_ids), block_size):
+        stop = min(start + block_size, len(user_ids))
+        ratings = user_rating_matrix(user_items, user_ids[start:stop].tolist(), neighbors)
+        rated = sparse.csr_matrix((np.ones_like(ratings.data), ratings.indices, ratings.indptr), shape=ratings.shape)
+        weighted = (ratings @ similarity).toarray()
+        weights = (rated @ similarity).toarray()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            predicted = np.where(weights > 0, weighted / weights, -np.inf)
+        # уже оцененные фильмы не рекомендуются
+        predicted[rated.nonzero()] = -np.inf
+
+        cand, cand_scores = top_columns(predicted, top_n)
+        found = np.isfinite(cand_scores)
+        items_out[start:stop] = np.where(found, item_ids[cand], -1)
+        scores_out[start:stop] = np.where(found, cand_scores, np.nan)
+    return BatchRecommendations(user_ids, items_out, scores_out)
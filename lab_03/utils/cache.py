@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .schemas import Recommendation
+
+# ключ кэша рекомендаций: (user_id, k_neighbors, top_n)
+CacheKey = Tuple[int, int, int]
+
+
+class RecommendationCache:
+    """
+    LRU-кэш рекомендаций с временем жизни записи (TTL) и сбросом по пользователю.
+
+    первый элемент ключа — ID пользователя: по нему кэш умеет точечно сбросить
+    все записи пользователя (разные k_neighbors и top_n), не перебирая весь кэш.
+    счетчики hits/misses/evictions/expirations/invalidations доступны через stats().
+    """
+
+    def __init__(self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.max_entries = max_entries    # 0 — кэш выключен
+        self.ttl = ttl    # секунды; 0 — без ограничения времени жизни
+        self._clock = clock
+        self._entries: "OrderedDict[CacheKey, Tuple[float, List[Recommendation]]]" = OrderedDict()    # ключ -> (время записи, значение)
+        self._by_user: Dict[int, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0    # вытеснено по размеру
+        self.expirations = 0    # устарело по TTL
+        self.invalidations = 0    # сброшено из-за изменения данных
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: CacheKey) -> None:
+        """ удаляет запись и ее ссылку из индекса пользователей (вызывается под блокировкой) """
+        del self._entries[key]
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def get(self, key: CacheKey) -> Optional[List[Recommendation]]:
+        """
+        возвращает значение из кэша и отмечает его как недавно использованное.
+
+        аргументы:
+            key (CacheKey): (user_id, k_neighbors, top_n).
+
+        возвращает:
+            Optional[List[Recommendation]]: копия списка или None, если записи нет или она устарела.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl and self._clock() - stored_at > self.ttl:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(value)
+
+    def put(self, key: CacheKey, value: List[Recommendation]) -> None:
+        """
+        записывает значение; при переполнении вытесняет самые давно использованные записи.
+
+        аргументы:
+            key (CacheKey): (user_id, k_neighbors, top_n).
+            value (List[Recommendation]): рекомендации, которые нужно запомнить.
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (self._clock(), list(value))
+            self._by_user.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_users(self, user_ids: Iterable[int]) -> int:
+        """
+        сбрасывает все записи заданных пользователей.
+
+        аргументы:
+            user_ids (Iterable[int]): ID пользователей.
+
+        возвращает:
+            int: сколько записей удалено.
+        """
+        dropped = 0
+        with self._lock:
+            for user_id in user_ids:
+                for key in list(self._by_user.get(user_id, ())):
+                    self._drop(key)
+                    dropped += 1
+            self.invalidations += dropped
+        return dropped
+
+    def clear(self) -> None:
+        """ сбрасывает весь кэш (например, после полного пересчета соседей) """
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        счетчики кэша для мониторинга.
+
+        возвращает:
+            Dict[str, int]: size, hits, misses, evictions, expirations, invalidations.
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
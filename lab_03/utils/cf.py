@@ -1,10 +1,13 @@
 from collections import defaultdict
 from typing import Dict, Iterable, List
+from .neighbors import NeighborStore
 from .schemas import Rating, Recommendation
 from .similarity import pearson_similarity
 
-# Тип для матрицы "фильм-пользователь"
-ItemUserMatrix = Dict[str, Dict[int, float]]
+# Тип для матрицы "фильм-пользователь" (ключ — номер фильма из ItemVocabulary)
+ItemUserMatrix = Dict[int, Dict[int, float]]
+# Тип для обратного индекса "пользователь-фильм"
+UserItemMatrix = Dict[int, Dict[int, float]]
 
 
 def build_item_user_matrix(ratings: Iterable[Rating]) -> ItemUserMatrix:
@@ -27,7 +30,7 @@ def build_item_user_matrix(ratings: Iterable[Rating]) -> ItemUserMatrix:
     return matrix
 
 
-def build_similarity_matrix(matrix: ItemUserMatrix) -> Dict[str, Dict[str, float]]:
+def build_similarity_matrix(matrix: ItemUserMatrix) -> Dict[int, Dict[int, float]]:
     """
     строит матрицу сходства между фильмами на основе коэффициента Пирсона.
     
@@ -35,10 +38,10 @@ def build_similarity_matrix(matrix: ItemUserMatrix) -> Dict[str, Dict[str, float
         matrix (ItemUserMatrix): Матрица "фильм-пользователь".
     
     возвращает:
-        Dict[str, Dict[str, float]]: Матрица сходства между фильмами.
+        Dict[int, Dict[int, float]]: Матрица сходства между фильмами.
     """
     items = list(matrix.keys())    # список всех фильмов (ключи из матрицы)
-    similarity: Dict[str, Dict[str, float]] = {item: {} for item in items}   # инициализация словаря для сходства
+    similarity: Dict[int, Dict[int, float]] = {item: {} for item in items}   # инициализация словаря для сходства
     for i, item in enumerate(items): 
         for j in range(i + 1, len(items)):
             other = items[j]
@@ -51,8 +54,8 @@ def build_similarity_matrix(matrix: ItemUserMatrix) -> Dict[str, Dict[str, float
 
 def recommend_items_for_user(
     user_id: int,
-    matrix: ItemUserMatrix,
-    similarity_matrix: Dict[str, Dict[str, float]],
+    user_items: UserItemMatrix,
+    neighbors: NeighborStore,
     k_neighbors: int = 20,
     top_n: int = 10,
 ) -> List[Recommendation]:
@@ -62,31 +65,33 @@ def recommend_items_for_user(
     
     аргументы:
         user_id (int): ID пользователя, для которого строятся рекомендации.
-        matrix (ItemUserMatrix): матрица "фильм-пользователь".
-        similarity_matrix (Dict[str, Dict[str, float]]): матрица сходства между фильмами.
-        k_neighbors (int): количество ближайших соседей для каждого фильма (по умолчанию 20).
+        user_items (UserItemMatrix): обратный индекс "пользователь-фильм".
+        neighbors (NeighborStore): top-K соседей каждого фильма, отсортированные по убыванию сходства.
+        k_neighbors (int): количество ближайших соседей для каждого фильма (по умолчанию 20, не больше K хранилища).
         top_n (int): Количество рекомендованных фильмов, которое нужно вернуть (по умолчанию 10).
     
     возвращает:
         List[Recommendation]: список рекомендаций для пользователя.
     """
-    # получаем все фильмы, которые оценил пользователь
-    user_ratings = {item: users[user_id] for item, users in matrix.items() if user_id in users}
+    # получаем все фильмы, которые оценил пользователь, прямо из обратного индекса
+    user_ratings = user_items.get(user_id, {})
     # если у пользователя нет оценок, возвращаем пустой список
     if not user_ratings:
         return []
 
     # словари для хранения итоговых оценок и весов фильмов
-    scores: Dict[str, float] = defaultdict(float)
-    weights: Dict[str, float] = defaultdict(float)
+    scores: Dict[int, float] = defaultdict(float)
+    weights: Dict[int, float] = defaultdict(float)
 
+    items = neighbors.items
     # для каждого фильма, который оценил пользователь
     for item, rating in user_ratings.items():
-        # получаем похожие фильмы
-        neighbors = similarity_matrix.get(item, {})
-        for other, sim in sorted(neighbors.items(), key=lambda x: x[1], reverse=True)[:k_neighbors]:
+        # берем уже отсортированных соседей фильма
+        neighbor_idx, neighbor_sims = neighbors.neighbors(item, k_neighbors)
+        for j, sim in zip(neighbor_idx.tolist(), neighbor_sims.tolist()):
+            other = items[j]
             # если пользователь уже оценил фильм, пропускаем его
-            if user_id in matrix.get(other, {}):
+            if other in user_ratings:
                 continue
             # если схожесть меньше или равна 0, пропускаем этот фильм
             if sim <= 0:
@@ -103,8 +108,10 @@ def recommend_items_for_user(
             continue
         recs.append(Recommendation(item_id=item, score=score / weight))
 
-    # сортируем рекомендации по убыванию оценок и возвращаем топ 
-    recs.sort(key=lambda r: r.score, reverse=True)
+    # сортируем рекомендации по убыванию оценок и возвращаем топ;
+    # при равных оценках выше фильм с меньшим номером строки соседей (как в batch.recommend_batch)
+    index = neighbors.index
+    recs.sort(key=lambda r: (-r.score, index[r.item_id]))
 
     # возвращаем топ рекомендаций
     return recs[:top_n]
@@ -0,0 +1,212 @@
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, MutableMapping, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .cf import ItemUserMatrix
+from .schemas import RatingArrays
+
+
+class CompactMatrix(MutableMapping[int, Dict[int, float]]):
+    """
+    словарная матрица оценок (ключ строки -> {ключ столбца: оценка}) поверх CSR-массивов.
+
+    массовая загрузка хранится в трех массивах (float32 оценки, int32 столбцы, указатели строк)
+    вместо вложенных словарей: ~8 байт на оценку вместо сотен. строки, которые меняются
+    после загрузки (add_ratings), копируются в обычные словари поверх CSR, поэтому запись
+    работает как раньше через setdefault. нетронутые строки читаются как неизменяемые словари.
+    """
+
+    def __init__(self, base: sparse.csr_matrix, row_keys: np.ndarray, col_keys: np.ndarray) -> None:
+        self._base = base            # оценки rows x cols, индексы столбцов по возрастанию
+        self._row_keys = row_keys    # ключ каждой строки CSR
+        self._col_keys = col_keys    # ключ каждого столбца CSR
+        self._rows: Dict[int, int] = {key: row for row, key in enumerate(row_keys.tolist())}
+        self._overlay: Dict[int, Dict[int, float]] = {}    # измененные и новые строки
+        self._deleted: Set[int] = set()    # удаленные строки CSR
+
+    @property
+    def pristine(self) -> bool:
+        """ совпадает ли содержимое с CSR (не было записей после загрузки) """
+        return not self._overlay and not self._deleted
+
+    def _base_row(self, row: int) -> Dict[int, float]:
+        start, stop = self._base.indptr[row], self._base.indptr[row + 1]
+        return dict(zip(self._col_keys[self._base.indices[start:stop]].tolist(), self._base.data[start:stop].tolist()))
+
+    def _in_base(self, key: int) -> bool:
+        return key in self._rows and key not in self._deleted
+
+    def __getitem__(self, key: int) -> Mapping[int, float]:
+        if key in self._overlay:
+            return self._overlay[key]
+        if self._in_base(key):
+            # копия строки только для чтения: запись в нее молча потерялась бы
+            return MappingProxyType(self._base_row(self._rows[key]))
+        raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._overlay or self._in_base(key)
+
+    def __setitem__(self, key: int, value: Dict[int, float]) -> None:
+        self._overlay[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key: int) -> None:
+        found = self._overlay.pop(key, None) is not None
+        if self._in_base(key):
+            self._deleted.add(key)
+            found = True
+        if not found:
+            raise KeyError(key)
+
+    def setdefault(self, key: int, default: Dict[int, float] = None) -> Dict[int, float]:
+        """ изменяемая строка: строка CSR при первой записи переносится в словарь """
+        if key in self._overlay:
+            return self._overlay[key]
+        row = self._base_row(self._rows[key]) if self._in_base(key) else (default if default is not None else {})
+        self._overlay[key] = row
+        return row
+
+    def __iter__(self) -> Iterator[int]:
+        # сначала строки CSR по порядку, затем новые строки в порядке добавления
+        for key in self._row_keys.tolist():
+            if key not in self._deleted:
+                yield key
+        for key in self._overlay:
+            if key not in self._rows:
+                yield key
+
+    def __len__(self) -> int:
+        return len(self._rows) - len(self._deleted) + sum(1 for key in self._overlay if key not in self._rows)
+
+    def triples(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        все оценки матрицы без обхода словарей.
+
+        возвращает:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: (ключи строк, ключи столбцов, оценки float32).
+        """
+        counts = np.diff(self._base.indptr)
+        rows = np.repeat(self._row_keys, counts)
+        cols = self._col_keys[self._base.indices]
+        vals = self._base.data
+        if self.pristine:
+            return rows, cols, vals
+        shadowed = np.zeros(len(self._row_keys), dtype=bool)
+        for key in self._deleted.union(self._overlay):
+            row = self._rows.get(key)
+            if row is not None:
+                shadowed[row] = True
+        keep = ~np.repeat(shadowed, counts)
+        extra_rows: List[int] = []
+        extra_cols: List[int] = []
+        extra_vals: List[float] = []
+        for key, values in self._overlay.items():
+            extra_rows.extend([key] * len(values))
+            extra_cols.extend(values.keys())
+            extra_vals.extend(values.values())
+        return (
+            np.concatenate([rows[keep], np.asarray(extra_rows, dtype=rows.dtype)]),
+            np.concatenate([cols[keep], np.asarray(extra_cols, dtype=cols.dtype)]),
+            np.concatenate([vals[keep], np.asarray(extra_vals, dtype=vals.dtype)]),
+        )
+
+    def to_csr(self) -> Tuple[sparse.csr_matrix, List[int]]:
+        """
+        CSR-матрица в порядке итерации строк (столбцы — по возрастанию ключа).
+        без записей после загрузки возвращается сама исходная матрица.
+
+        возвращает:
+            Tuple[sparse.csr_matrix, List[int]]: (матрица оценок float32, ключи строк по порядку).
+        """
+        keys = list(self)
+        if self.pristine:
+            return self._base, keys
+        rows, cols, vals = self.triples()
+        key_array = np.asarray(keys, dtype=np.int64)
+        order = np.argsort(key_array, kind="stable")
+        row_codes = order[np.searchsorted(key_array[order], rows)]
+        col_keys, col_codes = np.unique(cols, return_inverse=True)
+        matrix = sparse.csr_matrix((vals, (row_codes, col_codes)), shape=(len(keys), len(col_keys)))
+        matrix.sort_indices()
+        return matrix, keys
+
+
+def _csr_from_pairs(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    vals: np.ndarray,
+    shape: Tuple[int, int],
+) -> sparse.csr_matrix:
+    """ CSR из уникальных пар (row, col), уже упорядоченных по строке и столбцу """
+    indptr = np.zeros(shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=shape[0]), out=indptr[1:])
+    return sparse.csr_matrix((vals, cols.astype(np.int32), indptr), shape=shape)
+
+
+def build_rating_matrices(ratings: RatingArrays) -> Tuple[CompactMatrix, CompactMatrix]:
+    """
+    собирает матрицу "фильм-пользователь" и обратный индекс "пользователь-фильм" в CSR.
+    при повторной оценке той же пары остается последняя, как при записи в словари по порядку.
+
+    аргументы:
+        ratings (RatingArrays): все оценки в порядке поступления.
+
+    возвращает:
+        Tuple[CompactMatrix, CompactMatrix]: (item_user, user_item).
+    """
+    item_keys, item_codes = np.unique(ratings.item_ids, return_inverse=True)
+    user_keys, user_codes = np.unique(ratings.user_ids, return_inverse=True)
+    # стабильная сортировка по паре: последняя оценка пары — последняя в своей серии
+    pair = item_codes.astype(np.int64) * len(user_keys) + user_codes
+    order = np.argsort(pair, kind="stable")
+    del item_codes, user_codes
+    sorted_pair = pair[order]
+    del pair
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = sorted_pair[1:] != sorted_pair[:-1]
+    pick = order[last]
+    del order
+    sorted_pair = sorted_pair[last]
+    rows, cols = np.divmod(sorted_pair, len(user_keys)) if len(user_keys) else (sorted_pair, sorted_pair)
+    vals = np.asarray(ratings.scores, dtype=np.float32)[pick]
+
+    by_item = _csr_from_pairs(rows, cols, vals, (len(item_keys), len(user_keys)))
+    # транспонирование через CSC дает отсортированные индексы столбцов
+    by_user = by_item.T.tocsr()
+    return (
+        CompactMatrix(by_item, item_keys.astype(np.int32), user_keys.astype(np.int32)),
+        CompactMatrix(by_user, user_keys.astype(np.int32), item_keys.astype(np.int32)),
+    )
+
+
+def ratings_from_matrix(matrix: ItemUserMatrix) -> RatingArrays:
+    """
+    переводит словарную матрицу "фильм-пользователь" хранилища в параллельные массивы оценок.
+
+    аргументы:
+        matrix (ItemUserMatrix): матрица "фильм-пользователь".
+
+    возвращает:
+        RatingArrays: все оценки матрицы.
+    """
+    if isinstance(matrix, CompactMatrix):
+        items, users, scores = matrix.triples()
+        return RatingArrays(
+            user_ids=users.astype(np.int32), item_ids=items.astype(np.int32), scores=scores.astype(np.float32),
+        )
+
+    total = sum(len(users) for users in matrix.values())
+    user_ids = np.empty(total, dtype=np.int32)
+    item_ids = np.empty(total, dtype=np.int32)
+    scores = np.empty(total, dtype=np.float32)
+    pos = 0
+    for item, users in matrix.items():
+        count = len(users)
+        user_ids[pos:pos + count] = np.fromiter(users.keys(), dtype=np.int32, count=count)
+        scores[pos:pos + count] = np.fromiter(users.values(), dtype=np.float32, count=count)
+        item_ids[pos:pos + count] = item
+        pos += count
+    return RatingArrays(user_ids=user_ids, item_ids=item_ids, scores=scores)
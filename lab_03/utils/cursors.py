@@ -0,0 +1,120 @@
+from typing import List, NamedTuple, Optional, Sequence
+
+from .genre_index import GenreQuery
+
+# курсор следующей страницы целиком лежит в callback_data кнопки, на сервере ничего не хранится:
+#   "p:s:<номер фильма>:<смещение>"                        — похожие фильмы (/recommend)
+#   "p:g:<маска жанров hex><&|>[год от]-[год до]:<смещение>" — топ по жанрам (/genre)
+# Telegram ограничивает callback_data 64 байтами
+CALLBACK_DATA_LIMIT = 64
+CURSOR_PREFIX = "p:"
+KIND_SIMILAR = "s"
+KIND_GENRE = "g"
+
+
+class Cursor(NamedTuple):
+    # разобранный курсор: вид выдачи, ключ запроса (формат зависит от вида) и смещение страницы
+    kind: str
+    key: str
+    offset: int
+
+
+def encode_cursor(kind: str, key: str, offset: int) -> str:
+    """
+    собирает callback_data курсора.
+
+    аргументы:
+        kind (str): KIND_SIMILAR или KIND_GENRE.
+        key (str): ключ запроса (без двоеточий).
+        offset (int): начало страницы.
+
+    возвращает:
+        str: строка для callback_data.
+    """
+    data = f"{CURSOR_PREFIX}{kind}:{key}:{offset}"
+    if len(data.encode("utf-8")) > CALLBACK_DATA_LIMIT:
+        raise ValueError(f"курсор длиннее {CALLBACK_DATA_LIMIT} байт: {data!r}")
+    return data
+
+
+def decode_cursor(data: str) -> Optional[Cursor]:
+    """
+    разбирает callback_data курсора.
+
+    аргументы:
+        data (str): callback_data кнопки.
+
+    возвращает:
+        Optional[Cursor]: курсор или None, если строка не является курсором.
+    """
+    if not data.startswith(CURSOR_PREFIX):
+        return None
+    parts = data[len(CURSOR_PREFIX):].split(":")
+    if len(parts) != 3 or parts[0] not in (KIND_SIMILAR, KIND_GENRE) or not parts[2].isdigit():
+        return None
+    return Cursor(parts[0], parts[1], int(parts[2]))
+
+
+def similar_cursor(item: int, offset: int) -> str:
+    """ курсор страницы похожих фильмов: ключ — номер исходного фильма """
+    return encode_cursor(KIND_SIMILAR, str(item), offset)
+
+
+def decode_similar_key(key: str) -> Optional[int]:
+    """ номер исходного фильма из ключа курсора похожих фильмов """
+    return int(key) if key.isdigit() else None
+
+
+def genre_cursor(query: GenreQuery, genres: Sequence[str], offset: int) -> Optional[str]:
+    """
+    курсор страницы топа по жанрам: жанры запроса сворачиваются в битовую маску по списку genres.
+
+    аргументы:
+        query (GenreQuery): разобранный запрос /genre.
+        genres (Sequence[str]): все жанры (порядок задает биты маски).
+        offset (int): начало страницы.
+
+    возвращает:
+        Optional[str]: строка для callback_data или None, если какой-то жанр не найден.
+    """
+    positions = {genre.lower(): bit for bit, genre in enumerate(genres)}
+    mask = 0
+    for genre in query.genres:
+        bit = positions.get(genre.strip().lower())
+        if bit is None:
+            return None
+        mask |= 1 << bit
+    years = f"{query.year_from or ''}-{query.year_to or ''}"
+    key = f"{mask:x}{'&' if query.match_all else '|'}{years}"
+    return encode_cursor(KIND_GENRE, key, offset)
+
+
+def decode_genre_key(key: str, genres: Sequence[str]) -> Optional[GenreQuery]:
+    """
+    восстанавливает запрос /genre из ключа курсора.
+
+    аргументы:
+        key (str): ключ, записанный genre_cursor.
+        genres (Sequence[str]): все жанры в том же порядке, что и при кодировании.
+
+    возвращает:
+        Optional[GenreQuery]: запрос с каноническими названиями жанров или None, если ключ поврежден.
+    """
+    for separator in ("&", "|"):
+        mask_text, found, years = key.partition(separator)
+        if found:
+            break
+    else:
+        return None
+    year_from, _, year_to = years.partition("-")
+    try:
+        mask = int(mask_text, 16)
+        selected: List[str] = [genre for bit, genre in enumerate(genres) if mask >> bit & 1]
+        return GenreQuery(
+            selected,
+            separator == "&",
+            int(year_from) if year_from else None,
+            int(year_to) if year_to else None,
+        )
+    except ValueError:
+        return None
@@ -1,163 +1,318 @@
-from typing import Dict, List, Optional, Tuple
-from dataset import dataset_preprocessing, normalize_movie, GENRES
-from .schemas import Rating
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from config import RATINGS_FILE
+from dataset import (
+    GENRES,
+    RATINGS_CHUNK_SIZE,
+    U_DATA_FILE,
+    dataset_preprocessing,
+    iter_rating_chunks,
+    movies_file_for,
+    normalize_movie,
+    read_movies,
+)
+from .genre_index import GenreIndex, GenreQuery
+from .metadata import DisplayView, MovieMetaView, MovieTable, build_movie_table
+from .render import NO_GENRES, RenderCache
+from .schemas import RatingArrays
+from .search_index import TitleSearchIndex
+from .vocab import ItemVocabulary
 
 # глобальные переменные для хранения данных о фильмах и рейтингах
-_ratings_df = None
+_ratings_df = None    # только для u.data: большие файлы оценок целиком в память не читаются
 _movies_df = None
-_display_map: Dict[str, str] = {}
-_avg_ratings: Dict[int, float] = {}
-_movie_meta: Dict[str, Dict[str, object]] = {}
+_vocab: Optional[ItemVocabulary] = None
+_movie_table: Optional[MovieTable] = None    # метаданные фильмов по столбцам
+# словарные фасады над _movie_table для прежних обращений по номеру фильма
+_display_map: Mapping[int, str] = {}
+_movie_meta: Mapping[int, Dict[str, object]] = {}
+_search_index: Optional[TitleSearchIndex] = None
+_genre_index: Optional[GenreIndex] = None
+_render: Optional[RenderCache] = None    # готовые строки фильмов для вывода
+_popular_items: np.ndarray = np.empty(0, dtype=np.int32)    # фильмы с названием по убыванию числа оценок
+# защищает от одновременной загрузки из фонового прогрева и обработчиков
+_load_lock = threading.Lock()
+
+
+def _build_vocabulary(rated_movie_ids: np.ndarray, movies_df) -> ItemVocabulary:
+    """
+    строит словарь фильмов: сначала фильмы из файла фильмов в порядке файла,
+    затем movie_id, которые встречаются только в оценках (их название — сам movie_id).
+    """
+    movie_ids = movies_df["movie_id"].to_numpy(dtype=np.int64)
+    titles = [t if isinstance(t, str) else "" for t in movies_df["normalized_title"].tolist()]
+    extra = np.setdiff1d(rated_movie_ids, movie_ids)
+    return ItemVocabulary(
+        np.concatenate([movie_ids, extra]),
+        titles + [str(m) for m in extra.tolist()],
+    )
+
+
+def _rating_totals(chunks: Iterable[pd.DataFrame]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    число и сумма оценок каждого movie_id по частям файла оценок (номер элемента массива — movie_id).
+    в памяти одновременно только одна часть.
+    """
+    counts = np.zeros(0, dtype=np.int64)
+    sums = np.zeros(0, dtype=np.float64)
+    for chunk in chunks:
+        movie_ids = chunk["item_id"].to_numpy(dtype=np.int64)
+        if not len(movie_ids):
+            continue
+        size = max(len(counts), int(movie_ids.max()) + 1)
+        counts = np.pad(counts, (0, size - len(counts)))
+        sums = np.pad(sums, (0, size - len(sums)))
+        counts += np.bincount(movie_ids, minlength=size)
+        sums += np.bincount(movie_ids, weights=chunk["rating"].to_numpy(dtype=np.float64), minlength=size)
+    return counts, sums
+
+
+def _per_item(values: np.ndarray, vocab: ItemVocabulary) -> np.ndarray:
+    """ переводит массив по movie_id в массив по номерам фильмов словаря (нули для фильмов без оценок) """
+    movie_ids = vocab.movie_ids.astype(np.int64)
+    known = movie_ids < len(values)
+    result = np.zeros(len(vocab), dtype=values.dtype)
+    result[known] = values[movie_ids[known]]
+    return result
 
 
 def load_dataset():
     """
     загружает и кеширует данные о рейтингах и фильмах.
 
-    при первом вызове функции загружает данные, рассчитывает средний рейтинг для каждого фильма,
-    создает отображение нормализованных названий фильмов в формат для отображения, 
-    а также собирает метаинформацию о фильмах (жанры и средний рейтинг).
+    при первом вызове функции загружает фильмы того же варианта MovieLens, что и RATINGS_FILE
+    (u.item, movies.dat или movies.csv: у вариантов разная нумерация movie_id), строит словарь фильмов
+    (movie_id ↔ номер ↔ название), рассчитывает средний рейтинг для каждого фильма, создает отображение
+    номеров фильмов в формат для отображения, а также собирает метаинформацию о фильмах (жанры и средний рейтинг).
+    u.data читается целиком (через бинарный кэш), остальные файлы оценок — потоково, частями по RATINGS_CHUNK_SIZE:
+    для метаданных нужны только число и сумма оценок каждого фильма.
 
     возвращает:
-        Tuple[pd.DataFrame, pd.DataFrame]: два датафрейма: _ratings_df (рейтинг пользователей) и _movies_df (фильмы)
-    """
-    global _ratings_df, _movies_df, _display_map, _avg_ratings, _movie_meta
-    if _ratings_df is None or _movies_df is None:
-        # загрузка данных с использованием функции dataset_preprocessing
-        _ratings_df, _movies_df = dataset_preprocessing()
-        
-        # рассчитываем средний рейтинг для каждого фильма
-        _avg_ratings = _ratings_df.groupby("item_id")["rating"].mean().to_dict()
-        
-        # инициализация пустых словарей для отображения информации о фильмах
-        _display_map = {}
-        _movie_meta = {}
-        # заполнение отображений для каждого фильма
-        for _, row in _movies_df.iterrows():
-            normalized_title = row.get("normalized_title")
-            if not (isinstance(normalized_title, str) and normalized_title):
-                continue
-            # формирование строкового отображения названия фильма с годом
-            title_no_year = str(row.get("title_no_year", "")).title()
-            year = row.get("year", "0000")
-            display = f"{title_no_year} ({year})"
-            _display_map[normalized_title] = display
-            
-            # составление списка жанров для каждого фильма
-            genres = [g for g in GENRES if row.get(g, 0) == 1]
-            
-            # получение среднего рейтинга фильма
-            avg = float(_avg_ratings.get(row.get("movie_id"), 0.0))
-            
-            # добавление метаинформации о фильме
-            _movie_meta[normalized_title] = {"display": display, "genres": genres, "avg": avg}
+        Tuple[Optional[pd.DataFrame], pd.DataFrame]: _ratings_df (рейтинг пользователей;
+            None, если RATINGS_FILE — не u.data) и _movies_df (фильмы)
+    """
+    global _ratings_df, _movies_df, _vocab, _display_map, _movie_meta, _movie_table, _search_index, _genre_index
+    global _popular_items, _render
+    if _movies_df is not None:
+        return _ratings_df, _movies_df
+    with _load_lock:
+        if _movies_df is not None:
+            return _ratings_df, _movies_df
+        if Path(RATINGS_FILE).resolve() == U_DATA_FILE.resolve():
+            # загрузка данных с использованием функции dataset_preprocessing (с бинарным кэшем)
+            ratings_df, movies_df = dataset_preprocessing()
+            totals = _rating_totals([ratings_df])
+        else:
+            ratings_df = None
+            movies_df = read_movies(movies_file_for(RATINGS_FILE))
+            totals = _rating_totals(iter_rating_chunks(RATINGS_FILE, RATINGS_CHUNK_SIZE))
+        vocab = _build_vocabulary(np.flatnonzero(totals[0]), movies_df)
+
+        # метаданные по столбцам: названия для вывода, маски жанров, средние оценки и число оценок
+        counts, sums = _per_item(totals[0], vocab), _per_item(totals[1], vocab)
+        table = build_movie_table(movies_df, vocab.titles, counts, sums, GENRES)
+
+        # поисковый индекс по названиям; популярность — число оценок фильма
+        _search_index = TitleSearchIndex(vocab.titles, counts)
+
+        # рейтинги по жанрам сортируются один раз здесь, а не при каждом запросе
+        described_items = np.flatnonzero(table.described)
+        _genre_index = GenreIndex(
+            described_items,
+            table.averages[described_items],
+            table.genre_flags[described_items],
+            GENRES,
+            movies_df["year"].to_numpy()[described_items].astype(int),
+        )
+        # готовые строки для вывода (у неописанных фильмов — название из словаря, без жанров, с оценкой 0)
+        _render = RenderCache.build(table.displays, table.genre_masks, GENRES, table.averages)
+        _movie_table = table
+        _display_map = DisplayView(table)
+        _movie_meta = MovieMetaView(table)
+
+        # самые оцениваемые фильмы — запасной ответ, когда персональный расчет не успевает
+        _popular_items = described_items[np.argsort(-counts[described_items], kind="stable")].astype(np.int32)
+
+        # таблица фильмов публикуется последней: по ней другие потоки понимают, что загрузка завершена
+        _vocab = vocab
+        _ratings_df = ratings_df
+        _movies_df = movies_df
     return _ratings_df, _movies_df
 
 
-def load_movielens_ratings() -> List[Rating]:
+def is_loaded() -> bool:
+    """ загружены ли метаданные фильмов (проверка без ожидания загрузки) """
+    return _movies_df is not None
+
+
+def get_vocabulary() -> ItemVocabulary:
+    """
+    возвращает словарь фильмов (movie_id ↔ номер ↔ нормализованное название).
+
+    возвращает:
+        ItemVocabulary: словарь, по номерам которого идентифицируются фильмы в CF-стеке.
+    """
+    load_dataset()
+    return _vocab
+
+
+def load_movielens_ratings() -> RatingArrays:
     """
     загружает базовые рейтинги из предварительно загруженного датасета MovieLens.
 
-    функция объединяет данные о рейтингах пользователей с фильмами, добавляет нормализованные названия
-    и возвращает список объектов Rating для дальнейшей работы.
+    movie_id переводятся в номера фильмов из словаря одним векторным обращением,
+    без merge с таблицей фильмов и без создания объекта на каждую оценку.
+    если RATINGS_FILE — не u.data, части потокового чтения склеиваются в общие массивы.
 
     возвращает:
-        List[Rating]: список объектов Rating с информацией о пользователе, фильме и рейтинге.
-    """
-    ratings_df, movies_df = load_dataset()   # загружаем данные о фильмах и рейтингах
-    # объединяем данные о фильмах и их оценках
-    merged = ratings_df.merge(
-        movies_df[["movie_id", "normalized_title"]],
-        left_on="item_id",
-        right_on="movie_id",
-        how="left",
+        RatingArrays: параллельные массивы ID пользователей, номеров фильмов и оценок.
+    """
+    ratings_df, _ = load_dataset()   # загружаем данные о фильмах и рейтингах
+    if ratings_df is None:
+        chunks = list(stream_movielens_ratings())
+        return RatingArrays(
+            user_ids=np.concatenate([chunk.user_ids for chunk in chunks]),
+            item_ids=np.concatenate([chunk.item_ids for chunk in chunks]),
+            scores=np.concatenate([chunk.scores for chunk in chunks]),
+        )
+    return RatingArrays(
+        user_ids=ratings_df["user_id"].to_numpy(dtype=np.int32),
+        item_ids=_vocab.encode(ratings_df["item_id"].to_numpy()),
+        scores=ratings_df["rating"].to_numpy(dtype=np.float32),
     )
-    # заполняем нормализованные названия, если они отсутствуют
-    merged["normalized_title"] = merged["normalized_title"].fillna(merged["item_id"].astype(str))
-
-    result: List[Rating] = []
-    # перебираем объединенные строки и создаем объекты Rating
-    for row in merged.itertuples():
-        result.append(
-            Rating(
-                user_id=int(row.user_id),
-                item_id=str(row.normalized_title),
-                score=float(row.rating),
-            )
+
+
+def stream_movielens_ratings(path: Path = RATINGS_FILE, chunk_size: int = RATINGS_CHUNK_SIZE) -> Iterator[RatingArrays]:
+    """
+    потоково читает файл оценок (u.data, ratings.dat или ratings.csv) частями по chunk_size строк.
+
+    movie_id каждой части переводятся в номера фильмов через словарь, построенный по фильмам RATINGS_FILE
+    (path должен быть того же варианта MovieLens); фильмы, которых нет в файле фильмов, добавляются в конец словаря.
+    части не накапливаются здесь: хранилище копит их как компактные массивы (см. RecommendationStorage.load_chunks).
+
+    аргументы:
+        path (Path): путь к файлу оценок.
+        chunk_size (int): число строк в одной части.
+
+    возвращает:
+        Iterator[RatingArrays]: параллельные массивы оценок очередной части.
+    """
+    vocab = get_vocabulary()
+    for chunk in iter_rating_chunks(path, chunk_size):
+        yield RatingArrays(
+            user_ids=chunk["user_id"].to_numpy(dtype=np.int32),
+            item_ids=vocab.encode_or_add(chunk["item_id"].to_numpy()),
+            scores=chunk["rating"].to_numpy(dtype=np.float32),
         )
-    return result
 
 
-def find_movie_by_name(name: str) -> Optional[str]:
+def find_movie_by_name(name: str) -> Optional[int]:
     """
-    ищет фильм по части названия, используя нестрогое сопоставление (substring matching) после нормализации.
+    ищет фильм по названию через поисковый индекс (см. find_movie_candidates) и возвращает лучший вариант.
 
     аргументы:
         name (str): название фильма, которое нужно найти.
 
     возвращает:
-        Optional[str]: нормализованное название фильма, если найдено. В противном случае возвращает None.
+        Optional[int]: номер фильма, если найден. В противном случае возвращает None.
+    """
+    candidates = find_movie_candidates(name, limit=1)
+    return candidates[0] if candidates else None
+
+
+def find_movie_candidates(name: str, limit: int = 5) -> List[int]:
     """
-    _, movies_df = load_dataset()
+    возвращает несколько лучших кандидатов по названию (например, для уточнения у пользователя).
+
+    порядок: точное совпадение > совпадение по началу > все слова запроса есть в названии >
+    нечеткое совпадение по триграммам; при равенстве выше фильм с большим числом оценок.
+
+    аргументы:
+        name (str): название фильма, которое нужно найти.
+        limit (int): сколько кандидатов вернуть.
+
+    возвращает:
+        List[int]: номера фильмов по убыванию релевантности.
+    """
+    load_dataset()
     # нормализуем название фильма перед поиском
     needle = normalize_movie(name)
-    if not needle:
-        return None
-     # ищем фильм по нормализованному названию
-    for nm in movies_df["normalized_title"]:
-        if isinstance(nm, str) and needle in nm:
-            return nm
-    return None
+    if not needle or _search_index is None:
+        return []
+    return [item for item, _score in _search_index.search(needle, limit=limit)]
 
 
-def display_title(normalized_title: str) -> str:
+def display_title(item: int) -> str:
     """
-    форматирует нормализованное название фильма для отображения.
+    форматирует название фильма для отображения.
 
     аргументы:
-        normalized_title (str): нормализованное название фильма.
+        item (int): номер фильма.
 
     возвращает:
         str: отформатированное название фильма для отображения.
     """
-    if not _display_map:
-        load_dataset()    # загружаем данные, если они еще не загружены
-    return _display_map.get(normalized_title, normalized_title)
+    load_dataset()    # загружаем данные, если они еще не загружены (или ждем фоновую загрузку)
+    if item < len(_movie_table) and _movie_table.described[item]:
+        return _movie_table.displays[item]
+    return _vocab.title(item)
 
 
-def get_movie_info(normalized_title: str) -> Tuple[str, List[str], float]:
+def get_movie_info(item: int) -> Tuple[str, List[str], float]:
     """
     возвращает отображаемое название фильма, список жанров и средний рейтинг.
 
     аргументы:
-        normalized_title (str): нормализованное название фильма.
+        item (int): номер фильма.
 
     возвращает:
         Tuple[str, List[str], float]: отображаемое название, список жанров и средний рейтинг фильма.
     """
-    if not _movie_meta:
-        load_dataset()    # загружаем метаинформацию о фильмах
-    meta = _movie_meta.get(normalized_title)
-    if not meta:
-        return normalized_title, [], 0.0
-    return str(meta["display"]), list(meta["genres"]), float(meta["avg"])
+    load_dataset()    # загружаем метаинформацию о фильмах (или ждем фоновую загрузку)
+    table = _movie_table
+    if item >= len(table) or not table.described[item]:
+        return _vocab.title(item), [], 0.0
+    return table.displays[item], table.genre_names(item), float(table.averages[item])
 
 
-def format_movie_line(normalized_title: str, rating: Optional[float] = None) -> str:
+def format_movie_line(item: int, rating: Optional[float] = None) -> str:
     """
     форматирует строку фильма с названием, жанрами и рейтингом.
+    здесь номер фильма впервые переводится обратно в название.
 
     аргументы:
-        normalized_title (str): нормализованное название фильма.
+        item (int): номер фильма.
         rating (Optional[float]): рейтинг фильма. если не передан, используется средний рейтинг.
 
     возвращает:
         str: отформатированная строка фильма.
     """
-    display, genres, avg = get_movie_info(normalized_title)
-    genres_text = ", ".join(genres) if genres else "жанр не указан"
-    score = rating if rating is not None else avg
-    return f"{display} — жанры: {genres_text} — рейтинг {score:.2f}"
+    load_dataset()
+    if item < len(_render):
+        return _render.line(item, rating)
+    # фильм добавлен в словарь уже после загрузки (новые movie_id из оценок)
+    score = rating if rating is not None else 0.0
+    return f"{_vocab.title(item)} — жанры: {NO_GENRES} — рейтинг {score:.2f}"
+
+
+def format_movie_lines(items: Sequence[int], offset: int = 0) -> List[str]:
+    """
+    пронумерованные строки фильмов для страницы выдачи (со средним рейтингом).
+
+    аргументы:
+        items (Sequence[int]): номера фильмов.
+        offset (int): сколько строк было на предыдущих страницах.
+
+    возвращает:
+        List[str]: строки вида "<n>. <строка фильма>".
+    """
+    load_dataset()
+    if all(item < len(_render) for item in items):
+        return _render.numbered(items, offset)
+    return [f"{n}. {format_movie_line(item)}" for n, item in enumerate(items, start=offset + 1)]
 
 
 def list_genres() -> List[str]:
@@ -170,39 +325,60 @@ def list_genres() -> List[str]:
     return GENRES
 
 
-def top_movies_by_genre(genre: str, top_n: int = 10) -> List[Tuple[str, float]]:
+def top_movies_by_genre(genre: str, top_n: int = 10, offset: int = 0) -> List[Tuple[int, float]]:
     """
     возвращает топ фильмов по среднему рейтингу в заданном жанре.
+    рейтинги жанров предрассчитаны в load_dataset, поэтому запрос — это срез готового массива.
 
     аргументы:
         genre (str): жанр для поиска.
         top_n (int): количество фильмов, которое нужно вернуть.
+        offset (int): сколько фильмов пропустить (для постраничного вывода).
 
     возвращает:
-        List[Tuple[str, float]]: список кортежей, где первый элемент — это название фильма, а второй — его рейтинг.
-    """
-    _, movies_df = load_dataset()
-    genre_clean = genre.strip()
-    genre_match = None
-    # ищем подходящий жанр в списке доступных жанров
-    for g in GENRES:
-        if g.lower() == genre_clean.lower():
-            genre_match = g
-            break
-    if not genre_match:
-        return []    # возвращаем пустой список, если жанр не найден
-
-    # фильтруем фильмы по жанру
-    filtered = movies_df[movies_df[genre_match] == 1]
-    # добавляем средние рейтинги и сортируем
-    filtered = filtered.copy()
-    filtered["avg_rating"] = filtered["movie_id"].map(_avg_ratings).fillna(0.0)
-    sorted_movies = filtered.sort_values(by="avg_rating", ascending=False)
-    # добавляем фильмы в результат
-    result: List[Tuple[str, float]] = []
-    for row in sorted_movies.itertuples():
-        if isinstance(row.normalized_title, str) and row.normalized_title:
-            result.append((row.normalized_title, float(row.avg_rating)))
-            if len(result) >= top_n:
-                break
-    return result
+        List[Tuple[int, float]]: список кортежей, где первый элемент — это номер фильма, а второй — его рейтинг.
+    """
+    load_dataset()
+    if _genre_index is None:
+        return []
+    return _genre_index.top(genre, top_n=top_n, offset=offset)
+
+
+def popular_movies(top_n: int = 10, offset: int = 0) -> List[Tuple[int, float]]:
+    """
+    возвращает самые популярные фильмы (по числу оценок).
+
+    аргументы:
+        top_n (int): количество фильмов, которое нужно вернуть.
+        offset (int): сколько фильмов пропустить (для постраничного вывода).
+
+    возвращает:
+        List[Tuple[int, float]]: список кортежей (номер фильма, средний рейтинг).
+    """
+    load_dataset()
+    return [(item, get_movie_info(item)[2]) for item in _popular_items[offset:offset + top_n].tolist()]
+
+
+def find_movies_by_genres(query: GenreQuery, top_n: int = 10, offset: int = 0) -> List[Tuple[int, float]]:
+    """
+    возвращает топ фильмов по сочетанию жанров (И/ИЛИ) и необязательному диапазону лет.
+
+    аргументы:
+        query (GenreQuery): разобранный запрос (см. genre_index.parse_genre_query).
+        top_n (int): количество фильмов, которое нужно вернуть.
+        offset (int): сколько фильмов пропустить (для постраничного вывода).
+
+    возвращает:
+        List[Tuple[int, float]]: список кортежей (номер фильма, средний рейтинг).
+    """
+    load_dataset()
+    if _genre_index is None:
+        return []
+    return _genre_index.query(
+        query.genres,
+        match_all=query.match_all,
+        year_from=query.year_from,
+        year_to=query.year_to,
+        top_n=top_n,
+        offset=offset,
+    )
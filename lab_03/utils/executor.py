@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from config import EXECUTOR_KIND, EXECUTOR_MAX_PENDING, EXECUTOR_RESULT_CACHE, EXECUTOR_TIMEOUT, EXECUTOR_WORKERS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Offloader:
+    """
+    выносит синхронные тяжелые вызовы (поиск, соседи, форматирование) из цикла событий aiogram в пул.
+
+    одновременно в пуле выполняется не больше workers вызовов, ждать может не больше max_pending.
+    если очередь заполнена или результат не готов за timeout секунд, обработчик не ждет:
+    отдается последний удачный результат того же вызова, а если его нет — запасной ответ (fallback).
+    опоздавший вызов продолжает работать в пуле и занимает место до своего завершения.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: int = 4,
+        max_pending: int = 64,
+        timeout: float = 5.0,
+        cache_size: int = 1024,
+    ) -> None:
+        if kind not in ("thread", "process"):
+            raise ValueError(f"неизвестный вид пула: {kind!r}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.timeout = timeout    # 0 — ждать без ограничения
+        self.cache_size = cache_size
+        self._initializer: Optional[Callable[..., None]] = None
+        self._initargs: Tuple[Any, ...] = ()
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0    # вызовы, которые ждут места или выполняются и еще ожидаются обработчиком
+        self._recent: "OrderedDict[Hashable, Any]" = OrderedDict()    # последние удачные результаты
+        self.completed = 0
+        self.rejected = 0    # очередь заполнена
+        self.timeouts = 0
+        self.cached_fallbacks = 0
+        self.default_fallbacks = 0
+
+    def set_initializer(self, initializer: Callable[..., None], *initargs: Any) -> None:
+        """
+        задает подготовку процесса пула (загрузку данных); применяется к пулу, созданному после вызова.
+
+        аргументы:
+            initializer (Callable[..., None]): функция уровня модуля (для пула процессов — сериализуемая).
+            initargs (Any): ее аргументы.
+        """
+        self._initializer = initializer
+        self._initargs = initargs
+
+    def _executor(self) -> Executor:
+        """ пул создается при первом вызове, а не при импорте обработчиков """
+        if self._pool is None:
+            if self.kind == "process":
+                # spawn: в основном процессе уже работают потоки (прогрев), fork с ними небезопасен
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self._initializer,
+                    initargs=self._initargs,
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="offload",
+                    initializer=self._initializer,
+                    initargs=self._initargs,
+                )
+        return self._pool
+
+    async def _submit(self, func: Callable[..., T], args: Tuple[Any, ...]) -> T:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        slots = self._slots
+        await slots.acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._executor(), func, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # место освобождается, когда вызов действительно закончился, а не когда обработчик перестал ждать
+        future.add_done_callback(lambda _future: slots.release())
+        return await asyncio.shield(future)
+
+    def _remember(self, key: Optional[Hashable], value: Any) -> None:
+        if key is None or self.cache_size <= 0:
+            return
+        self._recent[key] = value
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.cache_size:
+            self._recent.popitem(last=False)
+
+    def _degrade(self, key: Optional[Hashable], fallback: Optional[Callable[[], T]]) -> T:
+        """ запасной ответ: последний удачный результат того же вызова или fallback() """
+        if key is not None and key in self._recent:
+            self.cached_fallbacks += 1
+            return self._recent[key]
+        if fallback is None:
+            raise TimeoutError("пул занят, а запасного ответа нет")
+        self.default_fallbacks += 1
+        return fallback()
+
+    async def run(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        fallback: Optional[Callable[[], T]] = None,
+        timeout: Optional[float] = None,
+    ) -> T:
+        """
+        выполняет func(*args) в пуле, не блокируя цикл событий.
+        если пул занят или не успел, а ни запомненного результата, ни fallback нет, — TimeoutError.
+
+        аргументы:
+            func (Callable[..., T]): синхронная функция (для пула процессов — уровня модуля).
+            args (Any): ее аргументы; если они хешируемы, удачный результат запоминается для запасных ответов.
+            fallback (Optional[Callable[[], T]]): быстрый запасной ответ, вызывается в цикле событий.
+            timeout (Optional[float]): сколько секунд ждать, None — значение пула.
+
+        возвращает:
+            T: результат вызова или запасной ответ.
+        """
+        key: Optional[Hashable] = (func.__module__, func.__qualname__, args)
+        try:
+            hash(key)
+        except TypeError:
+            key = None
+
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning("очередь пула заполнена (%d), запасной ответ для %s", self._pending, func.__qualname__)
+            return self._degrade(key, fallback)
+
+        self._pending += 1
+        try:
+            limit = self.timeout if timeout is None else timeout
+            result = await asyncio.wait_for(self._submit(func, args), limit or None)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning("%s не уложился в %.1f с, запасной ответ", func.__qualname__, limit)
+            return self._degrade(key, fallback)
+        finally:
+            self._pending -= 1
+        self.completed += 1
+        self._remember(key, result)
+        return result
+
+    def shutdown(self) -> None:
+        """ останавливает пул, не дожидаясь опоздавших вызовов """
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._slots = None
+
+    def stats(self) -> Dict[str, int]:
+        """
+        счетчики пула для мониторинга.
+
+        возвращает:
+            Dict[str, int]: pending, completed, rejected, timeouts, cached_fallbacks, default_fallbacks.
+        """
+        return {
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cached_fallbacks": self.cached_fallbacks,
+            "default_fallbacks": self.default_fallbacks,
+        }
+
+
+# общий пул для обработчиков бота
+offloader = Offloader(EXECUTOR_KIND, EXECUTOR_WORKERS, EXECUTOR_MAX_PENDING, EXECUTOR_TIMEOUT, EXECUTOR_RESULT_CACHE)
+
+
+async def run(
+    func: Callable[..., T],
+    *args: Any,
+    fallback: Optional[Callable[[], T]] = None,
+    timeout: Optional[float] = None,
+) -> T:
+    """
+    выполняет func(*args) в общем пуле (см. Offloader.run).
+
+    аргументы:
+        func (Callable[..., T]): синхронная функция.
+        args (Any): ее аргументы.
+        fallback (Optional[Callable[[], T]]): запасной ответ при перегрузке или таймауте.
+        timeout (Optional[float]): сколько секунд ждать, None — EXECUTOR_TIMEOUT.
+
+    возвращает:
+        T: результат вызова или запасной ответ.
+    """
+    return await offloader.run(func, *args, fallback=fallback, timeout=timeout)
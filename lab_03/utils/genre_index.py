@@ -0,0 +1,197 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# токены запроса с годами: 1995, 1990-1999, 1990s, 90s, 90-е, 90-х
+_YEAR_RANGE_RE = re.compile(r"^(\d{4})(?:-(\d{4}))?$")
+_DECADE_RE = re.compile(r"^(\d{2}|\d{4})(?:s|-?е|-?х)$")
+
+
+class GenreQuery(NamedTuple):
+    # разобранный запрос /genre: жанры, режим сочетания и необязательный диапазон лет (включительно)
+    genres: List[str]
+    match_all: bool
+    year_from: Optional[int]
+    year_to: Optional[int]
+
+
+def _decade_start(token: str) -> int:
+    """ начало десятилетия: "90" -> 1990, "00" -> 2000, "1980" -> 1980 """
+    year = int(token)
+    if len(token) == 2:
+        year += 1900 if year >= 20 else 2000
+    return year - year % 10
+
+
+def parse_genre_query(text: str) -> GenreQuery:
+    """
+    разбирает расширенный синтаксис /genre.
+
+    жанры через "+" должны быть у фильма одновременно (И), через "|" — любой из них (ИЛИ);
+    пробел между жанрами работает как разделитель запроса ("Comedy Romance" — то же, что "Comedy+Romance").
+    годы задаются отдельным словом: 1995, 1990-1999, 1990s, 90s, 90-е.
+    например: "Comedy+Romance 90s", "War|Western 1950-1970".
+
+    аргументы:
+        text (str): текст запроса после команды.
+
+    возвращает:
+        GenreQuery: жанры (как написаны в запросе), режим и диапазон лет.
+    """
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    genre_parts: List[str] = []
+    for token in text.split():
+        low = token.lower()
+        year_range = _YEAR_RANGE_RE.match(low)
+        decade = _DECADE_RE.match(low)
+        if year_range:
+            year_from = int(year_range.group(1))
+            year_to = int(year_range.group(2) or year_range.group(1))
+        elif decade:
+            year_from = _decade_start(decade.group(1))
+            year_to = year_from + 9
+        else:
+            genre_parts.append(token)
+
+    # в названиях жанров нет пробелов, поэтому слова запроса — отдельные жанры
+    match_all = not any("|" in part for part in genre_parts)
+    separator = "+" if match_all else "|"
+    genres = [g for part in genre_parts for g in part.split(separator) if g]
+    return GenreQuery(genres, match_all, year_from, year_to)
+
+
+class GenreIndex:
+    """
+    предрассчитанный рейтинг фильмов по каждому жанру.
+
+    для каждого жанра хранится массив номеров фильмов, уже отсортированный
+    по убыванию средней оценки (при равенстве — в порядке файла),
+    поэтому запрос топа или следующей страницы — это срез за O(top_n).
+    для сочетаний жанров флаги каждого фильма упакованы в битовую маску,
+    а годы выпуска лежат в отсортированном массиве для поиска диапазона через bisect.
+    """
+
+    def __init__(
+        self,
+        items: Sequence[int],
+        scores: np.ndarray,
+        flags: np.ndarray,
+        genres: Sequence[str],
+        years: Sequence[int],
+    ) -> None:
+        self.items: np.ndarray = np.asarray(items, dtype=np.int32)    # номера фильмов (ItemVocabulary) по позициям индекса
+        self.scores: np.ndarray = np.asarray(scores, dtype=np.float64)    # средняя оценка фильма
+        self.genres: List[str] = list(genres)
+        self._by_lower: Dict[str, str] = {g.lower(): g for g in self.genres}
+
+        # общий порядок по убыванию оценки; устойчивая сортировка сохраняет порядок файла при равенстве
+        order = np.argsort(-self.scores, kind="stable")
+        flags = np.asarray(flags, dtype=bool)
+        self.ranked: Dict[str, np.ndarray] = {
+            genre: order[flags[order, col]].astype(np.int32) for col, genre in enumerate(self.genres)
+        }
+        self._order: np.ndarray = order.astype(np.int32)
+
+        # бит i маски — i-й жанр из genres
+        self.masks: np.ndarray = (flags.astype(np.uint32) << np.arange(len(self.genres), dtype=np.uint32)).sum(
+            axis=1, dtype=np.uint32
+        )
+        self.years: np.ndarray = np.asarray(years, dtype=np.int32)    # 0 — год неизвестен
+        self._year_order: np.ndarray = np.argsort(self.years, kind="stable").astype(np.int32)
+        self._sorted_years: List[int] = self.years[self._year_order].tolist()
+
+    def match_genre(self, genre: str) -> str:
+        """
+        находит жанр без учета регистра.
+
+        аргументы:
+            genre (str): название жанра из запроса.
+
+        возвращает:
+            str: каноническое название жанра или пустая строка.
+        """
+        return self._by_lower.get(genre.strip().lower(), "")
+
+    def top(self, genre: str, top_n: int = 10, offset: int = 0) -> List[Tuple[int, float]]:
+        """
+        возвращает страницу рейтинга жанра.
+
+        аргументы:
+            genre (str): название жанра (без учета регистра).
+            top_n (int): размер страницы.
+            offset (int): сколько фильмов пропустить от начала рейтинга.
+
+        возвращает:
+            List[Tuple[int, float]]: (номер фильма, средняя оценка); пусто, если жанр не найден.
+        """
+        ranked = self.ranked.get(self.match_genre(genre))
+        if ranked is None:
+            return []
+        return self._page(ranked, top_n, offset)
+
+    def _page(self, ranked: np.ndarray, top_n: int, offset: int) -> List[Tuple[int, float]]:
+        page = ranked[offset:offset + top_n]
+        return list(zip(self.items[page].tolist(), self.scores[page].tolist()))
+
+    def genre_mask(self, genres: Sequence[str]) -> Optional[int]:
+        """
+        собирает битовую маску из названий жанров.
+
+        аргументы:
+            genres (Sequence[str]): названия жанров (без учета регистра).
+
+        возвращает:
+            Optional[int]: маска или None, если хотя бы один жанр не найден.
+        """
+        mask = 0
+        for genre in genres:
+            match = self.match_genre(genre)
+            if not match:
+                return None
+            mask |= 1 << self.genres.index(match)
+        return mask
+
+    def query(
+        self,
+        genres: Sequence[str],
+        match_all: bool = True,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        top_n: int = 10,
+        offset: int = 0,
+    ) -> List[Tuple[int, float]]:
+        """
+        топ фильмов по сочетанию жанров и диапазону лет.
+
+        аргументы:
+            genres (Sequence[str]): жанры запроса (пустой список — без фильтра по жанрам).
+            match_all (bool): True — нужны все жанры (И), False — хотя бы один (ИЛИ).
+            year_from (Optional[int]): первый год диапазона включительно.
+            year_to (Optional[int]): последний год диапазона включительно.
+            top_n (int): размер страницы.
+            offset (int): сколько фильмов пропустить от начала рейтинга.
+
+        возвращает:
+            List[Tuple[int, float]]: (номер фильма, средняя оценка); пусто, если жанр не найден.
+        """
+        mask = self.genre_mask(genres)
+        if mask is None:
+            return []
+        # один жанр без лет — готовый рейтинг
+        if len(genres) == 1 and year_from is None and year_to is None:
+            return self.top(genres[0], top_n=top_n, offset=offset)
+
+        selected = np.ones(len(self.items), dtype=bool)
+        if mask:
+            hits = self.masks & np.uint32(mask)
+            selected &= (hits == mask) if match_all else (hits != 0)
+        if year_from is not None or year_to is not None:
+            lo = bisect_left(self._sorted_years, year_from if year_from is not None else 1)
+            hi = bisect_right(self._sorted_years, year_to if year_to is not None else np.iinfo(np.int32).max)
+            in_years = np.zeros(len(self.items), dtype=bool)
+            in_years[self._year_order[lo:hi]] = True
+            selected &= in_years
+        return self._page(self._order[selected[self._order]], top_n, offset)
@@ -0,0 +1,241 @@
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from config import CF_INCREMENTAL_MAX_ITEMS
+from .cf import UserItemMatrix
+from .neighbors import NeighborStore, top_k_rows
+from .sparse_similarity import DEFAULT_BLOCK_SIZE, pair_statistics, pearson_from_stats, prepare_operands
+
+# изменение одной оценки: (ID пользователя, ID фильма, старая оценка или None, новая оценка)
+RatingChange = Tuple[int, Hashable, Optional[float], float]
+
+# байт на одну пару фильмов: count (int32) + sums, squares, cross (float64)
+BYTES_PER_PAIR = 4 + 3 * 8
+
+
+def check_catalog_size(n_items: int, max_items: int) -> None:
+    """
+    проверяет, что статистики пар для такого каталога допустимо держать в памяти,
+    и бросает ValueError, если фильмов больше max_items.
+
+    аргументы:
+        n_items (int): число фильмов.
+        max_items (int): предел каталога для инкрементального режима.
+    """
+    if n_items > max_items:
+        raise ValueError(
+            f"инкрементальный режим не поддерживает каталог из {n_items} фильмов (предел {max_items}): "
+            f"статистики пар заняли бы {n_items * n_items * BYTES_PER_PAIR / 2 ** 30:.1f} ГБ"
+        )
+
+
+class PairStatistics:
+    """
+    достаточные статистики Пирсона для каждой пары фильмов.
+
+    для пары (a, b) по пользователям, оценившим оба фильма, хранятся:
+    count[a, b] — их число, sums[a, b] — сумма оценок фильма a,
+    squares[a, b] — сумма квадратов оценок фильма a, cross[a, b] — сумма произведений оценок.
+    суммы для фильма b берутся из транспонированных матриц, поэтому новая
+    или измененная оценка меняет только пары, в которые входит ее фильм.
+
+    статистики плотные: четыре массива items x items (int32 и три float64, 28 байт на пару),
+    то есть O(items²) памяти — режим рассчитан на каталоги до нескольких тысяч фильмов.
+    from_ratings и apply отказываются работать сверх max_items (ValueError).
+    """
+
+    def __init__(
+        self,
+        items: Sequence[Hashable],
+        count: np.ndarray,
+        sums: np.ndarray,
+        squares: np.ndarray,
+        cross: np.ndarray,
+        max_items: int = CF_INCREMENTAL_MAX_ITEMS,
+    ) -> None:
+        self.max_items = max_items    # предел каталога (см. check_catalog_size)
+        self.items: List[Hashable] = list(items)
+        self.index: Dict[Hashable, int] = {item: i for i, item in enumerate(self.items)}
+        self.count = count
+        self.sums = sums
+        self.squares = squares
+        self.cross = cross
+
+    @classmethod
+    def from_ratings(
+        cls,
+        ratings: sparse.csr_matrix,
+        items: Sequence[Hashable],
+        max_items: int = CF_INCREMENTAL_MAX_ITEMS,
+    ) -> "PairStatistics":
+        """
+        полный расчет статистик по матрице items x users.
+        если фильмов больше max_items, бросает ValueError (см. check_catalog_size).
+
+        аргументы:
+            ratings (sparse.csr_matrix): матрица items x users с оценками.
+            items (Sequence[Hashable]): ID фильмов по строкам матрицы.
+            max_items (int): предел каталога.
+
+        возвращает:
+            PairStatistics: статистики для всех пар фильмов.
+        """
+        check_catalog_size(len(items), max_items)
+        n, sum_a, _, sq_a, _, cross = pair_statistics(prepare_operands(ratings), 0, ratings.shape[0])
+        return cls(items, n.astype(np.int32), sum_a, sq_a, cross, max_items)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def similarity_rows(self, rows: np.ndarray) -> np.ndarray:
+        """
+        коэффициенты Пирсона для выбранных строк против всех фильмов.
+
+        аргументы:
+            rows (np.ndarray): номера фильмов.
+
+        возвращает:
+            np.ndarray: блок сходств len(rows) x items.
+        """
+        return pearson_from_stats(
+            self.count[rows],
+            self.sums[rows],
+            self.sums[:, rows].T,
+            self.squares[rows],
+            self.squares[:, rows].T,
+            self.cross[rows],
+        )
+
+    def _grow(self, new_items: List[Hashable]) -> None:
+        """ добавляет нулевые строки и столбцы для новых фильмов """
+        for item in new_items:
+            self.index[item] = len(self.items)
+            self.items.append(item)
+        extra = ((0, len(new_items)), (0, len(new_items)))
+        self.count = np.pad(self.count, extra)
+        self.sums = np.pad(self.sums, extra)
+        self.squares = np.pad(self.squares, extra)
+        self.cross = np.pad(self.cross, extra)
+
+    def apply(self, changes: Iterable[RatingChange], user_item: UserItemMatrix) -> Tuple[np.ndarray, bool]:
+        """
+        применяет пачку изменений оценок одним векторизованным проходом.
+        если новые фильмы выводят каталог за max_items, бросает ValueError и ничего не меняет.
+
+        для каждой статистики вида Fᵀ·G по затронутым пользователям
+        приращение равно dFᵀ·G_new + F_oldᵀ·dG, где dF и dG ненулевые только
+        в измененных клетках, так что стоимость пропорциональна
+        (число изменений) x (история затронутых пользователей).
+
+        аргументы:
+            changes (Iterable[RatingChange]): изменения оценок в порядке применения.
+            user_item (UserItemMatrix): обратный индекс уже с новыми оценками.
+
+        возвращает:
+            Tuple[np.ndarray, bool]: (номера фильмов, у которых изменилась хоть одна пара; появились ли новые фильмы)
+        """
+        # схлопываем повторные изменения одной клетки: берем первую старую и последнюю новую оценку
+        net: Dict[Tuple[int, Hashable], Tuple[Optional[float], float]] = {}
+        for user_id, item, old, new in changes:
+            first_old = net[(user_id, item)][0] if (user_id, item) in net else old
+            net[(user_id, item)] = (first_old, new)
+        if not net:
+            return np.empty(0, dtype=np.int64), False
+
+        new_items = [item for item in dict.fromkeys(item for _, item in net) if item not in self.index]
+        if new_items:
+            # проверка до изменения статистик: при отказе они остаются согласованными со старыми оценками
+            check_catalog_size(len(self.items) + len(new_items), self.max_items)
+            self._grow(new_items)
+
+        users = list(dict.fromkeys(user_id for user_id, _ in net))
+        user_row = {user_id: i for i, user_id in enumerate(users)}
+        shape = (len(users), len(self.items))
+
+        # актуальные строки затронутых пользователей
+        rows: List[int] = []
+        cols: List[int] = []
+        vals: List[float] = []
+        for user_id in users:
+            for item, score in user_item.get(user_id, {}).items():
+                rows.append(user_row[user_id])
+                cols.append(self.index[item])
+                vals.append(score)
+        new_x = sparse.csr_matrix((vals, (rows, cols)), shape=shape, dtype=np.float64)
+        new_b = sparse.csr_matrix((np.ones(len(vals)), (rows, cols)), shape=shape)
+
+        # разреженные приращения в измененных клетках
+        d_rows = [user_row[user_id] for user_id, _ in net]
+        d_cols = [self.index[item] for _, item in net]
+        old_vals = np.array([0.0 if old is None else old for old, _ in net.values()])
+        new_vals = np.array([new for _, new in net.values()])
+        was_rated = np.array([old is not None for old, _ in net.values()], dtype=np.float64)
+        d_x = sparse.csr_matrix((new_vals - old_vals, (d_rows, d_cols)), shape=shape)
+        d_q = sparse.csr_matrix((new_vals ** 2 - old_vals ** 2, (d_rows, d_cols)), shape=shape)
+        d_b = sparse.csr_matrix((1.0 - was_rated, (d_rows, d_cols)), shape=shape)
+
+        new_q = new_x.multiply(new_x).tocsr()
+        old_x = new_x - d_x
+        old_b = new_b - d_b
+        old_q = new_q - d_q
+
+        def delta(d_f: sparse.csr_matrix, g_new: sparse.csr_matrix,
+                  f_old: sparse.csr_matrix, d_g: sparse.csr_matrix) -> sparse.coo_matrix:
+            return (d_f.T @ g_new + f_old.T @ d_g).tocoo()
+
+        touched: List[np.ndarray] = []
+        for target, d in (
+            (self.count, delta(d_b, new_b, old_b, d_b)),
+            (self.sums, delta(d_x, new_b, old_x, d_b)),
+            (self.squares, delta(d_q, new_b, old_q, d_b)),
+            (self.cross, delta(d_x, new_x, old_x, d_x)),
+        ):
+            d.sum_duplicates()
+            if target.dtype.kind == "i":
+                target[d.row, d.col] += np.rint(d.data).astype(target.dtype)
+            else:
+                target[d.row, d.col] += d.data
+            touched.append(d.row)
+            touched.append(d.col)
+
+        return np.unique(np.concatenate(touched)), bool(new_items)
+
+
+def build_neighbor_store(stats: PairStatistics, k: int, block_size: int = DEFAULT_BLOCK_SIZE) -> NeighborStore:
+    """
+    строит top-K соседей по уже посчитанным статистикам пар.
+
+    аргументы:
+        stats (PairStatistics): статистики пар фильмов.
+        k (int): сколько соседей хранить для каждого фильма.
+        block_size (int): сколько строк обрабатывать за раз.
+
+    возвращает:
+        NeighborStore: соседи каждого фильма по убыванию сходства.
+    """
+    n_items = len(stats)
+    k = max(0, min(k, n_items - 1))
+    indices = np.empty((n_items, k), dtype=np.int32)
+    scores = np.empty((n_items, k), dtype=np.float32)
+    for start in range(0, n_items, block_size):
+        rows = np.arange(start, min(start + block_size, n_items))
+        indices[rows], scores[rows] = top_k_rows(stats.similarity_rows(rows), rows, k)
+    return NeighborStore(stats.items, indices, scores)
+
+
+def refresh_neighbors(store: NeighborStore, stats: PairStatistics, rows: np.ndarray,
+                      block_size: int = DEFAULT_BLOCK_SIZE) -> None:
+    """
+    пересчитывает top-K только для строк, у которых изменилась хоть одна пара.
+
+    аргументы:
+        store (NeighborStore): хранилище соседей (обновляется на месте).
+        stats (PairStatistics): статистики пар с тем же порядком фильмов.
+        rows (np.ndarray): номера фильмов, которые нужно обновить.
+        block_size (int): сколько строк обрабатывать за раз.
+    """
+    for start in range(0, len(rows), block_size):
+        block = rows[start:start + block_size]
+        store.indices[block], store.scores[block] = top_k_rows(stats.similarity_rows(block), block, store.k)
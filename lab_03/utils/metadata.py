@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class MovieTable:
+    # метаданные фильмов по столбцам; строка i — фильм с номером i в ItemVocabulary.
+    # фильмы без названия в файле фильмов и фильмы, которые есть только в оценках, не описаны (described = False):
+    # у них название из словаря, нет жанров и средняя оценка 0
+    displays: np.ndarray       # object, "<Название> (<год>)"
+    genre_masks: np.ndarray    # uint32, бит i — жанр genres[i]
+    averages: np.ndarray       # float64, средняя оценка
+    counts: np.ndarray         # int64, число оценок
+    described: np.ndarray      # bool
+    genres: List[str]
+
+    def __len__(self) -> int:
+        return len(self.displays)
+
+    @property
+    def genre_flags(self) -> np.ndarray:
+        """ жанры в виде матрицы фильмы x жанры (bool) """
+        return (self.genre_masks[:, None] >> np.arange(len(self.genres), dtype=np.uint32)) & 1 == 1
+
+    def genre_names(self, item: int) -> List[str]:
+        """ жанры фильма в порядке genres """
+        mask = int(self.genre_masks[item])
+        return [genre for bit, genre in enumerate(self.genres) if mask >> bit & 1]
+
+
+def build_movie_table(
+    movies_df: pd.DataFrame,
+    titles: Sequence[str],
+    counts: np.ndarray,
+    sums: np.ndarray,
+    genres: Sequence[str],
+) -> MovieTable:
+    """
+    собирает таблицу метаданных без прохода по строкам датафрейма.
+
+    аргументы:
+        movies_df (pd.DataFrame): фильмы из файла фильмов (номер фильма совпадает с номером строки).
+        titles (Sequence[str]): названия всех фильмов словаря (для неописанных фильмов).
+        counts (np.ndarray): число оценок каждого фильма словаря.
+        sums (np.ndarray): сумма оценок каждого фильма словаря.
+        genres (Sequence[str]): названия столбцов жанров.
+
+    возвращает:
+        MovieTable: метаданные по номерам фильмов.
+    """
+    n_items = len(titles)
+    n_movies = len(movies_df)
+    normalized = movies_df["normalized_title"]
+    described = np.zeros(n_items, dtype=bool)
+    described[:n_movies] = (normalized.notna() & (normalized.astype(str).str.len() > 0)).to_numpy(dtype=bool)
+    listed = described[:n_movies]
+
+    displays = np.asarray(titles, dtype=object)
+    movie_displays = (
+        movies_df["title_no_year"].astype(str).str.title() + " (" + movies_df["year"].astype(str) + ")"
+    ).to_numpy(dtype=object)
+    displays[:n_movies][listed] = movie_displays[listed]
+
+    genre_masks = np.zeros(n_items, dtype=np.uint32)
+    flags = movies_df[list(genres)].fillna(0).to_numpy() == 1
+    genre_masks[:n_movies] = (flags.astype(np.uint32) << np.arange(len(genres), dtype=np.uint32)).sum(
+        axis=1, dtype=np.uint32
+    )
+    genre_masks[~described] = 0
+
+    counts = np.asarray(counts, dtype=np.int64)
+    sums = np.asarray(sums, dtype=np.float64)
+    averages = np.zeros(n_items, dtype=np.float64)
+    np.divide(sums, counts, out=averages, where=(counts > 0) & described)
+    return MovieTable(displays, genre_masks, averages, counts, described, list(genres))
+
+
+class MovieMetaView(Mapping[int, Dict[str, object]]):
+    # словарный фасад над MovieTable в прежнем формате _movie_meta:
+    # номер описанного фильма -> {"display", "genres", "avg"}; записи собираются при обращении
+    def __init__(self, table: MovieTable) -> None:
+        self._table = table
+        self._items = np.flatnonzero(table.described)
+
+    def __getitem__(self, item: int) -> Dict[str, object]:
+        if not (0 <= item < len(self._table)) or not self._table.described[item]:
+            raise KeyError(item)
+        return {
+            "display": self._table.displays[item],
+            "genres": self._table.genre_names(item),
+            "avg": float(self._table.averages[item]),
+        }
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._items.tolist())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class DisplayView(Mapping[int, str]):
+    # словарный фасад в прежнем формате _display_map: номер описанного фильма -> "<Название> (<год>)"
+    def __init__(self, table: MovieTable) -> None:
+        self._table = table
+        self._items = np.flatnonzero(table.described)
+
+    def __getitem__(self, item: int) -> str:
+        if not (0 <= item < len(self._table)) or not self._table.described[item]:
+            raise KeyError(item)
+        return self._table.displays[item]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._items.tolist())
+
+    def __len__(self) -> int:
+        return len(self._items)
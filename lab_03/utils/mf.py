@@ -0,0 +1,278 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .batch import DEFAULT_USER_BLOCK, BatchRecommendations
+from .cf import UserItemMatrix
+from .neighbors import top_columns
+from .schemas import RatingArrays, Recommendation
+
+# параметры ALS по умолчанию (подобраны на отложенной части u.data, см. benchmarks/mf.py)
+DEFAULT_FACTORS = 16
+DEFAULT_ITERATIONS = 10
+DEFAULT_REGULARIZATION = 0.1
+
+
+@dataclass
+class FactorModel:
+    # модель скрытых факторов: r(u, i) ≈ mean + b_u + b_i + p_u · q_i.
+    # строки user_factors / item_factors соответствуют user_ids / item_ids
+    user_ids: np.ndarray        # int32, ID пользователей по строкам user_factors
+    item_ids: np.ndarray        # int32, номера фильмов (ItemVocabulary) по строкам item_factors
+    user_factors: np.ndarray    # float32, users x factors
+    item_factors: np.ndarray    # float32, items x factors
+    user_bias: np.ndarray       # float32, users
+    item_bias: np.ndarray       # float32, items
+    mean: float
+    regularization: float
+
+    def __post_init__(self) -> None:
+        self.user_index: Dict[int, int] = {user_id: row for row, user_id in enumerate(self.user_ids.tolist())}
+        self.item_index: Dict[int, int] = {item: row for row, item in enumerate(self.item_ids.tolist())}
+
+    @property
+    def factors(self) -> int:
+        return int(self.item_factors.shape[1])
+
+    def predict(self, user_ids: np.ndarray, item_ids: np.ndarray) -> np.ndarray:
+        """
+        предсказывает оценки пар (пользователь, фильм); для неизвестных пользователей и фильмов
+        соответствующие смещения и факторы считаются нулевыми.
+
+        аргументы:
+            user_ids (np.ndarray): ID пользователей.
+            item_ids (np.ndarray): номера фильмов той же длины.
+
+        возвращает:
+            np.ndarray: предсказанные оценки (float64), обрезанные до диапазона 1..5.
+        """
+        users = np.array([self.user_index.get(u, -1) for u in np.asarray(user_ids).tolist()], dtype=np.int64)
+        items = np.array([self.item_index.get(i, -1) for i in np.asarray(item_ids).tolist()], dtype=np.int64)
+        known_u = users >= 0
+        known_i = items >= 0
+        pred = np.full(len(users), self.mean, dtype=np.float64)
+        pred[known_u] += self.user_bias[users[known_u]]
+        pred[known_i] += self.item_bias[items[known_i]]
+        both = known_u & known_i
+        pred[both] += np.einsum(
+            "ij,ij->i", self.user_factors[users[both]], self.item_factors[items[both]], dtype=np.float64
+        )
+        return np.clip(pred, 1.0, 5.0)
+
+    def recommend(self, user_id: int, rated: Iterable[int], top_n: int = 10) -> List[Recommendation]:
+        """
+        рекомендует фильмы с наибольшей предсказанной оценкой:
+        одно произведение матрицы факторов фильмов на вектор пользователя и argpartition.
+
+        аргументы:
+            user_id (int): ID пользователя.
+            rated (Iterable[int]): уже оцененные фильмы (не рекомендуются).
+            top_n (int): сколько фильмов вернуть.
+
+        возвращает:
+            List[Recommendation]: рекомендации по убыванию предсказанной оценки; пусто для неизвестного пользователя.
+        """
+        row = self.user_index.get(user_id)
+        if row is None or top_n <= 0:
+            return []
+        scores = self.item_factors @ self.user_factors[row] + self.item_bias
+        exclude = [self.item_index[item] for item in rated if item in self.item_index]
+        scores[exclude] = -np.inf
+        top_n = min(top_n, len(scores) - len(exclude))
+        if top_n <= 0:
+            return []
+        top = top_columns(scores[None, :], top_n)[0][0]
+        base = self.mean + float(self.user_bias[row])
+        return [
+            Recommendation(item_id=item, score=min(max(base + score, 1.0), 5.0))
+            for item, score in zip(self.item_ids[top].tolist(), scores[top].tolist())
+        ]
+
+    def fold_in(self, user_id: int, ratings: Dict[int, float]) -> None:
+        """
+        пересчитывает (или добавляет) вектор одного пользователя по его оценкам при неизменных факторах фильмов —
+        один шаг ALS для одной строки, без переобучения модели. фильмы, которых нет в модели, не учитываются.
+
+        аргументы:
+            user_id (int): ID пользователя.
+            ratings (Dict[int, float]): все оценки пользователя (номер фильма -> оценка).
+        """
+        pairs = [(self.item_index[item], score) for item, score in ratings.items() if item in self.item_index]
+        if not pairs:
+            return
+        cols = np.fromiter((c for c, _ in pairs), dtype=np.int64, count=len(pairs))
+        values = np.fromiter((s for _, s in pairs), dtype=np.float64, count=len(pairs))
+        fixed = np.hstack([self.item_factors[cols], np.ones((len(cols), 1), dtype=np.float32)])
+        solved = _solve_row(fixed, values - self.mean - self.item_bias[cols], self.regularization)
+        row = self.user_index.get(user_id)
+        if row is None:
+            row = len(self.user_ids)
+            self.user_ids = np.append(self.user_ids, np.int32(user_id))
+            self.user_factors = np.vstack([self.user_factors, np.zeros((1, self.factors), dtype=np.float32)])
+            self.user_bias = np.append(self.user_bias, np.float32(0.0))
+            self.user_index[user_id] = row
+        self.user_factors[row] = solved[:-1]
+        self.user_bias[row] = solved[-1]
+
+
+def _solve_row(fixed: np.ndarray, target: np.ndarray, regularization: float) -> np.ndarray:
+    """ регуляризованные наименьшие квадраты для одной строки (λ масштабируется числом оценок, как в ALS-WR) """
+    fixed = fixed.astype(np.float64, copy=False)
+    gram = fixed.T @ fixed
+    gram[np.diag_indices_from(gram)] += regularization * len(target)
+    return np.linalg.solve(gram, fixed.T @ target)
+
+
+def _als_half_step(
+    ratings: sparse.csr_matrix,
+    fixed_factors: np.ndarray,
+    fixed_bias: np.ndarray,
+    mean: float,
+    regularization: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    один полушаг ALS: при фиксированных факторах и смещениях второй стороны
+    решает задачу наименьших квадратов для каждой строки ratings.
+
+    аргументы:
+        ratings (sparse.csr_matrix): оценки (строки — решаемая сторона, столбцы — фиксированная).
+        fixed_factors (np.ndarray): факторы фиксированной стороны.
+        fixed_bias (np.ndarray): смещения фиксированной стороны.
+        mean (float): средняя оценка.
+        regularization (float): коэффициент регуляризации.
+
+    возвращает:
+        Tuple[np.ndarray, np.ndarray]: (факторы, смещения) решаемой стороны.
+    """
+    n_rows, factors = ratings.shape[0], fixed_factors.shape[1]
+    # столбец единиц в признаках дает свободный член — смещение строки
+    features = np.hstack([fixed_factors, np.ones((len(fixed_factors), 1), dtype=fixed_factors.dtype)])
+    residuals = ratings.data - mean - fixed_bias[ratings.indices]
+    out_factors = np.zeros((n_rows, factors), dtype=np.float32)
+    out_bias = np.zeros(n_rows, dtype=np.float32)
+    indptr = ratings.indptr
+    for row in range(n_rows):
+        lo, hi = indptr[row], indptr[row + 1]
+        if lo == hi:
+            continue
+        solved = _solve_row(features[ratings.indices[lo:hi]], residuals[lo:hi], regularization)
+        out_factors[row] = solved[:-1]
+        out_bias[row] = solved[-1]
+    return out_factors, out_bias
+
+
+def train_als(
+    ratings: RatingArrays,
+    factors: int = DEFAULT_FACTORS,
+    iterations: int = DEFAULT_ITERATIONS,
+    regularization: float = DEFAULT_REGULARIZATION,
+    seed: int = 0,
+) -> FactorModel:
+    """
+    обучает модель скрытых факторов со смещениями методом ALS (чередующиеся наименьшие квадраты).
+
+    на каждой итерации при фиксированных фильмах вектор и смещение каждого пользователя — решение
+    небольшой системы (factors + 1) x (factors + 1), затем то же для фильмов при фиксированных пользователях.
+
+    аргументы:
+        ratings (RatingArrays): обучающие оценки.
+        factors (int): размерность скрытых факторов.
+        iterations (int): число итераций (пар полушагов).
+        regularization (float): коэффициент регуляризации (умножается на число оценок строки).
+        seed (int): зерно начальных факторов.
+
+    возвращает:
+        FactorModel: обученная модель.
+    """
+    user_ids, user_codes = np.unique(ratings.user_ids, return_inverse=True)
+    item_ids, item_codes = np.unique(ratings.item_ids, return_inverse=True)
+    scores = np.asarray(ratings.scores, dtype=np.float64)
+    mean = float(scores.mean()) if len(scores) else 0.0
+    by_user = sparse.csr_matrix((scores, (user_codes, item_codes)), shape=(len(user_ids), len(item_ids)))
+    by_user.sum_duplicates()
+    by_item = by_user.T.tocsr()
+
+    rng = np.random.default_rng(seed)
+    item_factors = (rng.standard_normal((len(item_ids), factors)) * 0.1).astype(np.float32)
+    item_bias = np.zeros(len(item_ids), dtype=np.float32)
+    user_factors = np.zeros((len(user_ids), factors), dtype=np.float32)
+    user_bias = np.zeros(len(user_ids), dtype=np.float32)
+    for _ in range(iterations):
+        user_factors, user_bias = _als_half_step(by_user, item_factors, item_bias, mean, regularization)
+        item_factors, item_bias = _als_half_step(by_item, user_factors, user_bias, mean, regularization)
+    return FactorModel(
+        user_ids.astype(np.int32),
+        item_ids.astype(np.int32),
+        user_factors,
+        item_factors,
+        user_bias,
+        item_bias,
+        mean,
+        regularization,
+    )
+
+
+def recommend_batch(
+    model: FactorModel,
+    user_ids: Sequence[int],
+    user_items: UserItemMatrix,
+    top_n: int = 10,
+    block_size: int = DEFAULT_USER_BLOCK,
+) -> BatchRecommendations:
+    """
+    рекомендации модели факторов для многих пользователей: для блока пользователей —
+    одно произведение матриц факторов, маска уже оцененных фильмов и argpartition по строкам.
+
+    аргументы:
+        model (FactorModel): модель.
+        user_ids (Sequence[int]): пользователи.
+        user_items (UserItemMatrix): обратный индекс "пользователь-фильм" (оцененные фильмы не рекомендуются).
+        top_n (int): сколько фильмов рекомендовать каждому пользователю.
+        block_size (int): сколько пользователей обрабатывать за раз.
+
+    возвращает:
+        BatchRecommendations: рекомендации по убыванию предсказанной оценки (неизвестные пользователи — пустые строки).
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int32)
+    top_n = max(0, min(top_n, len(model.item_ids)))
+    items_out = np.full((len(user_ids), top_n), -1, dtype=np.int32)
+    scores_out = np.full((len(user_ids), top_n), np.nan, dtype=np.float32)
+    if top_n == 0:
+        return BatchRecommendations(user_ids, items_out, scores_out)
+
+    for start in range(0, len(user_ids), block_size):
+        block = user_ids[start:start + block_size].tolist()
+        rows = np.array([model.user_index.get(u, -1) for u in block], dtype=np.int64)
+        known = rows >= 0
+        if not known.any():
+            continue
+        scores = model.user_factors[rows[known]] @ model.item_factors.T
+        scores += model.item_bias
+        scores += (model.mean + model.user_bias[rows[known]])[:, None]
+        for i, user_id in enumerate(np.asarray(block)[known].tolist()):
+            rated = [model.item_index[item] for item in user_items.get(user_id, {}) if item in model.item_index]
+            scores[i, rated] = -np.inf
+
+        cand, cand_scores = top_columns(scores, top_n)
+        found = np.isfinite(cand_scores)
+        out = start + np.flatnonzero(known)
+        items_out[out] = np.where(found, model.item_ids[cand], -1)
+        scores_out[out] = np.where(found, np.clip(cand_scores, 1.0, 5.0), np.nan)
+    return BatchRecommendations(user_ids, items_out, scores_out)
+
+
+def rmse(model: FactorModel, ratings: RatingArrays) -> float:
+    """
+    среднеквадратичная ошибка предсказания оценок.
+
+    аргументы:
+        model (FactorModel): модель.
+        ratings (RatingArrays): проверочные оценки.
+
+    возвращает:
+        float: RMSE.
+    """
+    pred = model.predict(ratings.user_ids, ratings.item_ids)
+    return float(np.sqrt(np.mean((pred - np.asarray(ratings.scores, dtype=np.float64)) ** 2)))
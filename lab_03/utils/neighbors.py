@@ -0,0 +1,122 @@
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# номер пустой ячейки строки соседей: приближенный поиск может найти меньше K кандидатов
+EMPTY = -1
+
+
+class NeighborStore:
+    """
+    компактное хранилище top-K соседей для каждого фильма.
+
+    соседи i-го фильма лежат в строке i двух непрерывных массивов:
+    indices (int32, номера соседей в items) и scores (float32, сходство),
+    уже отсортированных по убыванию сходства. если соседей меньше K,
+    хвост строки заполнен номером EMPTY со сходством 0; neighbors и top его не возвращают.
+    """
+
+    def __init__(self, items: Sequence[Hashable], indices: np.ndarray, scores: np.ndarray) -> None:
+        self.items: List[Hashable] = list(items)    # ID фильмов по номерам строк
+        self.index: Dict[Hashable, int] = {item: i for i, item in enumerate(self.items)}
+        self.indices: np.ndarray = np.ascontiguousarray(indices, dtype=np.int32)
+        self.scores: np.ndarray = np.ascontiguousarray(scores, dtype=np.float32)
+
+    @property
+    def k(self) -> int:
+        """ сколько соседей хранится для каждого фильма """
+        return int(self.indices.shape[1]) if self.indices.ndim == 2 else 0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self.index
+
+    def neighbors(self, item: Hashable, k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        возвращает первые k соседей фильма без копирования.
+
+        аргументы:
+            item (Hashable): ID фильма.
+            k (Optional[int]): сколько соседей вернуть (не больше хранимого K), None — все.
+
+        возвращает:
+            Tuple[np.ndarray, np.ndarray]: (номера соседей, их сходство); пустые массивы, если фильма нет.
+                                           пустые ячейки (EMPTY) отбрасываются.
+        """
+        row = self.index.get(item)
+        if row is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        idx, sims = self.indices[row, :k], self.scores[row, :k]
+        # пустые ячейки всегда в конце строки
+        if len(idx) and idx[-1] == EMPTY:
+            size = int(np.count_nonzero(idx != EMPTY))
+            idx, sims = idx[:size], sims[:size]
+        return idx, sims
+
+    def top(self, item: Hashable, top_n: int = 10, offset: int = 0) -> List[Tuple[Hashable, float]]:
+        """
+        возвращает top-N соседей фильма в виде пар (ID фильма, сходство).
+
+        аргументы:
+            item (Hashable): ID фильма.
+            top_n (int): количество соседей (не больше хранимого K).
+            offset (int): сколько первых соседей пропустить (для постраничного вывода).
+
+        возвращает:
+            List[Tuple[Hashable, float]]: список соседей по убыванию сходства.
+        """
+        idx, sims = self.neighbors(item, offset + top_n)
+        idx, sims = idx[offset:], sims[offset:]
+        items = self.items
+        return [(items[j], s) for j, s in zip(idx.tolist(), sims.tolist())]
+
+
+def top_columns(values: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    k наибольших значений каждой строки по убыванию; при равенстве выше столбец с меньшим номером,
+    в том числе на границе top-k: argpartition выбирает из равных произвольные, поэтому строки
+    с равенством на k-м месте досортировываются целиком устойчивой сортировкой.
+
+    аргументы:
+        values (np.ndarray): матрица rows x columns (-inf — исключенные столбцы).
+        k (int): сколько столбцов оставить (1 <= k <= columns).
+
+    возвращает:
+        Tuple[np.ndarray, np.ndarray]: (номера столбцов, значения), оба rows x k.
+    """
+    cand = np.argpartition(-values, k - 1, axis=1)[:, :k]
+    cand_scores = np.take_along_axis(values, cand, axis=1)
+    kth = cand_scores.min(axis=1, keepdims=True)
+    ties = ((values >= kth).sum(axis=1) > k) & np.isfinite(kth[:, 0])
+    if ties.any():
+        cand[ties] = np.argsort(-values[ties], axis=1, kind="stable")[:, :k]
+        cand_scores = np.take_along_axis(values, cand, axis=1)
+    order = np.lexsort((cand, -cand_scores), axis=-1)
+    return np.take_along_axis(cand, order, axis=1), np.take_along_axis(cand_scores, order, axis=1)
+
+
+def top_k_rows(sims: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    выбирает top-K соседей для блока строк матрицы сходства.
+
+    диагональ (фильм сам с собой) исключается; при равном сходстве
+    выше стоит фильм с меньшим номером, как при устойчивой сортировке.
+
+    аргументы:
+        sims (np.ndarray): блок сходств rows x items (изменяется на месте).
+        rows (np.ndarray): номера строк блока в полной матрице.
+        k (int): сколько соседей оставить.
+
+    возвращает:
+        Tuple[np.ndarray, np.ndarray]: (номера соседей int32, сходства float32), оба rows x k.
+    """
+    n_rows, n_items = sims.shape
+    k = max(0, min(k, n_items - 1))
+    if n_rows == 0 or k == 0:
+        return np.empty((n_rows, k), dtype=np.int32), np.empty((n_rows, k), dtype=np.float32)
+
+    sims[np.arange(n_rows), rows] = -np.inf
+    top_idx, top_scores = top_columns(sims, k)
+    return top_idx.astype(np.int32), top_scores.astype(np.float32)
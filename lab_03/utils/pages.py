@@ -0,0 +1,154 @@
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from . import storage
+from .cursors import (
+    KIND_SIMILAR,
+    decode_cursor,
+    decode_genre_key,
+    decode_similar_key,
+    genre_cursor,
+    similar_cursor,
+)
+from .data_loader import (
+    find_movie_by_name,
+    find_movies_by_genres,
+    format_movie_lines,
+    is_loaded,
+    list_genres,
+    popular_movies,
+)
+from .genre_index import GenreQuery, parse_genre_query
+
+# страницы ответов бота целиком считаются здесь, синхронно и без aiogram:
+# обработчики выполняют эти функции в пуле (utils/executor.py), а результат — простой кортеж,
+# который можно вернуть и из процесса пула
+BATCH_SIZE = 5
+# сколько фильмов всего можно пролистать в одной выдаче
+RESULT_LIMIT = 30
+
+
+class Page(NamedTuple):
+    # готовая страница: ключ сообщения из MESSAGES (заголовок или ошибка, "" — без заголовка),
+    # пронумерованные строки фильмов и курсор следующей страницы
+    message: str
+    lines: List[str]
+    cursor: Optional[str] = None
+
+
+def format_batch(items: Sequence[int], offset: int = 0) -> List[str]:
+    # во всех выдачах выводится средний рейтинг фильма — строки берутся готовыми из кэша вывода
+    return format_movie_lines(items, offset)
+
+
+def _has_more(found: int, offset: int) -> bool:
+    """ есть ли следующая страница: запрос страницы берет на один фильм больше, чем выводит """
+    return found > BATCH_SIZE and offset + BATCH_SIZE < RESULT_LIMIT
+
+
+def similar_page(item: int, offset: int) -> Tuple[List[int], Optional[str]]:
+    """
+    страница похожих фильмов прямо из хранилища соседей и курсор следующей страницы.
+
+    аргументы:
+        item (int): номер исходного фильма.
+        offset (int): начало страницы.
+
+    возвращает:
+        Tuple[List[int], Optional[str]]: номера фильмов страницы и курсор (None, если страница последняя).
+    """
+    recs = storage.similar_items(item, top_n=BATCH_SIZE + 1, offset=offset)
+    cursor = similar_cursor(item, offset + BATCH_SIZE) if _has_more(len(recs), offset) else None
+    return [rec_item for rec_item, _sim in recs[:BATCH_SIZE]], cursor
+
+
+def genre_page(query: GenreQuery, offset: int) -> Tuple[List[int], Optional[str]]:
+    """
+    страница топа по жанрам из предрассчитанного индекса жанров и курсор следующей страницы.
+
+    аргументы:
+        query (GenreQuery): разобранный запрос /genre.
+        offset (int): начало страницы.
+
+    возвращает:
+        Tuple[List[int], Optional[str]]: номера фильмов страницы и курсор (None, если страница последняя).
+    """
+    recs = find_movies_by_genres(query, top_n=BATCH_SIZE + 1, offset=offset) if query.genres else []
+    cursor = genre_cursor(query, list_genres(), offset + BATCH_SIZE) if _has_more(len(recs), offset) else None
+    return [item for item, _avg in recs[:BATCH_SIZE]], cursor
+
+
+def recommend_response(text: str) -> Page:
+    """
+    первая страница ответа на /recommend: поиск фильма по названию и похожие фильмы.
+
+    аргументы:
+        text (str): название фильма из запроса.
+
+    возвращает:
+        Page: страница или ошибка ("error_no_movie", "error_no_recs").
+    """
+    movie_key = find_movie_by_name(text)
+    if movie_key is None:
+        return Page("error_no_movie", [])
+    items, cursor = similar_page(movie_key, 0)
+    if not items:
+        return Page("error_no_recs", [])
+    return Page("recommendation_result", format_batch(items), cursor)
+
+
+def genre_response(text: str) -> Page:
+    """
+    первая страница ответа на /genre.
+
+    аргументы:
+        text (str): запрос после команды (жанры и годы, см. genre_index.parse_genre_query).
+
+    возвращает:
+        Page: страница или ошибка ("error_no_genre").
+    """
+    items, cursor = genre_page(parse_genre_query(text), 0)
+    if not items:
+        return Page("error_no_genre", [])
+    return Page("genre_result", format_batch(items), cursor)
+
+
+def cursor_response(data: str) -> Page:
+    """
+    следующая страница по курсору из callback_data кнопки «еще».
+
+    аргументы:
+        data (str): callback_data (см. utils/cursors.py).
+
+    возвращает:
+        Page: страница без заголовка или ошибка ("error_no_recs").
+    """
+    cursor = decode_cursor(data)
+    items: List[int] = []
+    next_cursor: Optional[str] = None
+    if cursor is not None and cursor.offset < RESULT_LIMIT:
+        if cursor.kind == KIND_SIMILAR:
+            movie_key = decode_similar_key(cursor.key)
+            if movie_key is not None:
+                items, next_cursor = similar_page(movie_key, cursor.offset)
+        else:
+            genre_query = decode_genre_key(cursor.key, list_genres())
+            if genre_query is not None:
+                items, next_cursor = genre_page(genre_query, cursor.offset)
+    if not items:
+        return Page("error_no_recs", [])
+    return Page("", format_batch(items, offset=cursor.offset), next_cursor)
+
+
+def popular_response() -> Page:
+    """
+    запасной ответ, когда пул перегружен или не успел: самые популярные фильмы.
+    данные уже в памяти, поэтому ответ дешевый и считается прямо в цикле событий.
+
+    возвращает:
+        Page: страница без курсора (или сообщение о прогреве, пока метаданные не загружены).
+    """
+    # ждать загрузку метаданных в цикле событий нельзя
+    if not is_loaded():
+        return Page("loading_data", [])
+    items = [item for item, _avg in popular_movies(top_n=BATCH_SIZE)]
+    return Page("busy_fallback", format_batch(items))
@@ -0,0 +1,143 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .cf import ItemUserMatrix
+from .neighbors import NeighborStore, top_k_rows
+from .sparse_similarity import (
+    DEFAULT_BLOCK_SIZE,
+    PearsonOperands,
+    build_item_user_csr,
+    pearson_block,
+    prepare_operands,
+)
+
+# описание массива в общей памяти: (имя сегмента, форма, dtype)
+SharedArraySpec = Tuple[str, Tuple[int, ...], str]
+
+# состояние процесса-воркера: матрицы собираются один раз при старте процесса
+_worker_operands: Optional[PearsonOperands] = None
+_worker_segments: List[shared_memory.SharedMemory] = []
+_worker_k: int = 0
+
+
+def _share_array(array: np.ndarray, segments: List[shared_memory.SharedMemory]) -> SharedArraySpec:
+    """ копирует массив в новый сегмент общей памяти и возвращает его описание """
+    segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    segments.append(segment)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+    return segment.name, array.shape, array.dtype.str
+
+
+def _attach_array(spec: SharedArraySpec) -> np.ndarray:
+    """ подключается к сегменту общей памяти из родительского процесса без копирования """
+    name, shape, dtype = spec
+    # воркеры запускаются через spawn и делят трекер ресурсов с родителем,
+    # поэтому сегмент удаляется один раз — родителем после завершения пула
+    segment = shared_memory.SharedMemory(name=name)
+    _worker_segments.append(segment)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+
+
+def _share_operands(operands: PearsonOperands, segments: List[shared_memory.SharedMemory]) -> Dict[str, SharedArraySpec]:
+    """
+    копирует операнды Пирсона в общую память: шесть массивов значений и две структуры
+    (R, B, R² делят индексы строк, их транспонированные копии — индексы столбцов).
+    """
+    specs = {
+        "indices": _share_array(operands.ratings.indices, segments),
+        "indptr": _share_array(operands.ratings.indptr, segments),
+        "indices_t": _share_array(operands.ratings_t.indices, segments),
+        "indptr_t": _share_array(operands.ratings_t.indptr, segments),
+    }
+    for name in PearsonOperands._fields:
+        specs[name] = _share_array(getattr(operands, name).data, segments)
+    return specs
+
+
+def _init_worker(specs: Dict[str, SharedArraySpec], shape: Tuple[int, int], k: int) -> None:
+    """
+    инициализация воркера: собирает операнды поверх общей памяти родителя без копирования,
+    так что дополнительная память воркера — только плотные блоки его задач.
+    """
+    global _worker_operands, _worker_k
+    rows = (_attach_array(specs["indices"]), _attach_array(specs["indptr"]))
+    cols = (_attach_array(specs["indices_t"]), _attach_array(specs["indptr_t"]))
+
+    def attach(name: str, structure: Tuple[np.ndarray, np.ndarray], matrix_shape: Tuple[int, int]) -> sparse.csr_matrix:
+        return sparse.csr_matrix((_attach_array(specs[name]), *structure), shape=matrix_shape, copy=False)
+
+    transposed = (shape[1], shape[0])
+    _worker_operands = PearsonOperands(
+        attach("ratings", rows, shape),
+        attach("indicator", rows, shape),
+        attach("squares", rows, shape),
+        attach("ratings_t", cols, transposed),
+        attach("indicator_t", cols, transposed),
+        attach("squares_t", cols, transposed),
+    )
+    _worker_k = k
+
+
+def _block_neighbors(start: int, stop: int) -> Tuple[int, np.ndarray, np.ndarray]:
+    """ считает top-K соседей для строк [start, stop) в воркере """
+    sims = pearson_block(_worker_operands, start, stop)
+    indices, scores = top_k_rows(sims, np.arange(start, stop), _worker_k)
+    return start, indices, scores
+
+
+def build_neighbor_store(
+    matrix: ItemUserMatrix,
+    k: int,
+    workers: int,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> NeighborStore:
+    """
+    строит хранилище top-K соседей, распределяя блоки строк по процессам.
+
+    операнды Пирсона (R, B, R² и их транспонированные копии) готовятся один раз в родителе
+    и копируются в общую память; каждый воркер подключается к ним при старте без копирования,
+    а задачи передают только границы блока.
+    результат совпадает с sparse_similarity.build_neighbor_store.
+
+    аргументы:
+        matrix (ItemUserMatrix): матрица "фильм-пользователь".
+        k (int): сколько соседей хранить для каждого фильма.
+        workers (int): число процессов.
+        block_size (int): сколько строк матрицы сходства считает одна задача.
+
+    возвращает:
+        NeighborStore: соседи каждого фильма по убыванию сходства.
+    """
+    ratings, items = build_item_user_csr(matrix)
+    n_items = len(items)
+    k = max(0, min(k, n_items - 1))
+    indices = np.empty((n_items, k), dtype=np.int32)
+    scores = np.empty((n_items, k), dtype=np.float32)
+
+    segments: List[shared_memory.SharedMemory] = []
+    try:
+        specs = _share_operands(prepare_operands(ratings), segments)
+        # spawn: fork из процесса с работающим циклом событий и фоновыми потоками небезопасен
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(specs, ratings.shape, k),
+        ) as pool:
+            starts = list(range(0, n_items, block_size))
+            stops = [min(start + block_size, n_items) for start in starts]
+            for start, block_indices, block_scores in pool.map(_block_neighbors, starts, stops):
+                stop = start + block_indices.shape[0]
+                indices[start:stop] = block_indices
+                scores[start:stop] = block_scores
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    return NeighborStore(items, indices, scores)
@@ -0,0 +1,85 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# текст вместо списка жанров, если у фильма их нет
+NO_GENRES = "жанр не указан"
+
+
+class RenderCache:
+    """
+    готовые строки фильмов для вывода в боте: "<название (год)> — жанры: <...> — рейтинг <x.xx>".
+
+    метаданные после load_dataset не меняются, поэтому для каждого фильма один раз собираются
+    начало строки до оценки (prefix) и вся строка со средней оценкой (line).
+    при выводе остается подставить номер в выдаче и, если оценка своя, отформатировать только ее.
+    """
+
+    def __init__(self, prefixes: Sequence[str], averages: np.ndarray) -> None:
+        self.prefixes: List[str] = list(prefixes)    # по номерам фильмов (ItemVocabulary)
+        self.averages: np.ndarray = np.asarray(averages, dtype=np.float64)
+        self.lines: List[str] = [f"{prefix}{avg:.2f}" for prefix, avg in zip(self.prefixes, self.averages.tolist())]
+
+    @classmethod
+    def build(
+        cls,
+        displays: np.ndarray,
+        genre_masks: np.ndarray,
+        genres: Sequence[str],
+        averages: np.ndarray,
+    ) -> "RenderCache":
+        """
+        собирает строки сразу для всех фильмов.
+
+        текст жанров строится не для каждого фильма, а для каждого встречающегося набора жанров
+        (битовой маски) — таких наборов в MovieLens несколько сотен на тысячи фильмов.
+
+        аргументы:
+            displays (np.ndarray): отображаемые названия (object, по номерам фильмов).
+            genre_masks (np.ndarray): жанры фильмов битовыми масками (бит i — genres[i]).
+            genres (Sequence[str]): названия жанров.
+            averages (np.ndarray): средние оценки по номерам фильмов.
+
+        возвращает:
+            RenderCache: готовые строки.
+        """
+        unique, inverse = np.unique(np.asarray(genre_masks), return_inverse=True)
+        genre_texts = []
+        for mask in unique.tolist():
+            names = [genre for bit, genre in enumerate(genres) if mask >> bit & 1]
+            genre_texts.append(", ".join(names) if names else NO_GENRES)
+        texts = np.asarray(genre_texts, dtype=object)[inverse.reshape(-1)]
+        prefixes = np.asarray(displays, dtype=object) + " — жанры: " + texts + " — рейтинг "
+        return cls(prefixes.tolist(), averages)
+
+    def __len__(self) -> int:
+        return len(self.prefixes)
+
+    def line(self, item: int, rating: Optional[float] = None) -> str:
+        """
+        строка фильма; рейтинг по умолчанию — средняя оценка (строка берется готовой).
+
+        аргументы:
+            item (int): номер фильма.
+            rating (Optional[float]): своя оценка для вывода.
+
+        возвращает:
+            str: строка фильма.
+        """
+        if rating is None:
+            return self.lines[item]
+        return f"{self.prefixes[item]}{rating:.2f}"
+
+    def numbered(self, items: Sequence[int], offset: int = 0) -> List[str]:
+        """
+        пронумерованные строки страницы со средними оценками.
+
+        аргументы:
+            items (Sequence[int]): номера фильмов страницы.
+            offset (int): номер первой строки минус один.
+
+        возвращает:
+            List[str]: строки вида "<n>. <строка фильма>".
+        """
+        lines = self.lines
+        return [f"{n}. {lines[item]}" for n, item in enumerate(items, start=offset + 1)]
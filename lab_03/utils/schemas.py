@@ -1,16 +1,29 @@
 from dataclasses import dataclass
 
+import numpy as np
 
-@dataclass(frozen=True)   # frozen=True делает класс неизменяемым
+
+@dataclass(frozen=True, slots=True)   # frozen=True делает класс неизменяемым, slots=True убирает __dict__ у каждого экземпляра
 class Rating:
-    # хранит информацию о том, какой пользователь оценил какой фильм и какую оценку он поставил
+    # хранит информацию о том, какой пользователь оценил какой фильм (номер из ItemVocabulary) и какую оценку он поставил
     user_id: int
-    item_id: str
+    item_id: int
     score: float
 
 
-@dataclass
+@dataclass(slots=True)
 class Recommendation:
-    # изменяемая структура данных, которая хранит информацию о фильме и его рейтинге или вероятности быть рекомендованным пользователю
-    item_id: str
+    # изменяемая структура данных, которая хранит информацию о фильме (номер из ItemVocabulary) и его рейтинге или вероятности быть рекомендованным пользователю
+    item_id: int
     score: float
+
+
+@dataclass(frozen=True)
+class RatingArrays:
+    # компактное представление множества оценок: параллельные массивы вместо объектов Rating
+    user_ids: np.ndarray    # int32
+    item_ids: np.ndarray    # int32, номера фильмов из ItemVocabulary
+    scores: np.ndarray      # float32
+
+    def __len__(self) -> int:
+        return len(self.scores)
@@ -0,0 +1,145 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+# уровни совпадения: чем больше, тем выше кандидат в выдаче
+TIER_EXACT = 4
+TIER_PREFIX = 3
+TIER_TOKEN = 2
+TIER_SUBSTRING = 1
+
+# минимальная доля триграмм запроса, которые должны найтись в названии для нечеткого совпадения
+DEFAULT_MIN_OVERLAP = 0.5
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _trigrams(text: str) -> Set[str]:
+    """ символьные триграммы строки с отступами по краям (ловят начало и конец слова) """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _tokens(text: str) -> List[str]:
+    """ слова строки """
+    return _TOKEN_RE.findall(text)
+
+
+class TitleSearchIndex:
+    """
+    поисковый индекс по нормализованным названиям фильмов.
+    позиция названия в titles — номер фильма; одинаковые названия разных фильмов допустимы.
+
+    содержит точную карту, отсортированный список для поиска по префиксу (bisect),
+    инвертированный индекс слов, все названия одной строкой для поиска подстроки
+    и инвертированный индекс символьных триграмм.
+    кандидаты ранжируются: точное совпадение > префикс > все слова запроса есть в названии >
+    запрос — подстрока названия > доля общих триграмм; при равенстве выше более популярный фильм.
+    короткие подстроки внутри слова ("ar" в "star wars") находятся только уровнем подстроки:
+    триграммы с отступами по краям запроса у них с названием почти не совпадают.
+    """
+
+    def __init__(self, titles: Sequence[str], popularity: Sequence[float]) -> None:
+        self.titles: List[str] = list(titles)    # нормализованные названия по номерам фильмов
+        self.popularity: np.ndarray = np.asarray(popularity, dtype=np.float64)    # например, число оценок
+
+        self._exact: Dict[str, List[int]] = {}
+        for i, title in enumerate(self.titles):
+            self._exact.setdefault(title, []).append(i)
+        order = sorted(range(len(self.titles)), key=self.titles.__getitem__)
+        self._sorted_titles: List[str] = [self.titles[i] for i in order]
+        self._sorted_ids: np.ndarray = np.asarray(order, dtype=np.int32)
+        # названия через "\n" и начало каждого в этой строке: str.find ищет подстроку без цикла по каталогу в Python
+        self._joined: str = "\n".join(self.titles)
+        self._starts: np.ndarray = np.cumsum([0] + [len(title) + 1 for title in self.titles[:-1]]).astype(np.int64)
+
+        tokens: Dict[str, List[int]] = defaultdict(list)
+        trigrams: Dict[str, List[int]] = defaultdict(list)
+        for i, title in enumerate(self.titles):
+            for token in set(_tokens(title)):
+                tokens[token].append(i)
+            for trigram in _trigrams(title):
+                trigrams[trigram].append(i)
+        self._tokens: Dict[str, np.ndarray] = {t: np.asarray(ids, dtype=np.int32) for t, ids in tokens.items()}
+        self._trigrams: Dict[str, np.ndarray] = {t: np.asarray(ids, dtype=np.int32) for t, ids in trigrams.items()}
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def _prefix_ids(self, needle: str) -> np.ndarray:
+        """ номера названий, начинающихся с needle """
+        lo = bisect_left(self._sorted_titles, needle)
+        hi = bisect_left(self._sorted_titles, needle + "\U0010ffff", lo)
+        return self._sorted_ids[lo:hi]
+
+    def _token_ids(self, needle: str) -> np.ndarray:
+        """ номера названий, в которых есть все слова запроса """
+        result = None
+        for token in set(_tokens(needle)):
+            postings = self._tokens.get(token)
+            if postings is None:
+                return np.empty(0, dtype=np.int32)
+            result = postings if result is None else np.intersect1d(result, postings, assume_unique=True)
+        return np.empty(0, dtype=np.int32) if result is None else result
+
+    def _substring_ids(self, needle: str) -> np.ndarray:
+        """ номера названий, в которых запрос встречается как подстрока """
+        if "\n" in needle:
+            return np.empty(0, dtype=np.int32)
+        positions: List[int] = []
+        pos = self._joined.find(needle)
+        while pos >= 0:
+            positions.append(pos)
+            pos = self._joined.find(needle, pos + 1)
+        if not positions:
+            return np.empty(0, dtype=np.int32)
+        ids = np.searchsorted(self._starts, np.asarray(positions, dtype=np.int64), side="right") - 1
+        return np.unique(ids).astype(np.int32)
+
+    def search(self, needle: str, limit: int = 5, min_overlap: float = DEFAULT_MIN_OVERLAP) -> List[Tuple[int, float]]:
+        """
+        ищет названия, похожие на нормализованный запрос.
+
+        аргументы:
+            needle (str): нормализованный запрос (см. dataset.normalize_movie).
+            limit (int): сколько кандидатов вернуть.
+            min_overlap (float): минимальная доля общих триграмм для нечеткого совпадения.
+
+        возвращает:
+            List[Tuple[int, float]]: (номер фильма, оценка совпадения) по убыванию;
+                                     оценка = уровень совпадения + доля общих триграмм.
+        """
+        if not needle or not self.titles or limit <= 0:
+            return []
+
+        # доля общих триграмм считается только по спискам триграмм запроса, а не по всему каталогу
+        query_trigrams = _trigrams(needle)
+        postings = [self._trigrams[t] for t in query_trigrams if t in self._trigrams]
+        if postings:
+            matched, hits = np.unique(np.concatenate(postings), return_counts=True)
+        else:
+            matched, hits = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        matched_overlap = hits / len(query_trigrams)
+
+        # уровни по возрастанию: более сильное совпадение перезаписывает более слабое
+        tiers = [
+            (TIER_SUBSTRING, self._substring_ids(needle)),
+            (TIER_TOKEN, self._token_ids(needle)),
+            (TIER_PREFIX, self._prefix_ids(needle)),
+            (TIER_EXACT, np.asarray(self._exact.get(needle, []), dtype=np.int32)),
+        ]
+        candidates = np.unique(np.concatenate([matched[matched_overlap >= min_overlap]] + [ids for _, ids in tiers]))
+        if candidates.size == 0:
+            return []
+        tier = np.zeros(len(candidates), dtype=np.float64)
+        for level, ids in tiers:
+            tier[np.searchsorted(candidates, ids)] = level
+        overlap = np.zeros(len(candidates), dtype=np.float64)
+        shared = np.isin(matched, candidates, assume_unique=True)
+        overlap[np.searchsorted(candidates, matched[shared])] = matched_overlap[shared]
+        scores = tier + overlap
+        order = np.lexsort((-self.popularity[candidates], -scores))[:limit]
+        return list(zip(candidates[order].tolist(), scores[order].tolist()))
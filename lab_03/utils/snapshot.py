@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from .neighbors import NeighborStore
+
+logger = logging.getLogger(__name__)
+
+# версия формата снимка: при изменении раскладки файлов или смысла значений старые снимки перестают считаться валидными
+# (4: пустые ячейки соседей помечаются neighbors.EMPTY вместо заполнения посторонними фильмами)
+SNAPSHOT_FORMAT = 4
+
+_META_FILE = "meta.json"
+_ITEMS_FILE = "items.json"
+_INDICES_FILE = "indices.npy"
+_SCORES_FILE = "scores.npy"
+
+
+@dataclass
+class SimilaritySnapshot:
+    # содержимое снимка: соседи фильмов. число оценок и средние оценки не хранятся —
+    # они дешево считаются при загрузке метаданных (utils/metadata.py)
+    fingerprint: str
+    neighbors: NeighborStore
+
+
+def dataset_fingerprint(paths: Iterable[Path], params: Dict[str, Any]) -> str:
+    """
+    считает отпечаток исходных файлов и параметров расчета схожести.
+
+    аргументы:
+        paths (Iterable[Path]): файлы датасета.
+        params (Dict[str, Any]): параметры, влияющие на результат (K, метрика и т.п.).
+
+    возвращает:
+        str: sha256 в шестнадцатеричном виде.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"format": SNAPSHOT_FORMAT, **params}, sort_keys=True).encode("utf-8"))
+    for path in paths:
+        digest.update(Path(path).name.encode("utf-8"))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _snapshot_path(directory: Path, fingerprint: str) -> Path:
+    return Path(directory) / fingerprint[:16]
+
+
+def save_snapshot(directory: Path, fingerprint: str, neighbors: NeighborStore) -> Path:
+    """
+    записывает снимок соседей на диск (каталог с .npy-файлами, пригодными для mmap).
+
+    запись идет во временный каталог с последующим переименованием,
+    старые снимки с другими отпечатками удаляются.
+
+    аргументы:
+        directory (Path): каталог для снимков.
+        fingerprint (str): отпечаток датасета и параметров.
+        neighbors (NeighborStore): соседи фильмов.
+
+    возвращает:
+        Path: путь к записанному снимку.
+    """
+    directory = Path(directory)
+    target = _snapshot_path(directory, fingerprint)
+    tmp = directory / f".{target.name}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    np.save(tmp / _INDICES_FILE, neighbors.indices)
+    np.save(tmp / _SCORES_FILE, neighbors.scores)
+    with open(tmp / _ITEMS_FILE, "w", encoding="utf-8") as f:
+        json.dump(neighbors.items, f, ensure_ascii=False)
+    # meta.json пишется последним: снимок без него считается недописанным
+    with open(tmp / _META_FILE, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "format": SNAPSHOT_FORMAT, "k": neighbors.k}, f)
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    for stale in directory.iterdir():
+        if stale.is_dir() and stale != target and not stale.name.startswith("."):
+            shutil.rmtree(stale, ignore_errors=True)
+    logger.info("снимок схожести сохранен: %s", target)
+    return target
+
+
+def load_snapshot(directory: Path, fingerprint: str, mmap: bool = True) -> Optional[SimilaritySnapshot]:
+    """
+    загружает снимок, если он есть и его отпечаток совпадает.
+
+    аргументы:
+        directory (Path): каталог со снимками.
+        fingerprint (str): ожидаемый отпечаток датасета и параметров.
+        mmap (bool): отображать массивы в память без копирования (только чтение).
+
+    возвращает:
+        Optional[SimilaritySnapshot]: снимок или None, если его нужно пересобрать.
+    """
+    path = _snapshot_path(directory, fingerprint)
+    try:
+        with open(path / _META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("fingerprint") != fingerprint or meta.get("format") != SNAPSHOT_FORMAT:
+            return None
+        with open(path / _ITEMS_FILE, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        mode = "r" if mmap else None
+        neighbors = NeighborStore(
+            items,
+            np.load(path / _INDICES_FILE, mmap_mode=mode),
+            np.load(path / _SCORES_FILE, mmap_mode=mode),
+        )
+    except (OSError, ValueError) as exc:
+        logger.info("снимок схожести не найден или поврежден (%s), нужен пересчет", exc)
+        return None
+    if neighbors.indices.shape[0] != len(items):
+        return None
+    return SimilaritySnapshot(fingerprint, neighbors)
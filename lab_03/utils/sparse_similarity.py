@@ -0,0 +1,234 @@
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .cf import ItemUserMatrix
+from .compact import CompactMatrix
+from .neighbors import NeighborStore, top_k_rows
+
+# сколько строк матрицы сходства считается за один проход (ограничивает пиковую память)
+DEFAULT_BLOCK_SIZE = 512
+
+# относительный порог, ниже которого дисперсия считается нулевой (защита от ошибок округления)
+_VARIANCE_EPS = 1e-12
+
+
+def build_item_user_csr(matrix: ItemUserMatrix) -> Tuple[sparse.csr_matrix, List[int]]:
+    """
+    переводит словарную матрицу "фильм-пользователь" в разреженную CSR-матрицу.
+
+    порядок строк совпадает с порядком ключей исходного словаря,
+    столбцы — пользователи в порядке первого появления.
+
+    аргументы:
+        matrix (ItemUserMatrix): матрица "фильм-пользователь".
+
+    возвращает:
+        Tuple[sparse.csr_matrix, List[int]]: (матрица items x users, список фильмов по строкам)
+    """
+    if isinstance(matrix, CompactMatrix):
+        # матрица уже хранится в CSR: словари не обходятся
+        ratings, items = matrix.to_csr()
+        return ratings.astype(np.float64), items
+
+    items: List[int] = list(matrix.keys())
+    user_index: Dict[int, int] = {}
+    indptr = np.zeros(len(items) + 1, dtype=np.int64)
+    cols: List[int] = []
+    vals: List[float] = []
+    for row, item in enumerate(items):
+        users = matrix[item]
+        for user_id, score in users.items():
+            cols.append(user_index.setdefault(user_id, len(user_index)))
+            vals.append(score)
+        indptr[row + 1] = indptr[row] + len(users)
+
+    ratings = sparse.csr_matrix(
+        (np.asarray(vals, dtype=np.float64), np.asarray(cols, dtype=np.int64), indptr),
+        shape=(len(items), len(user_index)),
+    )
+    ratings.sort_indices()
+    return ratings, items
+
+
+class PearsonOperands(NamedTuple):
+    # матрицы, из произведений которых складываются статистики Пирсона.
+    # транспонированные копии хранятся в CSR, чтобы не конвертировать их заново для каждого блока
+    ratings: sparse.csr_matrix      # R: оценки items x users
+    indicator: sparse.csr_matrix    # B: 1, если пользователь оценил фильм (явные нули считаются оценками)
+    squares: sparse.csr_matrix      # R²: квадраты оценок
+    ratings_t: sparse.csr_matrix
+    indicator_t: sparse.csr_matrix
+    squares_t: sparse.csr_matrix
+
+
+def prepare_operands(ratings: sparse.csr_matrix) -> PearsonOperands:
+    """
+    готовит матрицы для pair_statistics (один раз на весь расчет).
+
+    аргументы:
+        ratings (sparse.csr_matrix): матрица items x users с оценками.
+
+    возвращает:
+        PearsonOperands: R, B, R² и их транспонированные копии.
+    """
+    indicator = sparse.csr_matrix(
+        (np.ones_like(ratings.data), ratings.indices, ratings.indptr),
+        shape=ratings.shape,
+    )
+    squares = sparse.csr_matrix(
+        (ratings.data * ratings.data, ratings.indices, ratings.indptr),
+        shape=ratings.shape,
+    )
+    # у транспонированных копий общая структура: транспонируется только R, B и R² строятся поверх ее индексов
+    ratings_t = ratings.T.tocsr()
+    indicator_t = sparse.csr_matrix(
+        (np.ones_like(ratings_t.data), ratings_t.indices, ratings_t.indptr),
+        shape=ratings_t.shape,
+    )
+    squares_t = sparse.csr_matrix(
+        (ratings_t.data * ratings_t.data, ratings_t.indices, ratings_t.indptr),
+        shape=ratings_t.shape,
+    )
+    return PearsonOperands(ratings, indicator, squares, ratings_t, indicator_t, squares_t)
+
+
+def pair_statistics(operands: PearsonOperands, start: int, stop: int) -> Tuple[np.ndarray, ...]:
+    """
+    считает достаточные статистики Пирсона для строк [start, stop) против всех фильмов.
+
+    для пары фильмов (a, b) все суммы берутся только по пользователям, оценившим оба фильма,
+    поэтому они выражаются через произведения разреженных матриц:
+    n = B·Bᵀ, Σa = R·Bᵀ, Σb = B·Rᵀ, Σa² = R²·Bᵀ, Σb² = B·R²ᵀ, Σab = R·Rᵀ.
+
+    аргументы:
+        operands (PearsonOperands): матрицы из prepare_operands.
+        start (int): первая строка блока.
+        stop (int): строка, следующая за последней строкой блока.
+
+    возвращает:
+        Tuple[np.ndarray, ...]: плотные блоки (n, Σa, Σb, Σa², Σb², Σab) размера (stop - start) x items.
+    """
+    r_blk = operands.ratings[start:stop]
+    b_blk = operands.indicator[start:stop]
+    q_blk = operands.squares[start:stop]
+
+    n = (b_blk @ operands.indicator_t).toarray()
+    sum_a = (r_blk @ operands.indicator_t).toarray()
+    sum_b = (b_blk @ operands.ratings_t).toarray()
+    sq_a = (q_blk @ operands.indicator_t).toarray()
+    sq_b = (b_blk @ operands.squares_t).toarray()
+    cross = (r_blk @ operands.ratings_t).toarray()
+    return n, sum_a, sum_b, sq_a, sq_b, cross
+
+
+def pearson_from_stats(
+    n: np.ndarray,
+    sum_a: np.ndarray,
+    sum_b: np.ndarray,
+    sq_a: np.ndarray,
+    sq_b: np.ndarray,
+    cross: np.ndarray,
+) -> np.ndarray:
+    """
+    переводит достаточные статистики пар фильмов в коэффициент Пирсона.
+
+    правила совпадают с similarity.pearson_similarity: n < 2 или нулевая дисперсия дают 0.
+
+    аргументы:
+        n (np.ndarray): число общих пользователей.
+        sum_a, sum_b (np.ndarray): суммы оценок каждого фильма по общим пользователям.
+        sq_a, sq_b (np.ndarray): суммы квадратов оценок по общим пользователям.
+        cross (np.ndarray): суммы произведений оценок.
+
+    возвращает:
+        np.ndarray: сходства той же формы, что и входные массивы.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        num = cross - sum_a * sum_b / n
+        den_a = sq_a - sum_a * sum_a / n
+        den_b = sq_b - sum_b * sum_b / n
+        valid = (n >= 2) & (den_a > _VARIANCE_EPS * sq_a) & (den_b > _VARIANCE_EPS * sq_b)
+        sims = np.where(valid, num / np.sqrt(den_a * den_b), 0.0)
+    return sims
+
+
+def pearson_block(operands: PearsonOperands, start: int, stop: int) -> np.ndarray:
+    """
+    считает коэффициент Пирсона по общим пользователям для строк [start, stop) против всех фильмов.
+
+    аргументы:
+        operands (PearsonOperands): матрицы из prepare_operands.
+        start (int): первая строка блока.
+        stop (int): строка, следующая за последней строкой блока.
+
+    возвращает:
+        np.ndarray: плотный блок сходств размера (stop - start) x items.
+    """
+    return pearson_from_stats(*pair_statistics(operands, start, stop))
+
+
+def pearson_matrix(ratings: sparse.csr_matrix) -> np.ndarray:
+    """
+    считает полную матрицу сходства items x items (см. pearson_block).
+
+    аргументы:
+        ratings (sparse.csr_matrix): матрица items x users с оценками.
+
+    возвращает:
+        np.ndarray: симметричная матрица сходства.
+    """
+    return pearson_block(prepare_operands(ratings), 0, ratings.shape[0])
+
+
+def build_similarity_matrix(matrix: ItemUserMatrix) -> Dict[int, Dict[int, float]]:
+    """
+    векторизованная замена cf.build_similarity_matrix с тем же форматом результата.
+
+    аргументы:
+        matrix (ItemUserMatrix): матрица "фильм-пользователь".
+
+    возвращает:
+        Dict[int, Dict[int, float]]: матрица сходства между фильмами.
+    """
+    if not matrix:
+        return {}
+    ratings, items = build_item_user_csr(matrix)
+    sims = pearson_matrix(ratings)
+
+    similarity: Dict[int, Dict[int, float]] = {}
+    for i, item in enumerate(items):
+        row = dict(zip(items, sims[i].tolist()))
+        del row[item]    # сходство фильма с самим собой не хранится
+        similarity[item] = row
+    return similarity
+
+
+def build_neighbor_store(
+    matrix: ItemUserMatrix,
+    k: int,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> NeighborStore:
+    """
+    строит хранилище top-K соседей, не материализуя полную матрицу сходства.
+
+    аргументы:
+        matrix (ItemUserMatrix): матрица "фильм-пользователь".
+        k (int): сколько соседей хранить для каждого фильма.
+        block_size (int): сколько строк матрицы сходства обрабатывать за раз.
+
+    возвращает:
+        NeighborStore: соседи каждого фильма по убыванию сходства.
+    """
+    ratings, items = build_item_user_csr(matrix)
+    operands = prepare_operands(ratings)
+    n_items = len(items)
+    k = max(0, min(k, n_items - 1))
+    indices = np.empty((n_items, k), dtype=np.int32)
+    scores = np.empty((n_items, k), dtype=np.float32)
+    for start in range(0, n_items, block_size):
+        stop = min(start + block_size, n_items)
+        sims = pearson_block(operands, start, stop)
+        indices[start:stop], scores[start:stop] = top_k_rows(sims, np.arange(start, stop), k)
+    return NeighborStore(items, indices, scores)
@@ -1,43 +1,299 @@
-from typing import Dict, Iterable, List, Tuple
-from .schemas import Rating, Recommendation
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+import numpy as np
+from config import (
+    CF_BACKEND,
+    CF_CACHE_SIZE,
+    CF_CACHE_TTL,
+    CF_INCREMENTAL_MAX_ITEMS,
+    CF_K_NEIGHBORS,
+    CF_LSH_TABLES,
+    CF_MF_FACTORS,
+    CF_MF_ITERATIONS,
+    CF_MODEL,
+    CF_WORKERS,
+)
+from .cache import RecommendationCache
+from .neighbors import NeighborStore
+from .schemas import Rating, RatingArrays, Recommendation
+from . import ann
+from . import batch
 from . import cf
+from . import compact
+from . import incremental
+from . import mf
+from . import parallel
+from . import sparse_similarity
+from . import user_cf
+
+logger = logging.getLogger(__name__)
+
 
 class RecommendationStorage:
     # класс для хранения рейтингов и предварительно вычисленных схожестей фильмов в памяти.    def __init__(self) -> None:
     # инициализация пустых атрибутов для матрицы "фильм-пользователь" и матрицы схожести
-    def __init__(self) -> None:
-        self.item_user: cf.ItemUserMatrix = {}    # матрица, где ключ — ID фильма, а значение — словарь с рейтингами пользователей
-        self.similarity: Dict[str, Dict[str, float]] = {}    # матрица схожести между фильмами
+    def __init__(
+        self,
+        incremental: bool = False,
+        workers: int = CF_WORKERS,
+        backend: str = CF_BACKEND,
+        lsh_tables: int = CF_LSH_TABLES,
+        cache_size: int = CF_CACHE_SIZE,
+        cache_ttl: float = CF_CACHE_TTL,
+        model: str = CF_MODEL,
+        mf_factors: int = CF_MF_FACTORS,
+        mf_iterations: int = CF_MF_ITERATIONS,
+        incremental_max_items: int = CF_INCREMENTAL_MAX_ITEMS,
+    ) -> None:
+        self.incremental = incremental    # поддерживать ли статистики пар для инкрементального обновления схожести
+        self.incremental_max_items = incremental_max_items    # предел каталога для статистик пар (O(items²) памяти)
+        self.workers = workers    # число процессов для полного пересчета соседей
+        self.backend = backend    # "exact" или "lsh" (приближенные соседи для больших каталогов)
+        self.lsh_tables = lsh_tables    # регулятор полноты LSH
+        # матрица, где ключ — ID фильма, а значение — словарь с рейтингами пользователей
+        # (после массовой загрузки массивов — compact.CompactMatrix поверх CSR с тем же словарным доступом)
+        self.item_user: cf.ItemUserMatrix = {}
+        self.user_item: cf.UserItemMatrix = {}    # обратный индекс: ключ — ID пользователя, значение — его оценки фильмов
+        self.neighbors: Optional[NeighborStore] = None    # top-K соседей каждого фильма (K = CF_K_NEIGHBORS)
+        self.stats: Optional[incremental.PairStatistics] = None    # статистики пар (только в инкрементальном режиме)
+        self.cache = RecommendationCache(cache_size, cache_ttl)    # результаты recommend_for_user
+        self.model = model    # "item" — по соседям фильмов, "user" — по похожим пользователям, "mf" — по скрытым факторам
+        self.mf_factors = mf_factors
+        self.mf_iterations = mf_iterations
+        self.factors: Optional[mf.FactorModel] = None    # модель факторов (только в режиме "mf")
+        self.users: Optional[user_cf.UserModel] = None    # средние, нормы и матрицы пользователей (только в режиме "user")
+
+    def _store_rating(self, rating: Rating) -> Optional[float]:
+        """ записывает оценку в матрицу и обратный индекс, возвращает предыдущую оценку (если была) """
+        score = float(rating.score)
+        old = self.item_user.setdefault(rating.item_id, {}).get(rating.user_id)
+        self.item_user[rating.item_id][rating.user_id] = score
+        self.user_item.setdefault(rating.user_id, {})[rating.item_id] = score
+        return old
+
+    def _store_arrays(self, chunks: Iterable[RatingArrays]) -> int:
+        """
+        записывает части оценок в матрицу и обратный индекс, собранные в CSR (compact.CompactMatrix):
+        части копятся как int32/float32 массивы (12 байт на оценку), словари на каждую оценку не создаются.
+        уже загруженные оценки сохраняются, при повторе пары остается последняя оценка.
+
+        аргументы:
+            chunks (Iterable[RatingArrays]): части оценок.
+
+        возвращает:
+            int: сколько оценок прочитано.
+        """
+        parts: List[RatingArrays] = [compact.ratings_from_matrix(self.item_user)] if self.item_user else []
+        total = 0
+        for chunk in chunks:
+            parts.append(chunk)
+            total += len(chunk)
+        if not total:
+            return 0
+        merged = RatingArrays(
+            user_ids=np.concatenate([part.user_ids for part in parts]).astype(np.int32, copy=False),
+            item_ids=np.concatenate([part.item_ids for part in parts]).astype(np.int32, copy=False),
+            scores=np.concatenate([part.scores for part in parts]).astype(np.float32, copy=False),
+        )
+        parts.clear()
+        self.item_user, self.user_item = compact.build_rating_matrices(merged)
+        return total
 
     def add_rating(self, rating: Rating) -> None:
         """
         добавляет новый рейтинг в хранилище.
+        в инкрементальном режиме сразу обновляет схожести пар с этим фильмом.
         
         аргументы:
             rating (Rating): объект, содержащий информацию о фильме, пользователе и оценке
         """
-        # добавление нового рейтинга в матрицу "фильм-пользователь"
-        self.item_user.setdefault(rating.item_id, {})[rating.user_id] = float(rating.score)
+        self.add_ratings([rating])
+
+    def add_ratings(self, ratings: Iterable[Rating]) -> None:
+        """
+        добавляет пачку рейтингов в хранилище.
+        в инкрементальном режиме статистики пар и соседи затронутых фильмов
+        обновляются одним векторизованным проходом, без полного пересчета.
+
+        аргументы:
+            ratings (Iterable[Rating]): рейтинги, которые нужно добавить или изменить.
+        """
+        changes: List[incremental.RatingChange] = []
+        for rating in ratings:
+            old = self._store_rating(rating)
+            changes.append((rating.user_id, rating.item_id, old, float(rating.score)))
+        changed_users = {change[0] for change in changes}
+        # модель факторов не переобучается: векторы этих пользователей пересчитываются по их новым оценкам
+        if self.factors is not None:
+            for user_id in changed_users:
+                self.factors.fold_in(user_id, self.user_item[user_id])
+        # у этих пользователей изменились собственные оценки — их рекомендации устарели
+        self.cache.invalidate_users(changed_users)
+
+        # без статистик (обычный режим или до первого пересчета) достаточно обновить матрицы
+        if self.stats is None or not changes:
+            return
+
+        try:
+            touched, grown = self.stats.apply(changes, self.user_item)
+        except ValueError as exc:
+            # каталог вырос за предел: статистики пар освобождаются, соседи новых фильмов
+            # появятся при следующем полном пересчете, как в обычном режиме
+            logger.warning("инкрементальное обновление схожести отключено: %s", exc)
+            self.stats = None
+            return
+        if grown or self.neighbors is None or self.neighbors.k < min(CF_K_NEIGHBORS, len(self.stats) - 1):
+            # появились новые фильмы — строки хранилища соседей нужно перестроить целиком
+            self._set_neighbors(incremental.build_neighbor_store(self.stats, k=CF_K_NEIGHBORS))
+        elif touched.size:
+            old_indices = self.neighbors.indices[touched].copy()
+            old_scores = self.neighbors.scores[touched].copy()
+            incremental.refresh_neighbors(self.neighbors, self.stats, touched)
+            changed = (old_indices != self.neighbors.indices[touched]).any(axis=1)
+            changed |= (old_scores != self.neighbors.scores[touched]).any(axis=1)
+            self._invalidate_rows(touched[changed])
+
+    def _raters(self, rows: np.ndarray) -> Set[int]:
+        """ пользователи, оценившие фильмы из заданных строк хранилища соседей """
+        users: Set[int] = set()
+        for row in rows.tolist():
+            users.update(self.item_user.get(self.neighbors.items[row], {}))
+        return users
+
+    def _invalidate_rows(self, rows: np.ndarray) -> None:
+        """
+        сбрасывает кэш пользователей, чьи рекомендации зависят от изменившихся строк соседей:
+        рекомендации пользователя строятся из соседей фильмов, которые он оценил.
+        """
+        if rows.size and len(self.cache):
+            self.cache.invalidate_users(self._raters(rows))
 
-    def load_bulk(self, ratings: Iterable[Rating]) -> None:
+    def _set_neighbors(self, neighbors: Optional[NeighborStore]) -> None:
+        """ заменяет хранилище соседей и сбрасывает кэш только для затронутых изменениями пользователей """
+        old = self.neighbors
+        self.neighbors = neighbors
+        if old is None or neighbors is None or old.items != neighbors.items or old.k != neighbors.k:
+            self.cache.clear()
+            return
+        changed = (old.indices != neighbors.indices).any(axis=1) | (old.scores != neighbors.scores).any(axis=1)
+        self._invalidate_rows(np.flatnonzero(changed))
+
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        счетчики кэша рекомендаций для мониторинга.
+
+        возвращает:
+            Dict[str, int]: size, hits, misses, evictions, expirations, invalidations.
+        """
+        return self.cache.stats()
+
+    def load_bulk(
+        self,
+        ratings: Union[RatingArrays, Iterable[Rating]],
+        neighbors: Optional[NeighborStore] = None,
+    ) -> None:
         """
         загружает несколько рейтингов в хранилище и пересчитывает схожести.
         
         аргументы:
-            ratings (Iterable[Rating]): объект с рейтингами, которые нужно добавить.
+            ratings (Union[RatingArrays, Iterable[Rating]]): рейтинги, которые нужно добавить
+                                                             (параллельные массивы или объекты Rating).
+            neighbors (Optional[NeighborStore]): готовые соседи (например, из снимка на диске);
+                                                 в инкрементальном режиме игнорируются, т.к. нужны статистики пар.
         """
-        # для каждого рейтинга добавляем его в хранилище
-        for rating in ratings:
-            self.add_rating(rating)
+        # добавляем рейтинги в хранилище (схожесть все равно пересчитается целиком)
+        if isinstance(ratings, RatingArrays):
+            self._store_arrays([ratings])
+        else:
+            for rating in ratings:
+                self._store_rating(rating)
+        self._finish_load(neighbors)
+
+    def load_chunks(self, chunks: Iterable[RatingArrays], neighbors: Optional[NeighborStore] = None) -> int:
+        """
+        загружает оценки частями (см. data_loader.stream_movielens_ratings) и один раз пересчитывает схожести.
+        части копятся как массивы int32/float32 и один раз собираются в CSR (см. _store_arrays):
+        пик памяти — около 12 байт на оценку при чтении и до ~60 байт на оценку на время сборки CSR
+        (коды и сортировка пар), после сборки — около 20 байт на оценку вместо словаря на каждую оценку.
+
+        аргументы:
+            chunks (Iterable[RatingArrays]): части оценок.
+            neighbors (Optional[NeighborStore]): готовые соседи (например, из снимка на диске).
+
+        возвращает:
+            int: сколько оценок прочитано.
+        """
+        total = self._store_arrays(chunks)
+        self._finish_load(neighbors)
+        return total
+
+    def _finish_load(self, neighbors: Optional[NeighborStore]) -> None:
+        """ после массовой загрузки берет готовых соседей или пересчитывает их """
+        # массовая загрузка меняет оценки многих пользователей сразу
+        self.cache.clear()
+        if neighbors is not None and not self.incremental:
+            self._set_neighbors(neighbors)
+            self._fit_model()
+            return
         # пересчитываем матрицу схожести между фильмами после загрузки всех рейтингов
         self.recompute_similarity()
 
     def recompute_similarity(self) -> None:
         """
-        пересчитывает матрицу схожести между фильмами с использованием коллаборативной фильтрации
+        пересчитывает top-K соседей каждого фильма с использованием коллаборативной фильтрации
+        (в режимах "user" и "mf" заодно пересобирает модель пользователей или переобучает модель факторов)
+        """
+        if not self.item_user:
+            self.stats = None
+            self._set_neighbors(None)
+            self._fit_model()
+            return
+        # кэш сбрасывается только для пользователей, у оцененных фильмов которых изменились соседи
+        self._set_neighbors(self._build_neighbors())
+        self._fit_model()
+
+    def _fit_model(self) -> None:
+        """
+        в режиме "user" считает средние и нормы пользователей, в режиме "mf" обучает модель факторов (ALS) —
+        по всем оценкам хранилища
         """
-        # пересчитываем схожесть, используя метод build_similarity_matrix из модуля cf
-        self.similarity = cf.build_similarity_matrix(self.item_user) if self.item_user else {}
+        if self.model == "user":
+            self.users = user_cf.build_user_model(compact.ratings_from_matrix(self.item_user)) if self.item_user else None
+        elif self.model == "mf":
+            self.factors = mf.train_als(
+                compact.ratings_from_matrix(self.item_user), factors=self.mf_factors, iterations=self.mf_iterations,
+            ) if self.item_user else None
+        else:
+            return
+        # предсказания изменились у всех пользователей
+        self.cache.clear()
+
+    def _build_neighbors(self) -> NeighborStore:
+        """ полный расчет top-K соседей выбранным движком """
+        self.stats = None
+        if self.incremental and len(self.item_user) > self.incremental_max_items:
+            logger.warning(
+                "каталог из %d фильмов больше CF_INCREMENTAL_MAX_ITEMS=%d: инкрементальный режим отключен, полный пересчет",
+                len(self.item_user), self.incremental_max_items,
+            )
+        elif self.incremental:
+            # полный расчет статистик пар, дальше они обновляются в add_ratings
+            ratings, items = sparse_similarity.build_item_user_csr(self.item_user)
+            self.stats = incremental.PairStatistics.from_ratings(ratings, items, self.incremental_max_items)
+            return incremental.build_neighbor_store(self.stats, k=CF_K_NEIGHBORS)
+
+        if self.backend == "lsh":
+            logger.warning("CF_BACKEND=lsh — экспериментальный движок с низкой полнотой соседей, для бота используйте exact")
+            # кандидаты через LSH, точный Пирсон только для них: время растет почти линейно с числом фильмов
+            return ann.build_neighbor_store(self.item_user, k=CF_K_NEIGHBORS, tables=self.lsh_tables)
+
+        if self.workers > 1:
+            # блоки строк считаются параллельно в отдельных процессах
+            return parallel.build_neighbor_store(self.item_user, k=CF_K_NEIGHBORS, workers=self.workers)
+
+        # пересчитываем схожесть векторизованным движком и оставляем только top-K соседей
+        return sparse_similarity.build_neighbor_store(self.item_user, k=CF_K_NEIGHBORS)
 
     def recommend_for_user(self, user_id: int, k_neighbors: int = 20, top_n: int = 10) -> List[Recommendation]:
         """
@@ -45,54 +301,152 @@ class RecommendationStorage:
         
         аргументы:
             user_id (int): ID пользователя, для которого генерируются рекомендации
-            k_neighbors (int): количество ближайших соседей для каждого фильма
+            k_neighbors (int): количество ближайших соседей для каждого фильма (в режиме "user" — похожих пользователей)
             top_n (int): количество фильмов, которые нужно вернуть в списке рекомендаций
 
         возвращает:
             List[Recommendation]: список рекомендаций для пользователя
         """
-        # если схожесть еще не была вычислена, пересчитываем её
-        if not self.similarity:
-            self.recompute_similarity()
+        if self.model == "mf":
+            return self._recommend_factors(user_id, k_neighbors, top_n)
+        if self.model == "user":
+            return self._recommend_users(user_id, k_neighbors, top_n)
 
-        # если схожесть не была вычислена, возвращаем пустой список
-        if not self.similarity:
+        # если соседи еще не вычислены (например, идет фоновая подготовка), возвращаем пустой список:
+        # полный пересчет здесь заблокировал бы вызывающий код на всё время построения
+        if self.neighbors is None:
             return []
-        
+
+        key = (user_id, k_neighbors, top_n)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
         # вызываем функцию из модуля cf для получения рекомендаций для пользователя
-        return cf.recommend_items_for_user(
+        neighbors = self.neighbors
+        recs = cf.recommend_items_for_user(
             user_id=user_id,
-            matrix=self.item_user,
-            similarity_matrix=self.similarity,
+            user_items=self.user_item,
+            neighbors=neighbors,
             k_neighbors=k_neighbors,
             top_n=top_n,
         )
+        # если соседей успели заменить во время расчета, результат мог устареть — не кэшируем
+        if self.neighbors is neighbors:
+            self.cache.put(key, recs)
+        return recs
+
+    def _recommend_factors(self, user_id: int, k_neighbors: int, top_n: int) -> List[Recommendation]:
+        """ рекомендации по модели факторов: произведение факторов фильмов на вектор пользователя и argpartition """
+        factors = self.factors
+        if factors is None:
+            return []
+        # k_neighbors в модели факторов не используется, но остается в ключе, как и в режиме "item"
+        key = (user_id, k_neighbors, top_n)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        recs = factors.recommend(user_id, self.user_item.get(user_id, {}), top_n)
+        if self.factors is factors:
+            self.cache.put(key, recs)
+        return recs
+
+    def _recommend_users(self, user_id: int, k_neighbors: int, top_n: int) -> List[Recommendation]:
+        """ рекомендации User-Based CF: top-K похожих пользователей произведением разреженных матриц """
+        users = self.users
+        if users is None:
+            return []
+        key = (user_id, k_neighbors, top_n)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        recs = users.recommend(user_id, self.user_item.get(user_id, {}), k_neighbors, top_n)
+        if self.users is users:
+            self.cache.put(key, recs)
+        return recs
 
-    def similar_items(self, item_id: str, top_n: int = 10) -> List[Tuple[str, float]]:
+    def recommend_batch(
+        self,
+        user_ids: Optional[Sequence[int]] = None,
+        top_n: int = 10,
+        k_neighbors: int = 20,
+        path: Optional[Path] = None,
+    ) -> Optional[batch.BatchRecommendations]:
         """
-        возвращает топ-N самых похожих фильмов для заданного фильма, используя предварительно вычисленную матрицу сходства.
+        рекомендует фильмы сразу многим пользователям (например, для ночного предрасчета).
+        формула та же, что в recommend_for_user, но считается произведениями разреженных матриц;
+        в режиме "user" — блоками пользователей (см. user_cf.predict_block),
+        в режиме "mf" — произведением факторов пользователей блока на факторы фильмов.
 
         аргументы:
-            item_id (str): ID фильма, для которого ищем похожие фильмы.
-            top_n (int): количество фильмов, которые нужно вернуть.
+            user_ids (Optional[Sequence[int]]): пользователи, None — все пользователи хранилища.
+            top_n (int): сколько фильмов рекомендовать каждому пользователю.
+            k_neighbors (int): количество ближайших соседей для каждого фильма (в режиме "user" — похожих пользователей).
+            path (Optional[Path]): если задан, результат записывается в .npz (см. BatchRecommendations.save).
 
         возвращает:
-            List[Tuple[str, float]]: список фильмов, похожих на заданный, с их коэффициентом сходства.
+            Optional[batch.BatchRecommendations]: рекомендации или None, если соседи (модель пользователей, модель факторов) еще не вычислены.
         """
-        # получаем схожесть с другими фильмами для данного фильма
-        sims: Dict[str, float] = self.similarity.get(item_id, {})
-        
-        # если нет схожести для данного фильма, возвращаем пустой список
-        if not sims:
+        if user_ids is None:
+            user_ids = sorted(self.user_item)
+        if self.model == "mf":
+            if self.factors is None:
+                return None
+            result = mf.recommend_batch(self.factors, user_ids, self.user_item, top_n=top_n)
+        elif self.model == "user":
+            if self.users is None:
+                return None
+            result = user_cf.recommend_batch(
+                self.users, user_ids, self.user_item, k_neighbors=k_neighbors, top_n=top_n,
+            )
+        elif self.neighbors is None:
+            return None
+        else:
+            result = batch.recommend_batch(
+                user_ids, self.user_item, self.neighbors, k_neighbors=k_neighbors, top_n=top_n,
+            )
+        if path is not None:
+            result.save(path)
+        return result
+
+    def similar_items(self, item_id: int, top_n: int = 10, offset: int = 0) -> List[Tuple[int, float]]:
+        """
+        возвращает топ-N самых похожих фильмов для заданного фильма из хранилища top-K соседей.
+
+        аргументы:
+            item_id (int): номер фильма, для которого ищем похожие фильмы.
+            top_n (int): количество фильмов, которые нужно вернуть (не больше CF_K_NEIGHBORS).
+            offset (int): сколько самых похожих фильмов пропустить (для постраничного вывода).
+
+        возвращает:
+            List[Tuple[int, float]]: список фильмов, похожих на заданный, с их коэффициентом сходства.
+        """
+        # если соседи не вычислены, возвращаем пустой список
+        if self.neighbors is None:
             return []
-        
-        # сортируем фильмы по коэффициенту сходства и возвращаем топ-N
-        sorted_items: List[Tuple[str, float]] = sorted(sims.items(), key=lambda x: x[1], reverse=True)
-        return sorted_items[:top_n]
+
+        # соседи уже отсортированы по убыванию сходства, страница — срез строки за O(top_n)
+        return self.neighbors.top(item_id, top_n, offset)
 
 # глобальный объект для хранения рекомендаций
 rating_storage = RecommendationStorage()
 
+# откуда взять готовых соседей, если их еще нет (процесс пула читает снимок, записанный прогревом)
+_neighbors_source: Optional[Callable[[], Optional[NeighborStore]]] = None
+
+
+def set_neighbors_source(source: Optional[Callable[[], Optional[NeighborStore]]]) -> None:
+    """
+    задает ленивую загрузку соседей для процесса, который сам их не строит (пул EXECUTOR_KIND=process):
+    пока соседей нет, similar_items пробует получить их при каждом вызове.
+
+    аргументы:
+        source (Optional[Callable[[], Optional[NeighborStore]]]): возвращает соседей или None, если их пока нет.
+    """
+    global _neighbors_source
+    _neighbors_source = source
+
+
 # функции-обертки для работы с хранилищем рекомендаций
 def add_rating(rating: Rating) -> None:
     """
@@ -104,14 +458,32 @@ def add_rating(rating: Rating) -> None:
     rating_storage.add_rating(rating)
 
 
-def load_base_ratings(ratings: Iterable[Rating]) -> None:
+def load_base_ratings(
+    ratings: Union[RatingArrays, Iterable[Rating]],
+    neighbors: Optional[NeighborStore] = None,
+) -> None:
     """
     загружает несколько рейтингов в хранилище и пересчитывает матрицу сходства
     
     аргументы:
-        ratings (Iterable[Rating]): объект с рейтингами, которые загружаются в хранилище
+        ratings (Union[RatingArrays, Iterable[Rating]]): рейтинги, которые загружаются в хранилище
+        neighbors (Optional[NeighborStore]): готовые соседи из снимка, если он валиден
+    """
+    rating_storage.load_bulk(ratings, neighbors=neighbors)
+
+
+def load_rating_chunks(chunks: Iterable[RatingArrays], neighbors: Optional[NeighborStore] = None) -> int:
+    """
+    загружает оценки частями в глобальное хранилище и пересчитывает матрицу сходства
+
+    аргументы:
+        chunks (Iterable[RatingArrays]): части оценок
+        neighbors (Optional[NeighborStore]): готовые соседи из снимка, если он валиден
+
+    возвращает:
+        int: сколько оценок прочитано
     """
-    rating_storage.load_bulk(ratings)
+    return rating_storage.load_chunks(chunks, neighbors=neighbors)
 
 
 def recommend_for_user(user_id: int, k_neighbors: int = 20, top_n: int = 10) -> List[Recommendation]:
@@ -129,15 +501,49 @@ def recommend_for_user(user_id: int, k_neighbors: int = 20, top_n: int = 10) ->
     return rating_storage.recommend_for_user(user_id, k_neighbors=k_neighbors, top_n=top_n)
 
 
-def similar_items(item_id: str, top_n: int = 10) -> List[Tuple[str, float]]:
+def recommend_batch(
+    user_ids: Optional[Sequence[int]] = None,
+    top_n: int = 10,
+    k_neighbors: int = 20,
+    path: Optional[Path] = None,
+) -> Optional[batch.BatchRecommendations]:
+    """
+    рекомендации сразу для многих пользователей из глобального хранилища
+
+    аргументы:
+        user_ids (Optional[Sequence[int]]): пользователи, None — все
+        top_n (int): сколько фильмов рекомендовать каждому пользователю
+        k_neighbors (int): количество ближайших соседей для фильмов (как в recommend_for_user)
+        path (Optional[Path]): файл .npz для записи результата
+
+    возвращает:
+        Optional[batch.BatchRecommendations]: рекомендации или None, если соседи еще не готовы
+    """
+    return rating_storage.recommend_batch(user_ids, top_n=top_n, k_neighbors=k_neighbors, path=path)
+
+
+def cache_stats() -> Dict[str, int]:
+    """
+    счетчики кэша рекомендаций глобального хранилища
+
+    возвращает:
+        Dict[str, int]: size, hits, misses, evictions, expirations, invalidations
+    """
+    return rating_storage.cache_stats()
+
+
+def similar_items(item_id: int, top_n: int = 10, offset: int = 0) -> List[Tuple[int, float]]:
     """
     возвращает похожие фильмы для заданного фильма
     
     аргументы:
-        item_id (str): ID фильма, для которого ищем похожие фильмы
+        item_id (int): номер фильма, для которого ищем похожие фильмы
         top_n (int): количество похожих фильмов, которое нужно вернуть
+        offset (int): сколько самых похожих фильмов пропустить
 
     возвращает:
-        List[Tuple[str, float]]: список похожих фильмов с коэффициентами сходства
+        List[Tuple[int, float]]: список похожих фильмов с коэффициентами сходства
     """
-    return rating_storage.similar_items(item_id=item_id, top_n=top_n)
+    if rating_storage.neighbors is None and _neighbors_source is not None:
+        rating_storage.neighbors = _neighbors_source()
+    return rating_storage.similar_items(item_id=item_id, top_n=top_n, offset=offset)
@@ -0,0 +1,247 @@
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from .batch import BatchRecommendations
+from .cf import UserItemMatrix
+from .neighbors import top_columns
+from .schemas import RatingArrays, Recommendation
+
+# сколько пользователей обрабатывается за один проход: плотный блок сходства занимает block x users
+DEFAULT_USER_BLOCK = 128
+
+
+@dataclass
+class UserModel:
+    # предрасчет для User-Based CF: оценки, центрированные средней оценкой пользователя,
+    # и они же, деленные на норму строки. скалярное произведение нормированных строк —
+    # коэффициент Пирсона между пользователями (центрированный косинус по всем фильмам).
+    # строки соответствуют user_ids, столбцы — item_ids
+    user_ids: np.ndarray              # int32, ID пользователей по строкам
+    item_ids: np.ndarray              # int32, номера фильмов (ItemVocabulary) по столбцам
+    residuals: sparse.csr_matrix      # float32, users x items, r(u, i) - mean(u)
+    normalized: sparse.csr_matrix     # float32, users x items, residuals / norm(u)
+    rated: sparse.csr_matrix          # float32, users x items, 1 там, где есть оценка
+    means: np.ndarray                 # float32, средняя оценка пользователя
+    norms: np.ndarray                 # float32, норма строки residuals
+
+    def __post_init__(self) -> None:
+        self.user_index: Dict[int, int] = {user_id: row for row, user_id in enumerate(self.user_ids.tolist())}
+        self.item_index: Dict[int, int] = {item: col for col, item in enumerate(self.item_ids.tolist())}
+
+    def recommend(
+        self,
+        user_id: int,
+        ratings: Dict[int, float],
+        k_neighbors: int = 20,
+        top_n: int = 10,
+    ) -> List[Recommendation]:
+        """
+        рекомендует фильмы по оценкам top-K похожих пользователей.
+
+        вектор самого пользователя строится по его текущим оценкам, поэтому новые оценки
+        и новые пользователи учитываются сразу, без пересборки модели.
+
+        аргументы:
+            user_id (int): ID пользователя (его строка исключается из соседей).
+            ratings (Dict[int, float]): все оценки пользователя (номер фильма -> оценка).
+            k_neighbors (int): сколько похожих пользователей учитывать.
+            top_n (int): сколько фильмов вернуть.
+
+        возвращает:
+            List[Recommendation]: рекомендации по убыванию предсказанной оценки.
+        """
+        if top_n <= 0:
+            return []
+        predicted = predict_block(self, [user_id], {user_id: ratings}, k_neighbors)
+        items, scores = _top_rows(predicted, top_n)
+        return [
+            Recommendation(item_id=item, score=min(max(score, 1.0), 5.0))
+            for item, score in zip(self.item_ids[items[0]].tolist(), scores[0].tolist())
+            if np.isfinite(score)
+        ]
+
+
+def build_user_model(ratings: RatingArrays) -> UserModel:
+    """
+    считает средние и нормы пользователей и собирает разреженные матрицы для поиска соседей.
+
+    аргументы:
+        ratings (RatingArrays): все оценки (повторные пары суммируются, поэтому их быть не должно).
+
+    возвращает:
+        UserModel: предрасчет для User-Based CF.
+    """
+    user_ids, user_codes = np.unique(ratings.user_ids, return_inverse=True)
+    item_ids, item_codes = np.unique(ratings.item_ids, return_inverse=True)
+    shape = (len(user_ids), len(item_ids))
+    scores = np.asarray(ratings.scores, dtype=np.float64)
+    by_user = sparse.csr_matrix((scores, (user_codes, item_codes)), shape=shape)
+    by_user.sum_duplicates()
+
+    counts = np.diff(by_user.indptr)
+    sums = np.add.reduceat(by_user.data, by_user.indptr[:-1]) if by_user.nnz else np.zeros(shape[0])
+    means = np.divide(sums, counts, out=np.zeros(shape[0]), where=counts > 0)
+    rows = np.repeat(np.arange(shape[0]), counts)
+    # центрированные оценки могут быть нулевыми — структура строится вручную, чтобы нули не выпали из матрицы
+    centered = by_user.data - means[rows]
+    norms = np.sqrt(np.bincount(rows, weights=centered * centered, minlength=shape[0]))
+    scale = np.divide(1.0, norms, out=np.zeros(shape[0]), where=norms > 0)
+
+    def with_data(data: np.ndarray) -> sparse.csr_matrix:
+        return sparse.csr_matrix((data.astype(np.float32), by_user.indices, by_user.indptr), shape=shape)
+
+    return UserModel(
+        user_ids.astype(np.int32),
+        item_ids.astype(np.int32),
+        with_data(centered),
+        with_data(centered * scale[rows]),
+        with_data(np.ones(by_user.nnz)),
+        means.astype(np.float32),
+        norms.astype(np.float32),
+    )
+
+
+def _query_matrix(
+    model: UserModel,
+    user_ids: Sequence[int],
+    user_items: UserItemMatrix,
+) -> Tuple[sparse.csr_matrix, np.ndarray, List[List[int]]]:
+    """
+    нормированные центрированные векторы пользователей блока по их текущим оценкам.
+    фильмы, которых нет в модели, не участвуют в сходстве, но учитываются в средней оценке.
+
+    аргументы:
+        model (UserModel): предрасчет (задает нумерацию столбцов).
+        user_ids (Sequence[int]): пользователи блока.
+        user_items (UserItemMatrix): текущие оценки пользователей.
+
+    возвращает:
+        Tuple[sparse.csr_matrix, np.ndarray, List[List[int]]]:
+            (векторы block x items, средние оценки, столбцы оцененных фильмов каждой строки).
+    """
+    index = model.item_index
+    indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+    cols: List[int] = []
+    vals: List[float] = []
+    means = np.zeros(len(user_ids), dtype=np.float64)
+    rated: List[List[int]] = []
+    for row, user_id in enumerate(user_ids):
+        ratings = user_items.get(user_id, {})
+        if ratings:
+            means[row] = sum(ratings.values()) / len(ratings)
+        known = [(index[item], score - means[row]) for item, score in ratings.items() if item in index]
+        norm = float(np.sqrt(sum(value * value for _, value in known)))
+        rated.append([col for col, _ in known])
+        if norm > 0:
+            cols.extend(col for col, _ in known)
+            vals.extend(value / norm for _, value in known)
+        indptr[row + 1] = len(cols)
+    queries = sparse.csr_matrix(
+        (np.asarray(vals, dtype=np.float32), np.asarray(cols, dtype=np.int64), indptr),
+        shape=(len(user_ids), len(model.item_ids)),
+    )
+    return queries, means, rated
+
+
+def predict_block(
+    model: UserModel,
+    user_ids: Sequence[int],
+    user_items: UserItemMatrix,
+    k_neighbors: int = 20,
+) -> np.ndarray:
+    """
+    предсказанные оценки всех фильмов для блока пользователей:
+    оценка(u, i) = mean(u) + Σ sim(u, v) · (r(v, i) - mean(v)) / Σ sim(u, v)
+    по top-K похожим пользователям v с положительным сходством, оценившим фильм i.
+
+    сходство блока со всеми пользователями — одно произведение разреженных матриц,
+    top-K — argpartition по строкам, числитель и знаменатель — еще два произведения.
+
+    аргументы:
+        model (UserModel): предрасчет.
+        user_ids (Sequence[int]): пользователи блока.
+        user_items (UserItemMatrix): текущие оценки пользователей.
+        k_neighbors (int): сколько похожих пользователей учитывать.
+
+    возвращает:
+        np.ndarray: block x items (float64, без обрезки до 1..5, чтобы порядок не терялся на равных оценках);
+            -inf — оцененные фильмы и фильмы без оценок у соседей.
+    """
+    queries, means, rated = _query_matrix(model, user_ids, user_items)
+    n_block, n_users = len(user_ids), len(model.user_ids)
+    predicted = np.full((n_block, len(model.item_ids)), -np.inf)
+    k = min(k_neighbors, n_users)
+    if k <= 0 or queries.nnz == 0:
+        return predicted
+
+    # матрица всех пользователей умножается на плотный блок запросов items x block:
+    # произведение разреженных матриц или транспонирование матрицы всех пользователей на каждый запрос дороже
+    sims = (model.normalized @ queries.T.toarray()).T
+    # пользователь не может быть соседом самому себе
+    for row, user_id in enumerate(user_ids):
+        own = model.user_index.get(user_id)
+        if own is not None:
+            sims[row, own] = 0.0
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top_sims = np.take_along_axis(sims, top, axis=1)
+    positive = top_sims > 0
+    weights = sparse.csr_matrix(
+        (top_sims[positive], (np.repeat(np.arange(n_block), k)[positive.ravel()], top[positive])),
+        shape=(n_block, n_users),
+    )
+    numerator = (weights @ model.residuals).toarray()
+    denominator = (weights @ model.rated).toarray()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(numerator, denominator, out=predicted, where=denominator > 0)
+    predicted += means[:, None]
+    # уже оцененные фильмы не рекомендуются
+    for row, cols in enumerate(rated):
+        predicted[row, cols] = -np.inf
+    return predicted
+
+
+def _top_rows(predicted: np.ndarray, top_n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ top-N столбцов каждой строки по убыванию (при равенстве — по номеру столбца) """
+    return top_columns(predicted, min(top_n, predicted.shape[1]))
+
+
+def recommend_batch(
+    model: UserModel,
+    user_ids: Sequence[int],
+    user_items: UserItemMatrix,
+    k_neighbors: int = 20,
+    top_n: int = 10,
+    block_size: int = DEFAULT_USER_BLOCK,
+) -> BatchRecommendations:
+    """
+    рекомендации User-Based CF для многих пользователей, блоками (см. predict_block).
+
+    аргументы:
+        model (UserModel): предрасчет.
+        user_ids (Sequence[int]): пользователи.
+        user_items (UserItemMatrix): текущие оценки пользователей.
+        k_neighbors (int): сколько похожих пользователей учитывать.
+        top_n (int): сколько фильмов рекомендовать каждому пользователю.
+        block_size (int): сколько пользователей обрабатывать за раз.
+
+    возвращает:
+        BatchRecommendations: рекомендации по убыванию предсказанной оценки.
+    """
+    user_ids = np.asarray(user_ids, dtype=np.int32)
+    top_n = max(0, min(top_n, len(model.item_ids)))
+    items_out = np.full((len(user_ids), top_n), -1, dtype=np.int32)
+    scores_out = np.full((len(user_ids), top_n), np.nan, dtype=np.float32)
+    if top_n == 0:
+        return BatchRecommendations(user_ids, items_out, scores_out)
+
+    for start in range(0, len(user_ids), block_size):
+        stop = min(start + block_size, len(user_ids))
+        predicted = predict_block(model, user_ids[start:stop].tolist(), user_items, k_neighbors)
+        cand, cand_scores = _top_rows(predicted, top_n)
+        found = np.isfinite(cand_scores)
+        items_out[start:stop] = np.where(found, model.item_ids[cand], -1)
+        scores_out[start:stop] = np.where(found, np.clip(cand_scores, 1.0, 5.0), np.nan)
+    return BatchRecommendations(user_ids, items_out, scores_out)
@@ -0,0 +1,73 @@
+from typing import List, Sequence
+
+import numpy as np
+
+
+class ItemVocabulary:
+    """
+    плотный словарь фильмов: movie_id ↔ номер фильма ↔ нормализованное название.
+
+    внутри всего CF-стека фильмы идентифицируются номером (0..N-1),
+    в названия они переводятся только при выводе пользователю.
+    разные movie_id с одинаковым нормализованным названием остаются разными фильмами.
+    """
+
+    def __init__(self, movie_ids: Sequence[int], titles: Sequence[str]) -> None:
+        self.movie_ids: np.ndarray = np.asarray(movie_ids, dtype=np.int32)    # номер -> movie_id
+        self.titles: List[str] = list(titles)    # номер -> нормализованное название
+        # таблица movie_id -> номер для векторного перевода целых столбцов (-1 — неизвестный фильм)
+        size = int(self.movie_ids.max()) + 1 if len(self.movie_ids) else 0
+        self._lookup: np.ndarray = np.full(size, -1, dtype=np.int32)
+        self._lookup[self.movie_ids] = np.arange(len(self.movie_ids), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def title(self, item: int) -> str:
+        """ нормализованное название фильма по номеру """
+        return self.titles[item]
+
+    def encode(self, movie_ids: np.ndarray) -> np.ndarray:
+        """
+        переводит массив movie_id в номера фильмов одним векторным обращением.
+
+        аргументы:
+            movie_ids (np.ndarray): movie_id из файла оценок.
+
+        возвращает:
+            np.ndarray: номера фильмов (int32), -1 для фильмов вне словаря.
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        known = (movie_ids >= 0) & (movie_ids < len(self._lookup))
+        result = np.full(movie_ids.shape, -1, dtype=np.int32)
+        result[known] = self._lookup[movie_ids[known]]
+        return result
+
+    def encode_or_add(self, movie_ids: np.ndarray) -> np.ndarray:
+        """
+        переводит массив movie_id в номера фильмов, добавляя в словарь неизвестные.
+        новые фильмы получают номера в конце словаря, их название — сам movie_id.
+
+        аргументы:
+            movie_ids (np.ndarray): movie_id из очередной части файла оценок.
+
+        возвращает:
+            np.ndarray: номера фильмов (int32).
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        codes = self.encode(movie_ids)
+        unknown = codes < 0
+        if not unknown.any():
+            return codes
+
+        extra = np.unique(movie_ids[unknown])
+        start = len(self.titles)
+        self.movie_ids = np.concatenate([self.movie_ids, extra.astype(np.int32)])
+        self.titles.extend(str(movie_id) for movie_id in extra.tolist())
+        if extra[-1] >= len(self._lookup):
+            grown = np.full(int(extra[-1]) + 1, -1, dtype=np.int32)
+            grown[:len(self._lookup)] = self._lookup
+            self._lookup = grown
+        self._lookup[extra] = np.arange(start, start + len(extra), dtype=np.int32)
+        codes[unknown] = self._lookup[movie_ids[unknown]]
+        return codes
@@ -0,0 +1,97 @@
+import logging
+import threading
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# состояния фоновой подготовки
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+
+
+class Warmup:
+    # фоновая подготовка данных (загрузка рейтингов, построение соседей) с признаком готовности.
+    # сама работа идет в отдельном потоке, чтобы не блокировать цикл событий aiogram.
+    def __init__(self) -> None:
+        self.state: str = PENDING
+        self.error: Optional[BaseException] = None    # исключение, если подготовка упала
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, target: Callable[[], None]) -> threading.Thread:
+        """
+        запускает подготовку в фоновом потоке (повторный вызов возвращает уже запущенный поток).
+
+        аргументы:
+            target (Callable[[], None]): функция подготовки данных.
+
+        возвращает:
+            threading.Thread: поток подготовки.
+        """
+        if self._thread is not None:
+            return self._thread
+        self.state = RUNNING
+        self._thread = threading.Thread(target=self._run, args=(target,), name="warmup", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _run(self, target: Callable[[], None]) -> None:
+        try:
+            target()
+        except Exception as exc:    # ошибка не должна молча оставлять бота в вечном «прогреве»
+            logger.exception("фоновая подготовка данных завершилась ошибкой")
+            self.error = exc
+            self.state = FAILED
+            return
+        self.state = READY
+        self._ready.set()
+        logger.info("фоновая подготовка данных завершена")
+
+    def is_ready(self) -> bool:
+        """ готовы ли данные для рекомендаций """
+        return self._ready.is_set()
+
+    def is_failed(self) -> bool:
+        """ завершилась ли подготовка ошибкой (она уже записана в лог один раз, в фоновом потоке) """
+        return self.state == FAILED
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        ждет окончания подготовки (для скриптов и тестов, не для обработчиков).
+
+        аргументы:
+            timeout (Optional[float]): сколько ждать в секундах, None — без ограничения.
+
+        возвращает:
+            bool: готовы ли данные.
+        """
+        return self._ready.wait(timeout)
+
+
+# глобальный объект прогрева хранилища рекомендаций
+similarity_warmup = Warmup()
+
+
+def start(target: Callable[[], None]) -> threading.Thread:
+    """
+    запускает фоновую подготовку глобального хранилища.
+
+    аргументы:
+        target (Callable[[], None]): функция подготовки данных.
+
+    возвращает:
+        threading.Thread: поток подготовки.
+    """
+    return similarity_warmup.start(target)
+
+
+def is_ready() -> bool:
+    """ готово ли глобальное хранилище рекомендаций """
+    return similarity_warmup.is_ready()
+
+
+def is_failed() -> bool:
+    """ упала ли подготовка глобального хранилища: данных не будет до перезапуска бота """
+    return similarity_warmup.is_failed()